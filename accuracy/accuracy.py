@@ -1,23 +1,105 @@
+from collections import namedtuple
+import pathlib
 import sys
 from .helpers import (
     calculate_zy,
     read_results_analytical,
     read_results_simulation,
-    make_plot,
-    make_plot_2sp,
+    read_results_store,
 )
 from .helpers import (
     read_results_analytical_2sp,
     calculate_zy_2sp,
     calculate_ms_ratios,
+    count_failures,
     read_results_simulation_2sp,
 )
+from .plots import plot_data_path, save_plot_data
+from .sequential import SequentialAccuracyTest
+from .streaming import RunningZY
+from .trajstore import store_path
 import numpy as np
 
+TWO_SPECIES_MODELS = ["00030", "00031"]
 
-def test_accuracy(id_: str, library: str, algo: str, nrep: int):
-    """Test the accuracy for a given model, library, algorithm and number
-    of reps.
+AccuracyScores = namedtuple(
+    "AccuracyScores",
+    ["time", "mu", "std", "mu_obs", "std_obs", "Z", "Y", "failed_list"],
+)
+
+
+def tracks_two_species(id_: str) -> bool:
+    """Whether the reference results of a model track 2 species, like those
+    written by ``fsp_reference.py`` for models with 2 species."""
+    if id_ in TWO_SPECIES_MODELS:
+        return True
+    fpath = pathlib.Path(f"data/results_{id_}.csv")
+    if not fpath.is_file():
+        return False
+    with open(fpath) as f:
+        return "P2-mean" in f.readline().strip().split(",")
+
+
+def read_reference(id_: str):
+    """Read the analytical results of a model, tracking 1 or 2 species."""
+    if not tracks_two_species(id_):
+        return read_results_analytical(id_)
+    return read_results_analytical_2sp(id_)
+
+
+def make_accumulator(id_: str, algo: str, saved_results_interpolated=False):
+    """Create a streaming Z/Y accumulator for a model.
+
+    Parameters
+    ----------
+    id_
+        Model id.
+    algo
+        Name of the algorithm whose repetitions will be added.
+    saved_results_interpolated
+        Flag denoting whether added repetitions are already interpolated
+        at the analytical time points.
+
+    Returns
+    -------
+    RunningZY
+        Accumulator for the model's analytical time points.
+    """
+    time_list, mu_list, std_list = read_reference(id_)
+    return RunningZY(time_list, mu_list, std_list, algo, saved_results_interpolated)
+
+
+def make_sequential_test(
+    id_: str, algo: str, nrep_max: int, saved_results_interpolated=False
+):
+    """Create a sequential accuracy test for a model.
+
+    Parameters
+    ----------
+    id_
+        Model id.
+    algo
+        Name of the algorithm whose repetitions will be added.
+    nrep_max
+        Number of repetitions of the fixed test, at which it stops anyway.
+    saved_results_interpolated
+        Flag denoting whether added repetitions are already interpolated
+        at the analytical time points.
+
+    Returns
+    -------
+    SequentialAccuracyTest
+        Sequential test at the model's analytical time points.
+    """
+    time_list, mu_list, std_list = read_reference(id_)
+    return SequentialAccuracyTest(
+        time_list, mu_list, std_list, algo, nrep_max, saved_results_interpolated
+    )
+
+
+def score_accuracy(id_: str, library: str, algo: str, nrep: int, n_procs: int = None):
+    """Compute the accuracy statistics for a given model, library, algorithm
+    and number of reps.
 
     Parameters
     ----------
@@ -29,23 +111,31 @@ def test_accuracy(id_: str, library: str, algo: str, nrep: int):
         Name of the algorithm for that library.
     nrep
         Number of repetitions to run.
+    n_procs
+        Number of processes used to parse CSV results folders. Default is
+        `None` and all CPU cores are used.
 
     Returns
     -------
-    failed_list : List[int]
-        Number of failures of each type (Z<-3, Z>3, Y<-5 and Y>5).
+    AccuracyScores
+        The analytical and observed means and standard deviations, and the Z
+        and Y statistics, at each analytical time point, and the number of
+        failures of each type.
     """
-
-    two_species_models = ["00030", "00031"]
-
-    plt_name = f"plots/{library}_{algo}_{id_}_{nrep}.pdf"
     if library == "BioSimulatorIntp":
         saved_results_interpolated = True
     else:
         saved_results_interpolated = False
-    if id_ not in two_species_models:
+    # Prefer the single-file trajectory store, fall back to CSV folders
+    use_store = pathlib.Path(store_path(id_, library, algo)).is_file()
+    if not tracks_two_species(id_):
         time_list, mu_list, std_list = read_results_analytical(id_)
-        res = read_results_simulation(id_, library=library, algo=algo, n_reps=nrep)
+        if use_store:
+            res = read_results_store(id_, library=library, algo=algo, n_reps=nrep)
+        else:
+            res = read_results_simulation(
+                id_, library=library, algo=algo, n_reps=nrep, n_procs=n_procs
+            )
         Z, Y, mu_obs_list, std_obs_list = calculate_zy(
             res,
             time_list,
@@ -53,13 +143,15 @@ def test_accuracy(id_: str, library: str, algo: str, nrep: int):
             std_list,
             saved_results_interpolated=saved_results_interpolated,
         )
-        make_plot(
-            time_list, mu_list, std_list, mu_obs_list, std_obs_list, Z, Y, plt_name
-        )
     else:
         print("Using 2 species")
         time_list, mu_list, std_list = read_results_analytical_2sp(id_)
-        res = read_results_simulation_2sp(id_, library=library, algo=algo, n_reps=nrep)
+        if use_store:
+            res = read_results_store(id_, library=library, algo=algo, n_reps=nrep)
+        else:
+            res = read_results_simulation_2sp(
+                id_, library=library, algo=algo, n_reps=nrep, n_procs=n_procs
+            )
         Z, Y, mu_obs_list, std_obs_list = calculate_zy_2sp(
             res,
             time_list,
@@ -67,22 +159,43 @@ def test_accuracy(id_: str, library: str, algo: str, nrep: int):
             std_list,
             saved_results_interpolated=saved_results_interpolated,
         )
-        make_plot_2sp(
-            time_list, mu_list, std_list, mu_obs_list, std_obs_list, Z, Y, plt_name
-        )
     mu_ratio, std_ratio = calculate_ms_ratios(
         mu_obs_list, mu_list, std_obs_list, std_list
     )
 
-    # TODO: Does this work for two species?
-    failed_list = [None] * 8
-    failed_list[0] = np.sum(Z < -3)
-    failed_list[1] = np.sum(Z > 3)
-    failed_list[2] = np.sum(Y < -5)
-    failed_list[3] = np.sum(Y > 5)
-    failed_list[4] = np.sum(mu_ratio < 0.98)
-    failed_list[5] = np.sum(mu_ratio > 1.02)
-    failed_list[6] = np.sum(std_ratio < 0.98)
-    failed_list[7] = np.sum(std_ratio > 1.02)
-
-    return failed_list
+    failed_list = count_failures(Z, Y, mu_ratio, std_ratio)
+
+    return AccuracyScores(
+        time_list, mu_list, std_list, mu_obs_list, std_obs_list, Z, Y, failed_list
+    )
+
+
+def test_accuracy(id_: str, library: str, algo: str, nrep: int, n_procs: int = None):
+    """Test the accuracy for a given model, library, algorithm and number
+    of reps.
+
+    The arrays of the accuracy plot are saved for ``plots.render_plots``,
+    which draws the plot later.
+
+    Parameters
+    ----------
+    id_
+        Model id.
+    library
+        Name of the library.
+    algo
+        Name of the algorithm for that library.
+    nrep
+        Number of repetitions to run.
+    n_procs
+        Number of processes used to parse CSV results folders. Default is
+        `None` and all CPU cores are used.
+
+    Returns
+    -------
+    failed_list : List[int]
+        Number of failures of each type (Z<-3, Z>3, Y<-5 and Y>5).
+    """
+    scores = score_accuracy(id_, library, algo, nrep, n_procs)
+    save_plot_data(plot_data_path(id_, library, algo, nrep), *scores[:-1])
+    return scores.failed_list
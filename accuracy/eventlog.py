@@ -0,0 +1,397 @@
+"""
+    Compact reaction-event-log encoding of exact stochastic trajectories.
+
+    Between two events of an exact (``direct``) simulation the state changes
+    by one stoichiometry column of ``V_p - V_r``, so a repetition is stored as
+    its initial state, then one narrow integer per event indexing a table of
+    the distinct state changes, and a time delta per event. The table is
+    inferred from the trajectories, so it holds the net stoichiometries of
+    the reactions that fired (and a zero change, for the repeated final row).
+    Times are stored as unsigned 32-bit tick deltas from time 0. The tick is
+    the smallest power of two seconds for which ``2**32 - 1`` ticks span the
+    times, so it does not depend on the exact final times of a chunk, and
+    logs on different ticks are rescaled exactly. Times are exact to half a
+    tick, without drift, and the states exactly. All fields are
+    little-endian::
+
+        magic       8 bytes, b"CAYEVL01"
+        n_rep       int64
+        n_species   int64
+        n_rows      int64
+        n_changes   int64
+        index_size  int64, the bytes per event index (1, 2 or 4)
+        origin      float64, the time of tick 0
+        scale       float64, the seconds per tick
+        offsets     int64[n_rep + 1]
+        status      int64[n_rep]
+        seeds       int64[n_rep]
+        start_ticks int64[n_rep]
+        x0          int64[n_rep, n_species]
+        changes     int64[n_changes, n_species]
+        ticks       uint32[n_rows], 0 on the first row of each repetition
+        index       uint8/16/32[n_rows], of a zero change on the first rows
+        padding     to a multiple of 8 bytes
+
+    A row takes 5 bytes for most models instead of ``8 * (1 + n_species)`` in
+    a trajectory store. The states are rebuilt with a cumulative sum of the
+    indexed changes over all repetitions at once. ``trajstore.read_header``,
+    ``trajstore.read_trajectories`` and thus all readers of stores accept
+    event logs transparently.
+"""
+
+import math
+import os
+import pathlib
+from typing import List
+
+import numpy as np
+
+from .trajstore import TrajectoryStore, write_trajectories
+
+EVENT_MAGIC = b"CAYEVL01"
+_HEADER_SIZE = len(EVENT_MAGIC) + 7 * 8
+_MAX_TICKS = 2 ** 32 - 1
+
+
+def _index_dtype(n_changes: int) -> str:
+    for dtype in ["<u1", "<u2", "<u4"]:
+        if n_changes <= np.iinfo(dtype).max + 1:
+            return dtype
+    raise ValueError(f"Too many distinct state changes: {n_changes}")
+
+
+def _body_size(n_rep, n_species, n_rows, n_changes, index_size) -> int:
+    size = 8 * (4 * n_rep + 1 + (n_rep + n_changes) * n_species)
+    size += (4 + index_size) * n_rows
+    return size + (-size) % 8
+
+
+def tick_scale(span: float) -> float:
+    """Return the power of two seconds per tick for times spanning ``span``."""
+    if span <= 0:
+        return 1.0
+    return math.ldexp(1.0, math.frexp(span / _MAX_TICKS)[1])
+
+
+def encode_events(offsets: np.array, time: np.array, states: np.array) -> dict:
+    """Encode concatenated trajectories as event logs.
+
+    Parameters
+    ----------
+    offsets
+        Numpy array of length ``n_rep + 1``. Repetition ``i`` occupies rows
+        ``offsets[i]:offsets[i + 1]`` of ``time`` and ``states``.
+    time
+        Concatenated time points of all repetitions.
+    states
+        Concatenated integer states of all repetitions, of shape
+        ``(len(time), n_species)``.
+
+    Returns
+    -------
+    dict
+        The ``origin`` and ``scale`` of the ticks and the ``start_ticks``,
+        ``x0``, ``changes``, ``ticks`` and ``index`` arrays of the format.
+
+    Raises
+    ------
+    ValueError
+        If there are no repetitions or one is empty, if the states are not
+        integers, as for approximate (tau leaping) trajectories, or if the
+        times of a repetition decrease.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    time = np.asarray(time, dtype=float)
+    states = np.asarray(states).reshape(time.shape[0], -1)
+    n_rep = offsets.shape[0] - 1
+    starts = offsets[:-1]
+    if n_rep == 0 or (np.diff(offsets) < 1).any():
+        raise ValueError("Cannot encode empty repetitions")
+    int_states = np.rint(states).astype(np.int64)
+    if not (int_states == states).all():
+        raise ValueError("Only integer states can be encoded as events")
+    origin = 0.0
+    span = max(float(time.max()), 0.0) - min(float(time.min()), 0.0)
+    scale = tick_scale(span)
+    abs_ticks = np.rint((time - origin) / scale).astype(np.int64)
+    ticks = np.diff(abs_ticks, prepend=0)
+    deltas = np.diff(int_states, axis=0, prepend=int_states[:1])
+    ticks[starts] = 0
+    deltas[starts] = 0
+    if (ticks < 0).any():
+        raise ValueError("The times of a repetition must not decrease")
+    changes, index = np.unique(deltas, axis=0, return_inverse=True)
+    index = index.reshape(-1)
+    return {
+        "origin": origin,
+        "scale": scale,
+        "start_ticks": abs_ticks[starts],
+        "x0": int_states[starts],
+        "changes": changes,
+        "ticks": ticks.astype("<u4"),
+        "index": index.astype(_index_dtype(changes.shape[0])),
+    }
+
+
+def decode_events(
+    offsets: np.array,
+    origin: float,
+    scale: float,
+    start_ticks: np.array,
+    x0: np.array,
+    changes: np.array,
+    ticks: np.array,
+    index: np.array,
+):
+    """Rebuild the concatenated time points and states of event logs.
+
+    Takes the arrays returned by ``encode_events``.
+
+    Returns
+    -------
+    time
+        Concatenated time points of all repetitions.
+    states
+        Concatenated states of all repetitions, as float64 like in a
+        trajectory store.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    starts = offsets[:-1]
+    lengths = np.diff(offsets)
+    # A cumulative sum over all repetitions, restarted at each first row by
+    # adding its initial state and removing the sums of the previous ones
+    deltas = changes[index]
+    deltas[starts] = x0
+    states = np.cumsum(deltas, axis=0)
+    base = states[starts] - x0
+    states -= np.repeat(base, lengths, axis=0)
+    abs_ticks = np.cumsum(ticks, dtype=np.int64)
+    tick_base = abs_ticks[starts] - start_ticks
+    abs_ticks -= np.repeat(tick_base, lengths)
+    time = origin + scale * abs_ticks
+    return time, states.astype(float)
+
+
+def write_event_log(
+    file_name: str,
+    t_list: List[np.ndarray],
+    x_list: List[np.ndarray],
+    status_list: List[int] = None,
+    sim_seeds: List[int] = None,
+):
+    """Write a list of exact trajectories to a single event log file.
+
+    Takes the same parameters as ``trajstore.write_trajectories``, and raises
+    ``ValueError`` if the trajectories cannot be encoded (see
+    ``encode_events``).
+    """
+    n_rep = len(t_list)
+    if n_rep != len(x_list):
+        raise ValueError("t_list and x_list have different lengths")
+    if status_list is None:
+        status_list = np.zeros(n_rep)
+    if sim_seeds is None:
+        sim_seeds = np.zeros(n_rep)
+    if n_rep == 0:
+        raise ValueError("Cannot encode empty repetitions")
+    n_species = x_list[0].shape[1]
+    offsets = np.zeros(n_rep + 1, dtype="<i8")
+    offsets[1:] = np.cumsum([len(t) for t in t_list])
+    time = np.concatenate(t_list)
+    states = np.concatenate(
+        [np.reshape(x, (len(t), n_species)) for t, x in zip(t_list, x_list)]
+    )
+    encoded = encode_events(offsets, time, states)
+    _write_encoded(file_name, offsets, status_list, sim_seeds, encoded)
+
+
+def _write_encoded(file_name, offsets, status_list, sim_seeds, encoded):
+    n_rep = offsets.shape[0] - 1
+    n_species = encoded["x0"].shape[1]
+    index_size = encoded["index"].dtype.itemsize
+    header = [n_rep, n_species, offsets[-1], encoded["changes"].shape[0], index_size]
+    os.makedirs(pathlib.Path(file_name).parent, exist_ok=True)
+    # Write to a temporary file first so an interrupted write never leaves
+    # a truncated log behind
+    tmp_name = f"{file_name}.tmp"
+    with open(tmp_name, "wb") as fid:
+        fid.write(EVENT_MAGIC)
+        fid.write(np.array(header, dtype="<i8").tobytes())
+        fid.write(np.array([encoded["origin"], encoded["scale"]], "<f8").tobytes())
+        fid.write(np.asarray(offsets, dtype="<i8").tobytes())
+        for values in [status_list, sim_seeds, encoded["start_ticks"]]:
+            fid.write(np.asarray(values, dtype="<i8").tobytes())
+        fid.write(np.ascontiguousarray(encoded["x0"], dtype="<i8").tobytes())
+        fid.write(np.ascontiguousarray(encoded["changes"], dtype="<i8").tobytes())
+        fid.write(encoded["ticks"].tobytes())
+        fid.write(encoded["index"].tobytes())
+        fid.write(b"\0" * ((-(4 + index_size) * int(offsets[-1])) % 8))
+    os.replace(tmp_name, file_name)
+
+
+def write_store(
+    file_name: str,
+    t_list: List[np.ndarray],
+    x_list: List[np.ndarray],
+    status_list: List[int] = None,
+    sim_seeds: List[int] = None,
+    events: bool = False,
+):
+    """Write trajectories to a trajectory store, or an event log with events.
+
+    Trajectories that cannot be encoded as events, like those of the tau
+    leaping algorithms, are written to a trajectory store.
+    """
+    if events:
+        try:
+            write_event_log(file_name, t_list, x_list, status_list, sim_seeds)
+            return
+        except ValueError as err:
+            print(f"Writing a trajectory store instead of an event log: {err}")
+    write_trajectories(file_name, t_list, x_list, status_list, sim_seeds)
+
+
+def read_event_header(file_name: str):
+    """Return the header fields of an event log.
+
+    Raises ``OSError`` if the file is not a complete event log.
+    """
+    with open(file_name, "rb") as fid:
+        header = fid.read(_HEADER_SIZE)
+    if len(header) != _HEADER_SIZE or header[: len(EVENT_MAGIC)] != EVENT_MAGIC:
+        raise OSError(f"{file_name} is not an event log")
+    sizes = np.frombuffer(header[len(EVENT_MAGIC) : -16], dtype="<i8")
+    n_rep, n_species, n_rows, n_changes, index_size = (int(size) for size in sizes)
+    origin, scale = np.frombuffer(header[-16:], dtype="<f8")
+    expected_size = _HEADER_SIZE + _body_size(
+        n_rep, n_species, n_rows, n_changes, index_size
+    )
+    if os.path.getsize(file_name) != expected_size:
+        raise OSError(f"{file_name} is truncated or corrupt")
+    return {
+        "n_rep": n_rep,
+        "n_species": n_species,
+        "n_rows": n_rows,
+        "n_changes": n_changes,
+        "index_size": index_size,
+        "origin": float(origin),
+        "scale": float(scale),
+    }
+
+
+def read_event_log(file_name: str) -> TrajectoryStore:
+    """Read and decode an event log file.
+
+    Returns
+    -------
+    TrajectoryStore
+        Named tuple of ``offsets``, ``status``, ``seeds``, ``time`` and
+        ``states`` arrays, in memory.
+    """
+    header, arrays = _read_encoded(file_name)
+    time, states = decode_events(
+        arrays["offsets"],
+        header["origin"],
+        header["scale"],
+        arrays["start_ticks"],
+        arrays["x0"],
+        arrays["changes"],
+        arrays["ticks"],
+        arrays["index"],
+    )
+    return TrajectoryStore(
+        arrays["offsets"], arrays["status"], arrays["seeds"], time, states
+    )
+
+
+def _read_encoded(file_name):
+    header = read_event_header(file_name)
+    n_rep, n_species, n_rows = header["n_rep"], header["n_species"], header["n_rows"]
+    fields = [
+        ("offsets", "<i8", (n_rep + 1,)),
+        ("status", "<i8", (n_rep,)),
+        ("seeds", "<i8", (n_rep,)),
+        ("start_ticks", "<i8", (n_rep,)),
+        ("x0", "<i8", (n_rep, n_species)),
+        ("changes", "<i8", (header["n_changes"], n_species)),
+        ("ticks", "<u4", (n_rows,)),
+        ("index", f"<u{header['index_size']}", (n_rows,)),
+    ]
+    arrays = {}
+    offset = _HEADER_SIZE
+    with open(file_name, "rb") as fid:
+        for name, dtype, shape in fields:
+            count = int(np.prod(shape))
+            fid.seek(offset)
+            arrays[name] = np.fromfile(fid, dtype=dtype, count=count).reshape(shape)
+            offset += count * np.dtype(dtype).itemsize
+    return header, arrays
+
+
+def merge_event_logs(file_names: List[str], out_file: str):
+    """Concatenate several event logs, in order, into a single event log.
+
+    The ticks of the parts are kept: they are rescaled exactly to the finest
+    tick of the parts, a power of two apart. Only if a rescaled time delta
+    does not fit in 32 bits, or for logs of an earlier version of the format
+    whose tick was not a power of two, are the decoded times encoded again,
+    and a merged time is then within half a tick of its part plus half a
+    tick of the merged log of the simulated time.
+    """
+    parts = [_read_encoded(file_name) for file_name in file_names]
+    scale = min(header["scale"] for header, _ in parts)
+    ratios = [header["scale"] / scale for header, _ in parts]
+    exact = all(header["origin"] == 0.0 for header, _ in parts) and all(
+        ratio == 2.0 ** round(math.log2(ratio)) for ratio in ratios
+    )
+    if exact:
+        ticks = np.concatenate(
+            [
+                arrays["ticks"].astype(np.int64) * int(ratio)
+                for (_, arrays), ratio in zip(parts, ratios)
+            ]
+        )
+        exact = ticks.max(initial=0) <= _MAX_TICKS
+    if not exact:
+        t_list, x_list, status_list, sim_seeds = [], [], [], []
+        for file_name in file_names:
+            store = read_event_log(file_name)
+            offsets = store.offsets.tolist()
+            for i in range(len(offsets) - 1):
+                t_list.append(store.time[offsets[i] : offsets[i + 1]])
+                x_list.append(store.states[offsets[i] : offsets[i + 1]])
+            status_list.extend(store.status.tolist())
+            sim_seeds.extend(store.seeds.tolist())
+        write_event_log(out_file, t_list, x_list, status_list, sim_seeds)
+        return
+    # Index the union of the change tables of the parts
+    changes, inverse = np.unique(
+        np.concatenate([arrays["changes"] for _, arrays in parts]),
+        axis=0,
+        return_inverse=True,
+    )
+    inverse = inverse.reshape(-1)
+    index_list, first = [], 0
+    for header, arrays in parts:
+        index_list.append(inverse[first : first + header["n_changes"]][arrays["index"]])
+        first += header["n_changes"]
+    n_rows = np.cumsum([0] + [header["n_rows"] for header, _ in parts])
+    offsets = np.concatenate(
+        [[0]]
+        + [arrays["offsets"][1:] + n_rows[i] for i, (_, arrays) in enumerate(parts)]
+    )
+    start_ticks = [
+        arrays["start_ticks"] * int(ratio) for (_, arrays), ratio in zip(parts, ratios)
+    ]
+    encoded = {
+        "origin": 0.0,
+        "scale": scale,
+        "start_ticks": np.concatenate(start_ticks),
+        "x0": np.concatenate([arrays["x0"] for _, arrays in parts]),
+        "changes": changes,
+        "ticks": ticks.astype("<u4"),
+        "index": np.concatenate(index_list).astype(_index_dtype(changes.shape[0])),
+    }
+    status_list = np.concatenate([arrays["status"] for _, arrays in parts])
+    sim_seeds = np.concatenate([arrays["seeds"] for _, arrays in parts])
+    _write_encoded(out_file, offsets.astype("<i8"), status_list, sim_seeds, encoded)
@@ -1,14 +1,17 @@
+import multiprocessing as mp
+import os
 import pathlib
-from typing import Tuple
+from typing import TYPE_CHECKING, Tuple
+from warnings import warn
 
 import numpy as np
-import pandas as pd
-import matplotlib.patches as mpatches
-import matplotlib.pyplot as plt
-from matplotlib.legend_handler import HandlerPatch
-from matplotlib.lines import Line2D
 
-from cayenne.results import Results
+from .trajstore import read_trajectories, store_path
+
+# pandas and cayenne (which imports matplotlib) are only imported when used,
+# so the entry points and their pool workers start quickly
+if TYPE_CHECKING:
+    from cayenne.results import Results
 
 
 def read_results_analytical(test_id: str):
@@ -43,6 +46,8 @@ def read_results_analytical(test_id: str):
         .. [1] https://github.com/sbmlteam/sbml-test-suite/tree/master/cases/stochastic
     """
     filename = f"data/results_{test_id}.csv"
+    import pandas as pd
+
     # time,X-mean,X-sd
     data = pd.read_csv(filename)
     time = data["time"].values
@@ -84,6 +89,8 @@ def read_results_analytical_2sp(test_id: str):
         .. [1] https://github.com/sbmlteam/sbml-test-suite/tree/master/cases/stochastic
     """
     filename = f"data/results_{test_id}.csv"
+    import pandas as pd
+
     # time, X-mean, X-sd
     data = pd.read_csv(filename)
     time = data["time"].values
@@ -96,7 +103,7 @@ def read_results_analytical_2sp(test_id: str):
     return time, mu, std
 
 
-def get_results_from_index(res: Results, ind: int):
+def get_results_from_index(res: "Results", ind: int):
     """Get simulation states at given index.
 
     Parameters
@@ -119,8 +126,208 @@ def get_results_from_index(res: Results, ind: int):
     return states
 
 
+def interpolate_states(
+    offsets: np.array,
+    time: np.array,
+    states: np.array,
+    time_arr: np.array,
+    algorithm: str,
+    saved_results_interpolated: bool = False,
+):
+    """Get the states of all repetitions at all time points in one pass.
+
+    The repetitions are given as concatenated trajectories, as stored in a
+    trajectory store. Uses the same semantics as ``cayenne.Results.get_state``:
+    the state is held constant between events for the ``direct`` algorithm and
+    linearly interpolated otherwise, and the last state is returned past the
+    end of the simulation.
+
+    Parameters
+    ----------
+    offsets
+        Numpy array of length ``n_rep + 1``. Repetition ``i`` occupies rows
+        ``offsets[i]:offsets[i + 1]`` of ``time`` and ``states``.
+    time
+        Concatenated time points of all repetitions.
+    states
+        Concatenated states of all repetitions, of shape
+        ``(len(time), n_species)``.
+    time_arr
+        Sorted time points at which the states are wanted.
+    algorithm
+        Name of the algorithm that produced the repetitions.
+    saved_results_interpolated
+        Flag denoting whether saved simulation results are interpolated or not.
+        ``True`` if interpolated, in which case the ``i``-th state of each
+        repetition is returned for the ``i``-th time point.
+
+    Returns
+    -------
+    states_arr
+        Numpy array of states of shape ``(len(time_arr), n_rep, n_species)``.
+
+    Notes
+    -----
+    The cost scales with the total number of events. Each event is located
+    within the time grid once, which turns the per-repetition search into a
+    single ``searchsorted`` over integer keys that increase across the
+    concatenated repetitions.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    time = np.asarray(time, dtype=float)
+    states = np.asarray(states).reshape(time.shape[0], -1)
+    time_arr = np.asarray(time_arr, dtype=float)
+    n_rep = offsets.shape[0] - 1
+    n_time = time_arr.shape[0]
+    starts, last = offsets[:-1], offsets[1:] - 1
+    if saved_results_interpolated:
+        ind = np.minimum(starts + np.arange(n_time)[:, None], last)
+        return states[ind]
+    t = time_arr + np.finfo(float).eps * time_arr
+    # Number of grid points at or below each event time, which is
+    # non-decreasing within a repetition
+    event_rank = np.searchsorted(t, time, side="right")
+    rep_of_event = np.repeat(np.arange(n_rep, dtype=np.int64), np.diff(offsets))
+    event_key = rep_of_event * (n_time + 1) + event_rank
+    query_key = (
+        np.arange(n_rep, dtype=np.int64) * (n_time + 1) + np.arange(n_time)[:, None]
+    )
+    # Equivalent to np.searchsorted(t_array, t) for each repetition
+    ind = np.searchsorted(event_key, query_key, side="right")
+    ind = np.maximum(ind - 1, starts)
+    if algorithm == "direct":
+        return states[ind]
+    ind_next = np.minimum(ind + 1, last)
+    t_lo, t_hi = time[ind], time[ind_next]
+    dt = t_hi - t_lo
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = np.where(dt > 0, (t[:, None] - t_lo) / dt, 1.0)
+    weight = np.clip(weight, 0.0, 1.0)[:, :, None]
+    x_lo = states[ind].astype(float)
+    return x_lo + weight * (states[ind_next] - x_lo)
+
+
+def get_states_on_grid(
+    t_array: np.array,
+    x_array: np.array,
+    time_arr: np.array,
+    algorithm: str,
+    saved_results_interpolated: bool = False,
+):
+    """Get the states of one repetition at all time points in a grid.
+
+    Parameters
+    ----------
+    t_array
+        Time points of the repetition.
+    x_array
+        States of the repetition, of shape ``(len(t_array), n_species)``.
+    time_arr
+        Sorted time points at which the states are wanted.
+    algorithm
+        Name of the algorithm that produced the repetition.
+    saved_results_interpolated
+        Flag denoting whether saved simulation results are interpolated or not.
+
+    Returns
+    -------
+    states
+        Numpy array of states of shape ``(len(time_arr), n_species)``.
+
+    See Also
+    --------
+    interpolate_states: The same for many repetitions at once.
+    """
+    offsets = np.array([0, len(t_array)])
+    states = interpolate_states(
+        offsets, t_array, x_array, time_arr, algorithm, saved_results_interpolated
+    )
+    return states[:, 0, :]
+
+
+def concatenate_results(res: "Results"):
+    """Concatenate the repetitions of a result into ragged arrays.
+
+    Returns
+    -------
+    offsets
+        Numpy array of length ``n_rep + 1``. Repetition ``i`` occupies rows
+        ``offsets[i]:offsets[i + 1]`` of ``time`` and ``states``.
+    time
+        Concatenated time points of all repetitions.
+    states
+        Concatenated states of all repetitions.
+    """
+    lengths = [len(t) for t in res.t_list]
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+    time = np.concatenate(res.t_list)
+    states = np.concatenate([np.reshape(x, (len(x), -1)) for x in res.x_list])
+    return offsets, time, states
+
+
+def get_states_at_times(
+    res: "Results", time_arr: np.array, saved_results_interpolated: bool
+):
+    """Get the states of all repetitions in a result at all time points.
+
+    Parameters
+    ----------
+    res
+        A cayenne.Results object.
+    time_arr
+        Sorted time points at which the states are wanted.
+    saved_results_interpolated
+        Flag denoting whether saved simulation results are interpolated or not.
+        ``True`` if interpolated.
+
+    Returns
+    -------
+    states_arr
+        Numpy array of states of shape ``(len(time_arr), n_rep, n_species)``.
+    """
+    offsets, time, states = concatenate_results(res)
+    if not saved_results_interpolated:
+        final_times = time[offsets[1:] - 1]
+        not_extinct = np.array(res.status_list) != 3
+        n_early = np.sum(not_extinct & (final_times < np.max(time_arr)))
+        if n_early:
+            warn(
+                f"{n_early} simulations ended before {np.max(time_arr)}, "
+                "returning last state."
+            )
+    return interpolate_states(
+        offsets, time, states, time_arr, res.algorithm, saved_results_interpolated
+    )
+
+
+def _calculate_zy(
+    res: "Results",
+    time_arr: np.array,
+    mu_analytical: np.array,
+    std_analytical: np.array,
+    saved_results_interpolated: bool,
+):
+    """Calculate Z and Y for any number of species.
+
+    ``mu_analytical`` and ``std_analytical`` are of shape
+    ``(len(time_arr), n_species)`` and so are the returned observed values.
+    """
+    n_rep = len(res.t_list)
+    states = get_states_at_times(res, time_arr, saved_results_interpolated)
+    mu_obs_arr = np.mean(states, axis=1)
+    std_obs_arr = np.std(states, axis=1)
+    mu_obs_arr[0] = mu_analytical[0]
+    std_obs_arr[0] = 0.0
+    z_arr = np.sqrt(n_rep) * (mu_obs_arr[1:] - mu_analytical[1:]) / std_analytical[1:]
+    y_arr = np.sqrt(n_rep / 2) * (
+        (std_obs_arr[1:] ** 2) / (std_analytical[1:] ** 2) - 1
+    )
+    return z_arr, y_arr, mu_obs_arr, std_obs_arr
+
+
 def calculate_zy(
-    res: Results,
+    res: "Results",
     time_arr: np.array,
     mu_analytical: np.array,
     std_analytical: np.array,
@@ -157,32 +364,12 @@ def calculate_zy(
     std_obs_arr
         Numpy array of observed standard deviation values.
     """
-    z_list = []
-    y_list = []
-    n_rep = len(res.t_list)
-    mu_obs_arr = np.zeros(len(time_arr))
-    std_obs_arr = np.zeros(len(time_arr))
-    mu_obs_arr[0] = mu_analytical[0]
-    for ind1, t in enumerate(time_arr[1:]):
-        if saved_results_interpolated == False:
-            results = res.get_state(t)
-        else:
-            results = get_results_from_index(res, ind1 + 1)
-        mu_obs = np.mean(results)
-        std_obs = np.std(results)
-        z_list.append(
-            np.sqrt(n_rep)
-            * (mu_obs - mu_analytical[ind1 + 1])
-            / std_analytical[ind1 + 1]
-        )
-        y_list.append(
-            np.sqrt(n_rep / 2) * ((std_obs ** 2) / (std_analytical[ind1 + 1] ** 2) - 1)
-        )
-        mu_obs_arr[ind1 + 1] = mu_obs
-        std_obs_arr[ind1 + 1] = std_obs
-    z_arr = np.array(z_list)
-    y_arr = np.array(y_list)
-    return z_arr, y_arr, mu_obs_arr, std_obs_arr
+    mu_analytical = np.asarray(mu_analytical, dtype=float).reshape(-1, 1)
+    std_analytical = np.asarray(std_analytical, dtype=float).reshape(-1, 1)
+    z_arr, y_arr, mu_obs_arr, std_obs_arr = _calculate_zy(
+        res, time_arr, mu_analytical, std_analytical, saved_results_interpolated
+    )
+    return z_arr[:, 0], y_arr[:, 0], mu_obs_arr[:, 0], std_obs_arr[:, 0]
 
 
 def calculate_ms_ratios(
@@ -212,14 +399,48 @@ def calculate_ms_ratios(
     return mu_ratio, std_ratio
 
 
+def count_failures(
+    z_arr: np.array, y_arr: np.array, mu_ratio: np.array, std_ratio: np.array
+):
+    """Count the failed accuracy tests.
+
+    Parameters
+    ----------
+    z_arr
+        Numpy array of calculated Z values.
+    y_arr
+        Numpy array of calculated Y values.
+    mu_ratio
+        Numpy array of ratios of observed to analytical means.
+    std_ratio
+        Numpy array of ratios of observed to analytical standard deviations.
+
+    Returns
+    -------
+    failed_list : List[int]
+        Number of failures of each type (Z<-3, Z>3, Y<-5, Y>5, mean ratio
+        <0.98, mean ratio >1.02, sd ratio <0.98 and sd ratio >1.02).
+    """
+    failed_list = [None] * 8
+    failed_list[0] = int(np.sum(z_arr < -3))
+    failed_list[1] = int(np.sum(z_arr > 3))
+    failed_list[2] = int(np.sum(y_arr < -5))
+    failed_list[3] = int(np.sum(y_arr > 5))
+    failed_list[4] = int(np.sum(mu_ratio < 0.98))
+    failed_list[5] = int(np.sum(mu_ratio > 1.02))
+    failed_list[6] = int(np.sum(std_ratio < 0.98))
+    failed_list[7] = int(np.sum(std_ratio > 1.02))
+    return failed_list
+
+
 def calculate_zy_2sp(
-    res: Results,
+    res: "Results",
     time_arr: np.array,
     mu_analytical: np.array,
     std_analytical: np.array,
     saved_results_interpolated: bool,
 ):
-    """Calculate Z and Y for simulations with 2 species.
+    """Calculate Z and Y for simulations with 2 or more species.
 
     For a given simulation result and the analytical mean and standard
     deviations, compute the Z and Y statistics for each time point.
@@ -231,10 +452,11 @@ def calculate_zy_2sp(
     time_arr
         List of time points at which analytical solutions are available.
     mu_analytical
-        List of analytical means at the time points in ``time_arr``.
+        Array of analytical means at the time points in ``time_arr``, of
+        shape ``(len(time_arr), n_species)``.
     std_analytical
-        List of analytical standard deviations at the time points in
-        ``time_arr``.
+        Array of analytical standard deviations at the time points in
+        ``time_arr``, of shape ``(len(time_arr), n_species)``.
     saved_results_interpolated
         Flag denoting whether saved simulation results are interpolated or not.
         ``True`` if interpolated.
@@ -250,34 +472,11 @@ def calculate_zy_2sp(
     std_obs_arr
         Numpy array of observed standard deviation values.
     """
-    z_list = []
-    y_list = []
-    n_rep = len(res.t_list)
-    mu_obs_list = [mu_analytical[0, :]]
-    std_obs_list = [[0.0, 0.0]]
-    for ind1, t in enumerate(time_arr[1:]):
-        if not saved_results_interpolated:
-            results = res.get_state(t)
-        else:
-            results = get_results_from_index(res, ind1 + 1)
-        mu_obs = np.mean(results, axis=0)
-        std_obs = np.std(results, axis=0)
-        z_list.append(
-            np.sqrt(n_rep)
-            * (mu_obs - mu_analytical[ind1 + 1, :])
-            / std_analytical[ind1 + 1, :]
-        )
-        y_list.append(
-            np.sqrt(n_rep / 2)
-            * ((std_obs ** 2) / (std_analytical[ind1 + 1, :] ** 2) - 1)
-        )
-        mu_obs_list.append(mu_obs)
-        std_obs_list.append(std_obs)
-    z_arr = np.array(z_list)
-    y_arr = np.array(y_list)
-    mu_obs_arr = np.array(mu_obs_list)
-    std_obs_arr = np.array(std_obs_list)
-    return z_arr, y_arr, mu_obs_arr, std_obs_arr
+    mu_analytical = np.asarray(mu_analytical, dtype=float)
+    std_analytical = np.asarray(std_analytical, dtype=float)
+    return _calculate_zy(
+        res, time_arr, mu_analytical, std_analytical, saved_results_interpolated
+    )
 
 
 def get_highest_rep_in_path(this_path: str):
@@ -288,12 +487,132 @@ def get_highest_rep_in_path(this_path: str):
     return highest_rep
 
 
+def _is_header(line: bytes) -> bool:
+    """Whether a line is a header: the first column of data rows is time,
+    always a number, while headers start with its name."""
+    try:
+        float(line.partition(b",")[0])
+    except ValueError:
+        return True
+    return False
+
+
+def _parse_csv_file(file_name: str):
+    """Parse a numeric CSV file of fixed width into a 2D float array.
+
+    A header line (e.g. column names written by Tellurium or BioSimulator)
+    is skipped. The number of columns is taken from the first data line.
+    """
+    with open(file_name, "rb") as fid:
+        text = fid.read()
+    first_line, _, rest = text.partition(b"\n")
+    if _is_header(first_line):
+        text, first_line = rest, rest.partition(b"\n")[0]
+    n_cols = first_line.count(b",") + 1
+    text = text.replace(b"\r", b"").strip().replace(b"\n", b",")
+    if not text:
+        raise OSError(f"{file_name} contains no data")
+    values = np.fromstring(text.decode(), sep=",")
+    if values.shape[0] % n_cols:
+        raise OSError(f"{file_name} does not have {n_cols} columns in every row")
+    return values.reshape(-1, n_cols)
+
+
+def _parse_csv_files(file_names: list):
+    """Parse a chunk of CSV files, returning row counts and stacked rows."""
+    tables = [_parse_csv_file(file_name) for file_name in file_names]
+    lengths = np.array([table.shape[0] for table in tables], dtype=np.int64)
+    return lengths, np.concatenate(tables)
+
+
+def read_results_folder(
+    res_folder: str,
+    n_reps: int = None,
+    algo: str = "direct",
+    rxn_names: list = None,
+    n_procs: int = None,
+):
+    """Read a folder of per-repetition CSV files in parallel.
+
+    The files ``1.csv`` to ``{n_reps}.csv`` are split into contiguous chunks
+    that are parsed by a pool of processes. The chunks are then copied into
+    a single time buffer and a single state buffer, and the returned result
+    holds views into them.
+
+    Parameters
+    ----------
+    res_folder
+        Folder containing the files ``1.csv``, ``2.csv``, ... with time in the
+        first column and one column per species.
+    n_reps
+        Number of reps to read the simulation results for. Default is `None`
+        and all results are read.
+    algo
+        Name of the algorithm.
+    rxn_names
+        List of reaction names stored in the result.
+    n_procs
+        Number of processes to use. Default is `None` and all CPU cores are
+        used. Inside a daemonic process (e.g. a `multiprocessing.Pool`
+        worker) the files are parsed serially.
+
+    Returns
+    -------
+    res: Results
+        A `cayenne.Results` object containing the results.
+    """
+    if n_reps is None:
+        n_reps = get_highest_rep_in_path(res_folder)
+    if rxn_names is None:
+        rxn_names = []
+    res_folder = pathlib.Path(res_folder)
+    file_names = [str(res_folder / f"{rep_no}.csv") for rep_no in range(1, n_reps + 1)]
+    if n_procs is None:
+        n_procs = os.cpu_count()
+    if mp.current_process().daemon:
+        n_procs = 1
+    n_chunks = min(n_reps, 4 * n_procs)
+    bounds = np.linspace(0, n_reps, n_chunks + 1).astype(int)
+    chunks = [file_names[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+    if n_procs == 1 or n_chunks == 1:
+        parsed = [_parse_csv_files(chunk) for chunk in chunks]
+    else:
+        with mp.Pool(processes=n_procs) as pool:
+            parsed = pool.map(_parse_csv_files, chunks)
+    n_cols = {table.shape[1] for _, table in parsed}
+    if len(n_cols) != 1:
+        raise OSError(f"Files in {res_folder} have different numbers of columns")
+    lengths = np.concatenate([chunk_lengths for chunk_lengths, _ in parsed])
+    offsets = np.zeros(n_reps + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+    n_species = n_cols.pop() - 1
+    time = np.empty(offsets[-1])
+    states = np.empty((offsets[-1], n_species))
+    row = 0
+    for _, table in parsed:
+        time[row : row + table.shape[0]] = table[:, 0]
+        states[row : row + table.shape[0]] = table[:, 1:]
+        row += table.shape[0]
+    t_list = [time[offsets[i] : offsets[i + 1]] for i in range(n_reps)]
+    x_list = [states[offsets[i] : offsets[i + 1]] for i in range(n_reps)]
+    status_list = [0] * n_reps
+    sim_seeds = [0] * n_reps
+    species_names = [f"species_{i}" for i in range(n_species)]
+    from cayenne.results import Results
+
+    res = Results(
+        species_names, rxn_names, t_list, x_list, status_list, algo, sim_seeds
+    )
+    return res
+
+
 def read_results_simulation(
     model: str = "00001",
     library: str = "GillespieSSA",
     algo: str = "direct",
     n_reps: str = None,
     res_folder: str = None,
+    n_procs: int = None,
 ):
     """Read simulation results.
 
@@ -315,31 +634,19 @@ def read_results_simulation(
     res_folder
         If None, read from the results folder. Else read from the specified
         folder. This is used in tests.
+    n_procs
+        Number of processes used to parse the files. Default is `None` and
+        all CPU cores are used.
 
     Returns
     -------
     res: Results
         A `cayenne.Results` object containing the results.
     """
-    x_list = []
-    t_list = []
-    status_list = []
-    sim_seeds = []
     if res_folder is None:
         res_folder = f"results/{model}/{library}_{algo}/"
-    if n_reps is None:
-        n_reps = get_highest_rep_in_path(res_folder)
-
-    for rep_no in range(1, n_reps + 1):
-        contents = pd.read_csv(res_folder + f"{rep_no}.csv", names=["time", "S1"])
-        t_list.append(contents["time"].values)
-        x_list.append(contents["S1"].values.reshape(contents.shape[0], 1))
-        status_list.append(0)
-        sim_seeds.append(0)
-    species_names = [f"species_{i}" for i in range(x_list[0].shape[1])]
-    rxn_names = ["X"]
-    res = Results(
-        species_names, rxn_names, t_list, x_list, status_list, algo, sim_seeds
+    res = read_results_folder(
+        res_folder, n_reps=n_reps, algo=algo, rxn_names=["X"], n_procs=n_procs
     )
     return res
 
@@ -350,6 +657,7 @@ def read_results_simulation_2sp(
     algo="direct",
     n_reps=None,
     res_folder: str = None,
+    n_procs: int = None,
 ):
     """Read simulation results for 2sp.
 
@@ -371,226 +679,75 @@ def read_results_simulation_2sp(
     res_folder
         If None, read from the results folder. Else read from the specified
         folder. This is used in tests.
+    n_procs
+        Number of processes used to parse the files. Default is `None` and
+        all CPU cores are used.
 
     Returns
     -------
     res: Results
         A `cayenne.Results` object containing the results.
     """
-    x_list = []
-    t_list = []
-    status_list = []
-    sim_seeds = []
     if res_folder is None:
         res_folder = f"results/{model}/{library}_{algo}/"
-    if n_reps is None:
-        n_reps = get_highest_rep_in_path(res_folder)
-
-    for rep_no in range(1, n_reps + 1):
-        contents = pd.read_csv(res_folder + f"{rep_no}.csv", names=["time", "S1", "S2"])
-        t_list.append(contents["time"].values)
-        x_list.append(contents[["S1", "S2"]].values)
-        status_list.append(0)
-        sim_seeds.append(0)
-    species_names = [f"species_{i}" for i in range(x_list[0].shape[1])]
-    rxn_names = ["X", "Y"]
-    res = Results(
-        species_names, rxn_names, t_list, x_list, status_list, algo, sim_seeds
+    res = read_results_folder(
+        res_folder, n_reps=n_reps, algo=algo, rxn_names=["X", "Y"], n_procs=n_procs
     )
     return res
 
 
-def make_zy_plot(
-    time_pts: np.array,
-    value_obs: np.array,
-    value_analytical: np.array,
-    stat: np.array,
-    stat_thresh: float,
-    ax,
+def read_results_store(
+    model: str = "00001",
+    library: str = "cayenne",
+    algo: str = "direct",
+    n_reps: int = None,
+    res_file: str = None,
 ):
-    """Make an overlay plot.
+    """Read simulation results from a trajectory store.
 
-    Overlay the analytical and observed values across time. Color the
-    points which violate statistical thresholds differently.
+    Given a model, library and algorithm, read the results from the single
+    store file written by the simulation scripts. The trajectories are
+    memory-mapped views into the file, so no text is parsed and nothing is
+    copied until it is used.
 
     Parameters
     ----------
-    time_pts
-        Numpy array of time points.
-    value_obs
-        Observed values at each time point.
-    value_analytical
-        Analytical values at each time point.
-    stat
-        Statistic at each time point.
-    stat_thresh
-        Statistic threshold to color by, same for all time points.
-    ax
-        Axis object to plot on.
-    """
-    ax.plot(time_pts, value_analytical)
-    for i in range(len(stat)):
-        if -stat_thresh <= stat[i] <= stat_thresh:
-            marker = "green"
-        else:
-            marker = "red"
-        ax.plot(time_pts[i + 1], value_obs[i + 1], ".", color=marker)
-
-
-# NOTE: Use calculate_ms_ratios function instead
-def make_ratio_plot(
-    time_pts: np.array,
-    value_obs: np.array,
-    value_analytical: np.array,
-    stat_thresh: list,
-    ax,
-):
-    """Make a plot of ratios of observed means to analytical means
-
-    """
-    stat_lb, stat_ub = stat_thresh[0], stat_thresh[1]
-    ax.axhline(y=1.0, alpha=0.8, color="black")
-    ax.axhline(y=stat_lb, linestyle="--", color="black")
-    ax.axhline(y=stat_ub, linestyle="--", color="black")
-    for i in range(time_pts.shape[0]):
-        obs, analytical = value_obs[i], value_analytical[i]
-        try:
-            ratio = obs / analytical
-        except ZeroDivisionError:
-            continue
-        if stat_lb <= ratio <= stat_ub:
-            marker = "green"
-        else:
-            marker = "red"
-        ax.plot(time_pts[i], ratio, ".", color=marker)
-
-
-def make_plot(
-    time_arr: np.array,
-    mu_analytical: np.array,
-    std_analytical: np.array,
-    mu_obs: np.array,
-    std_obs: np.array,
-    Z: np.array,
-    Y: np.array,
-    plt_name: str,
-):
-    """Plot simulations vs original values.
-
-    Make a plot to compare simulations vs original values.
+    model
+        Model id.
+    library
+        Name of the library.
+    algo
+        Name of the algorithm.
+    n_reps
+        Number of reps to read the simulation results for. Default is `None`
+        and all results are read.
+    res_file
+        If None, read from the results folder. Else read from the specified
+        file. This is used in tests.
 
-    Parameters
-    ----------
-    time_arr
-        List of time points at which analytical solutions are available.
-    mu_analytical
-        List of analytical means at the time points in ``time_arr``.
-    std_analytical
-        List of analytical standard deviations at the time points in
-        ``time_arr``.
-    mu_obs
-        Numpy array of observed mean values.
-    std_obs
-        Numpy array of observed standard deviation values.
-    Z
-        Numpy array of calculated Z values.
-    Y
-        Numpy array of calculated Y values.
+    Returns
+    -------
+    res: Results
+        A `cayenne.Results` object containing the results.
     """
-    fig, ax = plt.subplots(2, 2, sharex="col", constrained_layout=True)
-    name = plt_name.split("/")[1].split(".")[0]
-    fig.suptitle(name)
-    make_zy_plot(time_arr, mu_obs, mu_analytical, Z, 3, ax[0, 0])
-    ax[0, 0].set_ylabel(r"$\mu$")
-    make_zy_plot(time_arr, std_obs, std_analytical, Y, 5, ax[0, 1])
-    ax[0, 1].set_ylabel(r"$\sigma$")
-    make_ratio_plot(time_arr, mu_obs, mu_analytical, [0.98, 1.02], ax[1, 0])
-    ax[1, 0].set_ylabel(r"$\mu$ ratio")
-    ax[1, 0].set_xlabel("Time")
-    make_ratio_plot(time_arr, std_obs, std_analytical, [0.98, 1.02], ax[1, 1])
-    ax[1, 1].set_ylabel(r"$\sigma$ ratio")
-    ax[1, 1].set_xlabel("Time")
-    green_patch = Line2D(
-        [0], [0], marker=".", color="w", markerfacecolor="green", markersize=15
-    )
-    red_patch = Line2D(
-        [0], [0], marker=".", color="w", markerfacecolor="red", markersize=15
-    )
-    analytical_patch = Line2D([0], [0])
-    ratio_patch = Line2D([0], [0], color="black")
-    ratioborder_patch = Line2D([0], [0], linestyle="--", color="black")
-    text_labels = [
-        "Accurate (Simulation)",
-        "Inaccurate (Simulation)",
-        "Analytical solution",
-        "Ratio (expected)",
-        "Ratio (threshold)",
-    ]
-    lgd = fig.legend(
-        [green_patch, red_patch, analytical_patch, ratio_patch, ratioborder_patch],
-        text_labels,
-        loc="upper left",
-        bbox_to_anchor=(1.02, 0.9),
-        fontsize="small",
-    )
-    fig.savefig(plt_name, bbox_extra_artists=(lgd,), bbox_inches="tight")
-
-
-def make_plot_2sp(
-    time_arr: np.array,
-    mu_analytical: np.array,
-    std_analytical: np.array,
-    mu_obs: np.array,
-    std_obs: np.array,
-    Z: np.array,
-    Y: np.array,
-    plt_name: str,
-):
-    """Plot simulations vs original values.
-
-    Make a plot to compare simulations vs original values.
+    if res_file is None:
+        res_file = store_path(model, library, algo)
+    store = read_trajectories(res_file)
+    n_stored = store.offsets.shape[0] - 1
+    if n_reps is None:
+        n_reps = n_stored
+    elif n_reps > n_stored:
+        raise OSError(f"{res_file} holds {n_stored} reps, {n_reps} requested")
+    offsets = store.offsets[: n_reps + 1].tolist()
+    t_list = [store.time[offsets[i] : offsets[i + 1]] for i in range(n_reps)]
+    x_list = [store.states[offsets[i] : offsets[i + 1]] for i in range(n_reps)]
+    status_list = store.status[:n_reps].tolist()
+    sim_seeds = store.seeds[:n_reps].tolist()
+    species_names = [f"species_{i}" for i in range(store.states.shape[1])]
+    rxn_names = []
+    from cayenne.results import Results
 
-    Parameters
-    ----------
-    time_arr
-        List of time points at which analytical solutions are available.
-    mu_analytical
-        List of analytical means at the time points in ``time_arr``.
-    std_analytical
-        List of analytical standard deviations at the time points in
-        ``time_arr``.
-    mu_obs
-        Numpy array of observed mean values.
-    std_obs
-        Numpy array of observed standard deviation values.
-    Z
-        Numpy array of calculated Z values.
-    Y
-        Numpy array of calculated Y values.
-    """
-    fig, ax = plt.subplots(4, 2, sharex="col", figsize=(8, 16), constrained_layout=True)
-    name = plt_name.split("/")[1].split(".")[0]
-    fig.suptitle(name)
-    make_zy_plot(time_arr, mu_obs[:, 0], mu_analytical[:, 0], Z[:, 0], 3, ax[0, 0])
-    ax[0, 0].set_ylabel("Observed mean - S1")
-    make_zy_plot(time_arr, std_obs[:, 0], std_analytical[:, 0], Y[:, 0], 5, ax[0, 1])
-    ax[0, 1].set_ylabel("Observed sd - S1")
-    make_ratio_plot(time_arr, mu_obs[:, 0], mu_analytical[:, 0], [0.98, 1.02], ax[1, 0])
-    ax[1, 0].set_ylabel(r"$\mu$ ratio - S1")
-    make_ratio_plot(
-        time_arr, std_obs[:, 0], std_analytical[:, 0], [0.98, 1.02], ax[1, 1]
-    )
-    ax[1, 1].set_ylabel(r"$\sigma$ ratio - S1")
-    make_zy_plot(time_arr, mu_obs[:, 1], mu_analytical[:, 1], Z[:, 1], 3, ax[2, 0])
-    ax[2, 0].set_ylabel("Observed mean - S2")
-    make_zy_plot(time_arr, std_obs[:, 1], std_analytical[:, 1], Y[:, 1], 5, ax[2, 1])
-    ax[2, 1].set_ylabel("Observed sd - S2")
-    make_ratio_plot(time_arr, mu_obs[:, 1], mu_analytical[:, 1], [0.98, 1.02], ax[3, 0])
-    ax[3, 0].set_ylabel(r"$\mu$ ratio - S2")
-    ax[3, 0].set_xlabel("time")
-    make_ratio_plot(
-        time_arr, std_obs[:, 1], std_analytical[:, 1], [0.98, 1.02], ax[3, 1]
+    res = Results(
+        species_names, rxn_names, t_list, x_list, status_list, algo, sim_seeds
     )
-    ax[3, 1].set_ylabel(r"$\sigma$ ratio - S2")
-    ax[3, 1].set_xlabel("time")
-    fig.savefig(plt_name)
+    return res
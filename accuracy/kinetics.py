@@ -0,0 +1,47 @@
+"""
+    Stochastic rate constants and propensities with cayenne's conventions.
+
+    Shared by the ensemble engine and the finite state projection references,
+    so both use the same kinetics as the library they are compared with.
+"""
+
+import numpy as np
+
+
+def stochastic_rates(V_r: np.array, k: np.array) -> np.array:
+    """Return the stochastic rate constants, as cayenne's ``get_kstoc``.
+
+    The reactions with a second or third order reactant have their rates
+    multiplied by 2 or 6, which the binomial propensities divide back out.
+    """
+    max_order = V_r.max(axis=0)
+    return np.asarray(k, dtype=float) * np.where(
+        max_order == 3, 6.0, np.where(max_order == 2, 2.0, 1.0)
+    )
+
+
+def propensities(x: np.array, kstoc: np.array, V_r: np.array) -> np.array:
+    """Return the propensities of a batch of states.
+
+    Parameters
+    ----------
+    x
+        States of shape ``(n_rep, n_species)``.
+    kstoc
+        Stochastic rate constants of shape ``(n_rxn,)``.
+    V_r
+        Reactant stoichiometries of shape ``(n_species, n_rxn)``.
+
+    Returns
+    -------
+    prop
+        Propensities of shape ``(n_rep, n_rxn)``, the rates times the number
+        of combinations of reactant molecules.
+    """
+    prop = np.tile(kstoc, (x.shape[0], 1))
+    for species, rxn in zip(*np.nonzero(V_r)):
+        comb = np.ones(x.shape[0])
+        for m in range(V_r[species, rxn]):
+            comb *= (x[:, species] - m) / (m + 1)
+        prop[:, rxn] *= comb
+    return prop
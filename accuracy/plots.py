@@ -0,0 +1,303 @@
+"""
+    Rendering of the accuracy plots, decoupled from the accuracy scoring.
+
+    Scoring a job only saves the per-time-point arrays of its plot to
+    ``plots/data/{library}_{algo}_{model}_{nrep}.npz``, and never imports
+    matplotlib. The plots are rendered afterwards, in a process pool, by
+    ``render_plots``. A data file is only rewritten when its arrays changed,
+    and a plot is only rendered when it is older than its data file, so
+    rerunning the same jobs does not redraw anything.
+"""
+
+import multiprocessing as mp
+import os
+import pathlib
+
+import numpy as np
+
+PLOT_FOLDER = "plots"
+PLOT_DATA_FOLDER = "plots/data"
+PLOT_ARRAYS = ["time", "mu", "std", "mu_obs", "std_obs", "Z", "Y"]
+
+
+def plot_data_path(id_: str, library: str, algo: str, nrep: int) -> str:
+    """Return the plot data file name for a model, library, algorithm and nrep."""
+    return f"{PLOT_DATA_FOLDER}/{library}_{algo}_{id_}_{nrep}.npz"
+
+
+def save_plot_data(file_name: str, *arrays):
+    """Save the arrays of a plot, in the order of ``PLOT_ARRAYS``.
+
+    The file is left untouched if it already holds the same arrays.
+
+    Returns
+    -------
+    bool
+        True if the file was written
+    """
+    data = {name: np.asarray(array) for name, array in zip(PLOT_ARRAYS, arrays)}
+    fpath = pathlib.Path(file_name)
+    if fpath.is_file():
+        with np.load(fpath) as saved:
+            if set(saved.files) == set(data) and all(
+                saved[name].shape == data[name].shape
+                and np.array_equal(saved[name], data[name], equal_nan=True)
+                for name in data
+            ):
+                return False
+    fpath.parent.mkdir(parents=True, exist_ok=True)
+    # np.savez appends .npz to names without it
+    tmp_path = fpath.with_name(fpath.stem + ".tmp.npz")
+    np.savez(tmp_path, **data)
+    os.replace(tmp_path, fpath)
+    return True
+
+
+def plot_path(data_file: str) -> str:
+    return f"{PLOT_FOLDER}/{pathlib.Path(data_file).stem}.pdf"
+
+
+def stale_plots(folder: str = PLOT_DATA_FOLDER) -> list:
+    """Return the plot data files whose plot is missing or older than them."""
+    stale = []
+    for data_file in sorted(pathlib.Path(folder).glob("*.npz")):
+        plot_file = pathlib.Path(plot_path(data_file))
+        if (
+            not plot_file.is_file()
+            or plot_file.stat().st_mtime < data_file.stat().st_mtime
+        ):
+            stale.append(str(data_file))
+    return stale
+
+
+def render_plot(data_file: str) -> str:
+    """Render the plot of a data file, with 1 or 2 species."""
+    with np.load(data_file) as data:
+        arrays = [data[name] for name in PLOT_ARRAYS]
+    plt_name = plot_path(data_file)
+    pathlib.Path(plt_name).parent.mkdir(parents=True, exist_ok=True)
+    if arrays[1].ndim == 1:
+        make_plot(*arrays, plt_name)
+    else:
+        make_plot_2sp(*arrays, plt_name)
+    return plt_name
+
+
+def render_plots(data_files: list = None, n_procs: int = None) -> list:
+    """Render the given plots, or all stale ones, in a process pool.
+
+    Returns
+    -------
+    list
+        The names of the rendered plots
+    """
+    if data_files is None:
+        data_files = stale_plots()
+    if n_procs is None:
+        n_procs = os.cpu_count()
+    if mp.current_process().daemon:
+        n_procs = 1
+    if n_procs == 1 or len(data_files) <= 1:
+        return [render_plot(data_file) for data_file in data_files]
+    with mp.Pool(processes=min(n_procs, len(data_files))) as pool:
+        return pool.map(render_plot, data_files, chunksize=1)
+
+
+def make_zy_plot(
+    time_pts: np.array,
+    value_obs: np.array,
+    value_analytical: np.array,
+    stat: np.array,
+    stat_thresh: float,
+    ax,
+):
+    """Make an overlay plot.
+
+    Overlay the analytical and observed values across time. Color the
+    points which violate statistical thresholds differently.
+
+    Parameters
+    ----------
+    time_pts
+        Numpy array of time points.
+    value_obs
+        Observed values at each time point.
+    value_analytical
+        Analytical values at each time point.
+    stat
+        Statistic at each time point.
+    stat_thresh
+        Statistic threshold to color by, same for all time points.
+    ax
+        Axis object to plot on.
+    """
+    ax.plot(time_pts, value_analytical)
+    # The statistic is not defined at the initial time point
+    stat = np.asarray(stat)
+    accurate = (stat >= -stat_thresh) & (stat <= stat_thresh)
+    time_pts, value_obs = np.asarray(time_pts)[1:], np.asarray(value_obs)[1:]
+    ax.plot(time_pts[accurate], value_obs[accurate], ".", color="green")
+    ax.plot(time_pts[~accurate], value_obs[~accurate], ".", color="red")
+
+
+# NOTE: Use calculate_ms_ratios function instead
+def make_ratio_plot(
+    time_pts: np.array,
+    value_obs: np.array,
+    value_analytical: np.array,
+    stat_thresh: list,
+    ax,
+):
+    """Make a plot of ratios of observed means to analytical means
+
+    """
+    stat_lb, stat_ub = stat_thresh[0], stat_thresh[1]
+    ax.axhline(y=1.0, alpha=0.8, color="black")
+    ax.axhline(y=stat_lb, linestyle="--", color="black")
+    ax.axhline(y=stat_ub, linestyle="--", color="black")
+    time_pts = np.asarray(time_pts)
+    value_analytical = np.asarray(value_analytical)
+    defined = value_analytical != 0
+    ratio = np.asarray(value_obs)[defined] / value_analytical[defined]
+    time_pts = time_pts[defined]
+    accurate = (ratio >= stat_lb) & (ratio <= stat_ub)
+    ax.plot(time_pts[accurate], ratio[accurate], ".", color="green")
+    ax.plot(time_pts[~accurate], ratio[~accurate], ".", color="red")
+
+
+def make_plot(
+    time_arr: np.array,
+    mu_analytical: np.array,
+    std_analytical: np.array,
+    mu_obs: np.array,
+    std_obs: np.array,
+    Z: np.array,
+    Y: np.array,
+    plt_name: str,
+):
+    """Plot simulations vs original values.
+
+    Make a plot to compare simulations vs original values.
+
+    Parameters
+    ----------
+    time_arr
+        List of time points at which analytical solutions are available.
+    mu_analytical
+        List of analytical means at the time points in ``time_arr``.
+    std_analytical
+        List of analytical standard deviations at the time points in
+        ``time_arr``.
+    mu_obs
+        Numpy array of observed mean values.
+    std_obs
+        Numpy array of observed standard deviation values.
+    Z
+        Numpy array of calculated Z values.
+    Y
+        Numpy array of calculated Y values.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.lines import Line2D
+
+    fig, ax = plt.subplots(2, 2, sharex="col", constrained_layout=True)
+    name = plt_name.split("/")[1].split(".")[0]
+    fig.suptitle(name)
+    make_zy_plot(time_arr, mu_obs, mu_analytical, Z, 3, ax[0, 0])
+    ax[0, 0].set_ylabel(r"$\mu$")
+    make_zy_plot(time_arr, std_obs, std_analytical, Y, 5, ax[0, 1])
+    ax[0, 1].set_ylabel(r"$\sigma$")
+    make_ratio_plot(time_arr, mu_obs, mu_analytical, [0.98, 1.02], ax[1, 0])
+    ax[1, 0].set_ylabel(r"$\mu$ ratio")
+    ax[1, 0].set_xlabel("Time")
+    make_ratio_plot(time_arr, std_obs, std_analytical, [0.98, 1.02], ax[1, 1])
+    ax[1, 1].set_ylabel(r"$\sigma$ ratio")
+    ax[1, 1].set_xlabel("Time")
+    green_patch = Line2D(
+        [0], [0], marker=".", color="w", markerfacecolor="green", markersize=15
+    )
+    red_patch = Line2D(
+        [0], [0], marker=".", color="w", markerfacecolor="red", markersize=15
+    )
+    analytical_patch = Line2D([0], [0])
+    ratio_patch = Line2D([0], [0], color="black")
+    ratioborder_patch = Line2D([0], [0], linestyle="--", color="black")
+    text_labels = [
+        "Accurate (Simulation)",
+        "Inaccurate (Simulation)",
+        "Analytical solution",
+        "Ratio (expected)",
+        "Ratio (threshold)",
+    ]
+    lgd = fig.legend(
+        [green_patch, red_patch, analytical_patch, ratio_patch, ratioborder_patch],
+        text_labels,
+        loc="upper left",
+        bbox_to_anchor=(1.02, 0.9),
+        fontsize="small",
+    )
+    fig.savefig(plt_name, bbox_extra_artists=(lgd,), bbox_inches="tight")
+    plt.close(fig)
+
+
+def make_plot_2sp(
+    time_arr: np.array,
+    mu_analytical: np.array,
+    std_analytical: np.array,
+    mu_obs: np.array,
+    std_obs: np.array,
+    Z: np.array,
+    Y: np.array,
+    plt_name: str,
+):
+    """Plot simulations vs original values.
+
+    Make a plot to compare simulations vs original values.
+
+    Parameters
+    ----------
+    time_arr
+        List of time points at which analytical solutions are available.
+    mu_analytical
+        List of analytical means at the time points in ``time_arr``.
+    std_analytical
+        List of analytical standard deviations at the time points in
+        ``time_arr``.
+    mu_obs
+        Numpy array of observed mean values.
+    std_obs
+        Numpy array of observed standard deviation values.
+    Z
+        Numpy array of calculated Z values.
+    Y
+        Numpy array of calculated Y values.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(4, 2, sharex="col", figsize=(8, 16), constrained_layout=True)
+    name = plt_name.split("/")[1].split(".")[0]
+    fig.suptitle(name)
+    make_zy_plot(time_arr, mu_obs[:, 0], mu_analytical[:, 0], Z[:, 0], 3, ax[0, 0])
+    ax[0, 0].set_ylabel("Observed mean - S1")
+    make_zy_plot(time_arr, std_obs[:, 0], std_analytical[:, 0], Y[:, 0], 5, ax[0, 1])
+    ax[0, 1].set_ylabel("Observed sd - S1")
+    make_ratio_plot(time_arr, mu_obs[:, 0], mu_analytical[:, 0], [0.98, 1.02], ax[1, 0])
+    ax[1, 0].set_ylabel(r"$\mu$ ratio - S1")
+    make_ratio_plot(
+        time_arr, std_obs[:, 0], std_analytical[:, 0], [0.98, 1.02], ax[1, 1]
+    )
+    ax[1, 1].set_ylabel(r"$\sigma$ ratio - S1")
+    make_zy_plot(time_arr, mu_obs[:, 1], mu_analytical[:, 1], Z[:, 1], 3, ax[2, 0])
+    ax[2, 0].set_ylabel("Observed mean - S2")
+    make_zy_plot(time_arr, std_obs[:, 1], std_analytical[:, 1], Y[:, 1], 5, ax[2, 1])
+    ax[2, 1].set_ylabel("Observed sd - S2")
+    make_ratio_plot(time_arr, mu_obs[:, 1], mu_analytical[:, 1], [0.98, 1.02], ax[3, 0])
+    ax[3, 0].set_ylabel(r"$\mu$ ratio - S2")
+    ax[3, 0].set_xlabel("time")
+    make_ratio_plot(
+        time_arr, std_obs[:, 1], std_analytical[:, 1], [0.98, 1.02], ax[3, 1]
+    )
+    ax[3, 1].set_ylabel(r"$\sigma$ ratio - S2")
+    ax[3, 1].set_xlabel("time")
+    fig.savefig(plt_name)
+    plt.close(fig)
@@ -0,0 +1,60 @@
+"""
+    Per-replicate seeds derived from a master seed.
+
+    Replicate ``i`` (numbered from 0 over the whole job) of a run with master
+    seed ``m`` gets its own random stream, which only depends on ``m`` and
+    ``i``, so a job gives bit-identical results however its replicates are
+    split into shards.
+
+    The NumPy-based runners seed the generator of each replicate with the
+    entropy of ``np.random.SeedSequence(m).spawn(n)[i]``, four 32-bit words
+    hashed from ``m`` and ``i`` (``replicate_entropy``). The streams of
+    different replicates are thus statistically independent and, with 128
+    bits of state, never start from the same seed.
+
+    Libraries that only take an integer seed, Tellurium, Julia and R, use
+    ``replicate_seeds``::
+
+        seed_i = (m * 1000003 + i) mod (2^31 - 1)
+
+    These seeds are distinct for every replicate of a job, fit in a 32-bit
+    signed integer and are exact in R's doubles, so the Julia and R runners
+    derive the same seeds. They are only distinct starting points: each
+    library scrambles its seed into the state of its own generator. They are
+    also the seeds recorded in the trajectory stores, as the number of each
+    replicate.
+"""
+
+import numpy as np
+
+SEED_MULTIPLIER = 1_000_003
+SEED_MODULUS = 2 ** 31 - 1
+ENTROPY_WORDS = 4
+
+
+def replicate_seeds(master_seed: int, first_rep: int, n_rep: int) -> np.ndarray:
+    """Return the seeds of replicates first_rep to first_rep + n_rep - 1."""
+    reps = np.arange(first_rep, first_rep + n_rep, dtype=np.int64)
+    return (master_seed % SEED_MODULUS * SEED_MULTIPLIER + reps) % SEED_MODULUS
+
+
+def replicate_entropy(master_seed: int, first_rep: int, n_rep: int) -> np.ndarray:
+    """
+        Return the seed entropy of replicates first_rep to first_rep + n_rep - 1
+
+        Returns
+        -------
+        np.ndarray
+            The ``(n_rep, 4)`` uint32 words of each replicate, the state of
+            the child ``i`` of ``np.random.SeedSequence(master_seed)``. They
+            seed ``np.random.seed`` and ``np.random.default_rng`` directly.
+    """
+    return np.array(
+        [
+            np.random.SeedSequence(master_seed, spawn_key=(rep,)).generate_state(
+                ENTROPY_WORDS
+            )
+            for rep in range(first_rep, first_rep + n_rep)
+        ],
+        dtype=np.uint32,
+    ).reshape(n_rep, ENTROPY_WORDS)
@@ -0,0 +1,261 @@
+"""
+    Sequential accuracy testing with early stopping.
+
+    Repetitions are added in batches, and after each batch every one of the
+    eight accuracy tests of ``count_failures`` is decided, at every time point
+    (and species), as failed, passed or still open. A counter's verdict is
+    settled once one of its tests has failed or all of them have passed, and
+    the run can stop as soon as all eight verdicts are settled, which takes
+    far fewer repetitions than the fixed ``nrep_max`` when a library is
+    clearly inaccurate.
+
+    A test is decided by stochastic curtailment: given the ``n`` repetitions
+    added so far, the statistic the fixed test would compute at ``nrep_max``
+    has a normal predictive distribution (flat prior) centred on its current
+    extrapolation, whose spread is that of the estimate from the remaining
+    ``nrep_max - n`` repetitions. The spreads use the observed second and
+    fourth moments, so they hold for the skewed distributions of small
+    molecule counts. A test is decided once the predictive probability of the
+    fixed test failing is below ``error_rate * df`` or above
+    ``1 - error_rate * df``, where ``df`` is the fraction of ``nrep_max`` added
+    since the last look. The error rate is thus spent over the looks
+    (Bonferroni), so each decision differs from that of the fixed test with
+    probability of about ``error_rate`` at most, however many looks are taken.
+"""
+
+import numpy as np
+
+from .helpers import (
+    calculate_ms_ratios,
+    concatenate_results,
+    get_states_on_grid,
+    interpolate_states,
+)
+from .streaming import RunningZY
+
+OPEN, PASSED, FAILED = -1, 0, 1
+# (statistic, direction, threshold) of each counter of count_failures
+TESTS = [
+    ("Z", -1, 3.0),
+    ("Z", 1, 3.0),
+    ("Y", -1, 5.0),
+    ("Y", 1, 5.0),
+    ("mu_ratio", -1, 0.98),
+    ("mu_ratio", 1, 1.02),
+    ("std_ratio", -1, 0.98),
+    ("std_ratio", 1, 1.02),
+]
+
+
+def _norm_cdf(x):
+    from scipy.special import ndtr
+
+    return ndtr(x)
+
+
+class SequentialAccuracyTest:
+    """Accuracy test that stops early by stochastic curtailment.
+
+    Parameters
+    ----------
+    time_arr
+        List of time points at which analytical solutions are available.
+    mu_analytical
+        List of analytical means at the time points in ``time_arr``.
+    std_analytical
+        List of analytical standard deviations at the time points in
+        ``time_arr``.
+    algorithm
+        Name of the algorithm whose repetitions are added.
+    nrep_max
+        The maximum number of repetitions, that of the fixed test.
+    saved_results_interpolated
+        Flag denoting whether added repetitions are already interpolated at
+        ``time_arr``.
+    error_rate
+        The probability, spent over the looks, that a decision differs from
+        that of the fixed test.
+    """
+
+    def __init__(
+        self,
+        time_arr: np.array,
+        mu_analytical: np.array,
+        std_analytical: np.array,
+        algorithm: str,
+        nrep_max: int,
+        saved_results_interpolated: bool = False,
+        error_rate: float = 0.01,
+    ):
+        self.running = RunningZY(
+            time_arr,
+            mu_analytical,
+            std_analytical,
+            algorithm,
+            saved_results_interpolated,
+        )
+        self.nrep_max = nrep_max
+        self.error_rate = error_rate
+        self.decisions = None
+        self._last_fraction = 0.0
+        # Power sums of the deviations from the analytical means, for the
+        # fourth central moment
+        self._power_sums = np.zeros((4,) + self.running.mu_analytical.shape)
+
+    @property
+    def n_rep(self) -> int:
+        return self.running.n_rep
+
+    def add_states(self, states: np.array):
+        """Add a batch of states of shape ``(n_batch, n_time, n_species)``."""
+        states = np.asarray(states, dtype=float)
+        self.running.add_states(states)
+        deviations = states - self.running.mu_analytical
+        for power in range(4):
+            self._power_sums[power] += (deviations ** (power + 1)).sum(axis=0)
+
+    def add(self, t_array: np.array, x_array: np.array):
+        """Add a single repetition with time points and states."""
+        running = self.running
+        states = get_states_on_grid(
+            t_array,
+            x_array,
+            running.time_arr,
+            running.algorithm,
+            running.saved_results_interpolated,
+        )
+        self.add_states(states[None, :, :])
+
+    def add_results(self, res):
+        """Add all repetitions of a ``cayenne.Results`` object."""
+        if len(res) == 0:
+            return
+        self.add_trajectories(*concatenate_results(res))
+
+    def add_trajectories(self, offsets: np.array, time: np.array, states: np.array):
+        """Add repetitions concatenated as in a trajectory store.
+
+        Repetition ``i`` occupies rows ``offsets[i]:offsets[i + 1]`` of
+        ``time`` and ``states``.
+        """
+        running = self.running
+        states = interpolate_states(
+            offsets,
+            time,
+            states,
+            running.time_arr,
+            running.algorithm,
+            running.saved_results_interpolated,
+        )
+        self.add_states(np.swapaxes(states, 0, 1))
+
+    def _fourth_moment(self) -> np.array:
+        s1, s2, s3, s4 = self._power_sums / self.n_rep
+        m4 = s4 - 4 * s1 * s3 + 6 * s1 ** 2 * s2 - 3 * s1 ** 4
+        if self.running._one_species:
+            m4 = m4[:, 0]
+        return m4
+
+    def _predictions(self, fraction: float) -> dict:
+        """Return the predictive means and spreads of the final statistics."""
+        running = self.running
+        n_rep = running.n_rep
+        z_arr, y_arr, mu_obs, std_obs = running.calculate_zy()
+        mu_a, std_a = running.mu_analytical, running.std_analytical
+        if running._one_species:
+            mu_a, std_a = mu_a[:, 0], std_a[:, 0]
+        # Spread of the mean and variance estimates from the remaining reps
+        scale = np.sqrt((1 - fraction) / n_rep)
+        mu_spread = std_obs * scale
+        var_spread = np.sqrt(np.maximum(self._fourth_moment() - std_obs ** 4, 0))
+        var_spread = var_spread * scale
+        n_max = self.nrep_max
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mu_ratio, std_ratio = calculate_ms_ratios(mu_obs, mu_a, std_obs, std_a)
+            predictions = {
+                "Z": (
+                    z_arr / np.sqrt(fraction),
+                    np.sqrt(n_max) * mu_spread[1:] / std_a[1:],
+                ),
+                "Y": (
+                    y_arr / np.sqrt(fraction),
+                    np.sqrt(n_max / 2) * var_spread[1:] / std_a[1:] ** 2,
+                ),
+                "mu_ratio": (mu_ratio, mu_spread / np.abs(mu_a)),
+                "std_ratio": (std_ratio, var_spread / (2 * std_obs * std_a)),
+            }
+        return predictions
+
+    def update(self) -> bool:
+        """Decide the open tests with the repetitions added so far.
+
+        Returns
+        -------
+        bool
+            True if the verdicts of all counters are settled
+        """
+        fraction = min(self.n_rep / self.nrep_max, 1.0)
+        spent = max(fraction - self._last_fraction, 0.0)
+        self._last_fraction = fraction
+        predictions = self._predictions(fraction)
+        if self.decisions is None:
+            self.decisions = [
+                np.full(predictions[name][0].shape, OPEN, dtype=np.int8)
+                for name, _, _ in TESTS
+            ]
+        # Nothing is spent on a look without new repetitions
+        error = self.error_rate * spent
+        for decisions, (name, direction, threshold) in zip(self.decisions, TESTS):
+            mean, spread = predictions[name]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # Expected margin of the final statistic beyond the threshold
+                if name in ("Z", "Y"):
+                    margin = direction * mean - threshold
+                else:
+                    margin = direction * (mean - threshold)
+                p_fail = _norm_cdf(margin / spread)
+                fail = p_fail > 1 - error
+                passed = p_fail < error
+                # At nrep_max and for deterministic statistics, decide like
+                # the fixed test
+                exact = (spread == 0) | ~np.isfinite(spread) | ~np.isfinite(margin)
+                fail = np.where(exact, margin > 0, fail)
+                passed = np.where(exact, ~(margin > 0), passed)
+            is_open = decisions == OPEN
+            decisions[is_open & fail] = FAILED
+            decisions[is_open & passed] = PASSED
+        return self.settled
+
+    @property
+    def settled(self) -> bool:
+        """True once the verdict of every counter is settled.
+
+        A counter fails as soon as one of its tests fails, and passes once
+        all its tests have passed.
+        """
+        return self.decisions is not None and all(
+            (decisions == FAILED).any() or (decisions != OPEN).all()
+            for decisions in self.decisions
+        )
+
+    def failed_list(self):
+        """Return the failed test counts, as returned by ``test_accuracy``.
+
+        The count of a failed counter with open tests is a lower bound, so
+        these counts are not comparable with those of the fixed test.
+        """
+        return [int((decisions == FAILED).sum()) for decisions in self.decisions]
+
+    def open_list(self):
+        """Return the number of tests of each type that are still open."""
+        return [int((decisions == OPEN).sum()) for decisions in self.decisions]
+
+    def report(self) -> dict:
+        """Return the verdict and the number of repetitions it needed."""
+        return {
+            "nrep": self.n_rep,
+            "nrep_max": self.nrep_max,
+            "settled": self.settled,
+            "failed_list": self.failed_list(),
+            "open_list": self.open_list(),
+        }
@@ -0,0 +1,188 @@
+"""
+    Streaming computation of the accuracy statistics.
+
+    Repetitions are folded into running per-time-point means and sums of
+    squared deviations as soon as they are simulated, so the Z/Y statistics
+    can be computed with memory proportional to the number of analytical time
+    points instead of the number of repetitions.
+"""
+
+import json
+import os
+import pathlib
+
+import numpy as np
+
+from .helpers import (
+    calculate_ms_ratios,
+    concatenate_results,
+    count_failures,
+    get_states_on_grid,
+    interpolate_states,
+)
+
+
+def summary_path(model: str, library: str, algo: str) -> str:
+    """Return the streaming summary file name for a model, library and algorithm."""
+    return f"results/{model}/{library}_{algo}.zy.json"
+
+
+class RunningZY:
+    """Running accumulator of the Z and Y statistics.
+
+    Parameters
+    ----------
+    time_arr
+        List of time points at which analytical solutions are available.
+    mu_analytical
+        List of analytical means at the time points in ``time_arr``, of shape
+        ``(n_time,)`` for 1 species or ``(n_time, n_species)``.
+    std_analytical
+        List of analytical standard deviations, same shape as
+        ``mu_analytical``.
+    algorithm
+        Name of the algorithm whose repetitions are added. Decides how states
+        are interpolated between events.
+    saved_results_interpolated
+        Flag denoting whether added repetitions are already interpolated at
+        ``time_arr``.
+
+    Notes
+    -----
+    Batches are merged with the pairwise update of Chan et al., which stays
+    accurate for large means and many repetitions. The standard deviation is
+    the population one, as returned by ``np.std``.
+    """
+
+    def __init__(
+        self,
+        time_arr: np.array,
+        mu_analytical: np.array,
+        std_analytical: np.array,
+        algorithm: str,
+        saved_results_interpolated: bool = False,
+    ):
+        self.time_arr = np.asarray(time_arr, dtype=float)
+        mu_analytical = np.asarray(mu_analytical, dtype=float)
+        self._one_species = mu_analytical.ndim == 1
+        n_time = self.time_arr.shape[0]
+        self.mu_analytical = mu_analytical.reshape(n_time, -1)
+        self.std_analytical = np.asarray(std_analytical, dtype=float).reshape(
+            n_time, -1
+        )
+        self.algorithm = algorithm
+        self.saved_results_interpolated = saved_results_interpolated
+        self.n_rep = 0
+        self._mean = np.zeros(self.mu_analytical.shape)
+        self._m2 = np.zeros(self.mu_analytical.shape)
+
+    def add_states(self, states: np.array):
+        """Add a batch of states of shape ``(n_batch, n_time, n_species)``."""
+        states = np.asarray(states, dtype=float)
+        n_batch = states.shape[0]
+        if n_batch == 0:
+            return
+        mean_batch = states.mean(axis=0)
+        m2_batch = ((states - mean_batch) ** 2).sum(axis=0)
+        n_total = self.n_rep + n_batch
+        delta = mean_batch - self._mean
+        self._mean += delta * n_batch / n_total
+        self._m2 += m2_batch + delta ** 2 * self.n_rep * n_batch / n_total
+        self.n_rep = n_total
+
+    def add(self, t_array: np.array, x_array: np.array):
+        """Add a single repetition with time points and states."""
+        states = get_states_on_grid(
+            t_array,
+            x_array,
+            self.time_arr,
+            self.algorithm,
+            self.saved_results_interpolated,
+        )
+        self.add_states(states[None, :, :])
+
+    def add_results(self, res):
+        """Add all repetitions of a ``cayenne.Results`` object."""
+        if len(res) == 0:
+            return
+        offsets, time, states = concatenate_results(res)
+        states = interpolate_states(
+            offsets,
+            time,
+            states,
+            self.time_arr,
+            self.algorithm,
+            self.saved_results_interpolated,
+        )
+        self.add_states(np.swapaxes(states, 0, 1))
+
+    def calculate_zy(self):
+        """Calculate Z and Y from the repetitions added so far.
+
+        Returns
+        -------
+        z_arr
+            Numpy array of calculated Z values.
+        y_arr
+            Numpy array of calculated Y values.
+        mu_obs_arr
+            Numpy array of observed mean values.
+        std_obs_arr
+            Numpy array of observed standard deviation values.
+
+        See Also
+        --------
+        accuracy.helpers.calculate_zy: The same statistics from stored results.
+        """
+        if self.n_rep == 0:
+            raise ValueError("No repetitions have been added")
+        n_rep = self.n_rep
+        mu_obs = self._mean.copy()
+        std_obs = np.sqrt(self._m2 / n_rep)
+        # Same conventions as calculate_zy for the initial time point
+        mu_obs[0] = self.mu_analytical[0]
+        std_obs[0] = 0.0
+        mu_a, std_a = self.mu_analytical[1:], self.std_analytical[1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z_arr = np.sqrt(n_rep) * (mu_obs[1:] - mu_a) / std_a
+            y_arr = np.sqrt(n_rep / 2) * ((std_obs[1:] ** 2) / (std_a ** 2) - 1)
+        if self._one_species:
+            return z_arr[:, 0], y_arr[:, 0], mu_obs[:, 0], std_obs[:, 0]
+        return z_arr, y_arr, mu_obs, std_obs
+
+    def failed_list(self):
+        """Return the failed test counts, as returned by ``test_accuracy``."""
+        z_arr, y_arr, mu_obs, std_obs = self.calculate_zy()
+        mu_analytical, std_analytical = self.mu_analytical, self.std_analytical
+        if self._one_species:
+            mu_analytical, std_analytical = mu_analytical[:, 0], std_analytical[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mu_ratio, std_ratio = calculate_ms_ratios(
+                mu_obs, mu_analytical, std_obs, std_analytical
+            )
+        return count_failures(z_arr, y_arr, mu_ratio, std_ratio)
+
+    def summary(self):
+        """Return the statistics as a JSON serializable dictionary."""
+        z_arr, y_arr, mu_obs, std_obs = self.calculate_zy()
+        return {
+            "nrep": self.n_rep,
+            "failed_list": self.failed_list(),
+            "time": self.time_arr.tolist(),
+            "Z": z_arr.tolist(),
+            "Y": y_arr.tolist(),
+            "mu_obs": mu_obs.tolist(),
+            "std_obs": std_obs.tolist(),
+        }
+
+    def write_summary(self, file_name: str):
+        """Write the statistics to a JSON file."""
+        os.makedirs(pathlib.Path(file_name).parent, exist_ok=True)
+        with open(file_name, "w") as fid:
+            json.dump(self.summary(), fid, allow_nan=True)
+
+
+def read_summary(file_name: str):
+    """Read a streaming summary written by ``RunningZY.write_summary``."""
+    with open(file_name) as fid:
+        return json.load(fid)
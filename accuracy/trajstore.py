@@ -0,0 +1,201 @@
+"""
+    Single-file, memory-mappable store for ragged simulation trajectories.
+
+    Every repetition of a (model, library, algorithm) run is concatenated into
+    one time column and one state block, with an offsets index marking where
+    each repetition starts. All fields are little-endian and 8-byte aligned::
+
+        magic       8 bytes, b"CAYTRJ01"
+        n_rep       int64
+        n_species   int64
+        n_rows      int64
+        offsets     int64[n_rep + 1]
+        status      int64[n_rep]
+        seeds       int64[n_rep]
+        time        float64[n_rows]
+        states      float64[n_rows, n_species] (row-major)
+
+    Repetition ``i`` occupies rows ``offsets[i]:offsets[i + 1]``. The layout is
+    simple enough to be written from Julia (``write``) and R (``writeBin``)
+    without any extra dependencies.
+
+    Exact trajectories can also be stored as compact event logs (see
+    ``eventlog.py``), which are read by the same functions.
+"""
+
+from collections import namedtuple
+import os
+import pathlib
+from typing import List
+
+import numpy as np
+
+MAGIC = b"CAYTRJ01"
+STORE_SUFFIX = ".traj"
+_HEADER_SIZE = len(MAGIC) + 3 * 8
+
+TrajectoryStore = namedtuple(
+    "TrajectoryStore", ["offsets", "status", "seeds", "time", "states"]
+)
+
+
+def store_path(model: str, library: str, algo: str) -> str:
+    """Return the store file name for a model, library and algorithm."""
+    return f"results/{model}/{library}_{algo}{STORE_SUFFIX}"
+
+
+def write_trajectories(
+    file_name: str,
+    t_list: List[np.ndarray],
+    x_list: List[np.ndarray],
+    status_list: List[int] = None,
+    sim_seeds: List[int] = None,
+):
+    """Write a list of trajectories to a single store file.
+
+    Parameters
+    ----------
+    file_name
+        Path of the store file. Parent folders are created if needed.
+    t_list
+        List of time points for each repetition.
+    x_list
+        List of system states for each repetition, each of shape
+        ``(len(t), n_species)``.
+    status_list
+        List of return status for each repetition. Defaults to zeros.
+    sim_seeds
+        List of seeds used for each repetition. Defaults to zeros.
+    """
+    n_rep = len(t_list)
+    if n_rep != len(x_list):
+        raise ValueError("t_list and x_list have different lengths")
+    if status_list is None:
+        status_list = np.zeros(n_rep)
+    if sim_seeds is None:
+        sim_seeds = np.zeros(n_rep)
+    n_species = x_list[0].shape[1] if n_rep else 0
+    offsets = np.zeros(n_rep + 1, dtype="<i8")
+    offsets[1:] = np.cumsum([len(t) for t in t_list])
+    os.makedirs(pathlib.Path(file_name).parent, exist_ok=True)
+    # Write to a temporary file first so an interrupted write never leaves
+    # a truncated store behind
+    tmp_name = f"{file_name}.tmp"
+    with open(tmp_name, "wb") as fid:
+        fid.write(MAGIC)
+        fid.write(np.array([n_rep, n_species, offsets[-1]], dtype="<i8").tobytes())
+        fid.write(offsets.tobytes())
+        fid.write(np.asarray(status_list, dtype="<i8").tobytes())
+        fid.write(np.asarray(sim_seeds, dtype="<i8").tobytes())
+        for t in t_list:
+            fid.write(np.ascontiguousarray(t, dtype="<f8").tobytes())
+        for t, x in zip(t_list, x_list):
+            x = np.ascontiguousarray(x, dtype="<f8").reshape(len(t), n_species)
+            fid.write(x.tobytes())
+    os.replace(tmp_name, file_name)
+
+
+def _is_event_log(file_name: str) -> bool:
+    from .eventlog import EVENT_MAGIC
+
+    with open(file_name, "rb") as fid:
+        return fid.read(len(EVENT_MAGIC)) == EVENT_MAGIC
+
+
+def read_header(file_name: str):
+    """Return ``(n_rep, n_species, n_rows)`` of a store without reading it.
+
+    Raises ``OSError`` if the file is not a complete store or event log.
+    """
+    if _is_event_log(file_name):
+        from .eventlog import read_event_header
+
+        header = read_event_header(file_name)
+        return header["n_rep"], header["n_species"], header["n_rows"]
+    with open(file_name, "rb") as fid:
+        header = fid.read(_HEADER_SIZE)
+    if len(header) != _HEADER_SIZE or header[: len(MAGIC)] != MAGIC:
+        raise OSError(f"{file_name} is not a trajectory store")
+    n_rep, n_species, n_rows = np.frombuffer(header[len(MAGIC) :], dtype="<i8")
+    expected_size = _HEADER_SIZE + 8 * (3 * n_rep + 1 + n_rows * (1 + n_species))
+    if os.path.getsize(file_name) != expected_size:
+        raise OSError(f"{file_name} is truncated or corrupt")
+    return int(n_rep), int(n_species), int(n_rows)
+
+
+def read_trajectories(file_name: str, mmap: bool = True) -> TrajectoryStore:
+    """Open a store file.
+
+    Parameters
+    ----------
+    file_name
+        Path of the store file.
+    mmap
+        If True (default), the arrays are memory-mapped read-only views of
+        the file. Else they are read into memory. Event logs are always
+        decoded into memory.
+
+    Returns
+    -------
+    TrajectoryStore
+        Named tuple of ``offsets``, ``status``, ``seeds``, ``time`` and
+        ``states`` arrays.
+    """
+    if _is_event_log(file_name):
+        from .eventlog import read_event_log
+
+        return read_event_log(file_name)
+    n_rep, n_species, n_rows = read_header(file_name)
+    fields = [
+        ("offsets", "<i8", (n_rep + 1,)),
+        ("status", "<i8", (n_rep,)),
+        ("seeds", "<i8", (n_rep,)),
+        ("time", "<f8", (n_rows,)),
+        ("states", "<f8", (n_rows, n_species)),
+    ]
+    arrays = {}
+    offset = _HEADER_SIZE
+    for name, dtype, shape in fields:
+        count = int(np.prod(shape))
+        if count == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        elif mmap:
+            arrays[name] = np.memmap(
+                file_name, dtype=dtype, mode="r", offset=offset, shape=shape
+            )
+        else:
+            arrays[name] = np.fromfile(
+                file_name, dtype=dtype, count=count, offset=offset
+            ).reshape(shape)
+        offset += count * 8
+    return TrajectoryStore(**arrays)
+
+
+def merge_trajectories(file_names: List[str], out_file: str):
+    """Concatenate several stores, in order, into a single store.
+
+    The merged store is an event log if all the stores are (see
+    ``eventlog.merge_event_logs``).
+
+    Parameters
+    ----------
+    file_names
+        Paths of the stores to merge.
+    out_file
+        Path of the merged store.
+    """
+    if file_names and all(_is_event_log(file_name) for file_name in file_names):
+        from .eventlog import merge_event_logs
+
+        merge_event_logs(file_names, out_file)
+        return
+    t_list, x_list, status_list, sim_seeds = [], [], [], []
+    for file_name in file_names:
+        store = read_trajectories(file_name)
+        offsets = store.offsets.tolist()
+        for i in range(len(offsets) - 1):
+            t_list.append(store.time[offsets[i] : offsets[i + 1]])
+            x_list.append(store.states[offsets[i] : offsets[i + 1]])
+        status_list.extend(store.status.tolist())
+        sim_seeds.extend(store.seeds.tolist())
+    write_trajectories(out_file, t_list, x_list, status_list, sim_seeds)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+
+"""
+    Adaptive benchmarks of the simulation commands.
+
+    Instead of a fixed number of runs, the simulation command is run until
+    the confidence interval of its mean run time is narrow enough: the
+    half-width relative to the mean must fall below a target precision. Fast
+    commands thus get many runs and slow, steady ones only a few. The number
+    of runs is kept between a minimum and a maximum, and no run is started
+    that would exceed the time budget. The results are written in
+    hyperfine's JSON format, with the achieved precision and the reason for
+    stopping next to the timings.
+"""
+
+import json
+import os
+import pathlib
+import resource
+from subprocess import DEVNULL, run
+import time
+
+import click
+import numpy as np
+
+from isolation import interference, sample_cpu
+from phase_benchmarks import summarize_times
+from run_simulations import get_cmd
+
+
+def relative_halfwidth(times: list, confidence: float = 0.95) -> float:
+    """
+        Return the confidence interval half-width of the mean time, relative
+        to the mean
+
+        The interval is Student's t interval, so it is valid for few runs.
+        Returns inf for less than 2 runs.
+    """
+    if len(times) < 2:
+        return np.inf
+    from scipy.stats import t
+
+    times = np.asarray(times, dtype=float)
+    quantile = t.ppf((1 + confidence) / 2, len(times) - 1)
+    halfwidth = quantile * times.std(ddof=1) / np.sqrt(len(times))
+    return float(halfwidth / times.mean())
+
+
+def sample_adaptively(
+    measure,
+    precision: float = 0.02,
+    min_runs: int = 3,
+    max_runs: int = 100,
+    budget: float = 3600.0,
+    warmup: int = 0,
+    confidence: float = 0.95,
+    keep=None,
+):
+    """
+        Call ``measure`` until the mean of the times it returns is precise
+
+        Parameters
+        ----------
+        measure : callable
+            Takes no arguments, runs the benchmark once and returns its time
+        precision : float
+            The target confidence interval half-width, relative to the mean
+        min_runs, max_runs : int
+            The smallest and largest number of timed runs
+        budget : float
+            The seconds that the warmup and timed runs may take in total. A
+            run is not started if the mean run time would exceed it, even
+            if fewer than ``min_runs`` runs are done, but at least one run
+            is timed.
+        warmup : int
+            The number of untimed runs before the timed ones
+        confidence : float
+            The confidence level of the interval
+        keep : callable, optional
+            Takes no arguments and returns False if the last run must be
+            discarded. Discarded runs count towards the budget, and
+            sampling stops once ``max_runs`` runs were discarded.
+
+        Returns
+        -------
+        times : list
+            The times of the timed runs
+        stop_reason : {precision, max_runs, budget, interference}
+            Why no more runs were made
+    """
+    spent = 0.0
+    for _ in range(warmup):
+        spent += measure()
+    times = []
+    n_discarded = 0
+    while True:
+        if len(times) >= min_runs:
+            if relative_halfwidth(times, confidence) <= precision:
+                return times, "precision"
+        if len(times) >= max_runs:
+            return times, "max_runs"
+        if times and spent + np.mean(times) > budget:
+            return times, "budget"
+        if n_discarded >= max_runs:
+            return times, "interference"
+        this_time = measure()
+        spent += this_time
+        if keep is not None and not keep():
+            n_discarded += 1
+            continue
+        times.append(this_time)
+
+
+def time_command(
+    cmd: str,
+    precision: float = 0.02,
+    min_runs: int = 3,
+    max_runs: int = 100,
+    budget: float = 3600.0,
+    warmup: int = 0,
+    confidence: float = 0.95,
+    max_interference: float = None,
+    discard_noisy: bool = False,
+) -> dict:
+    """
+        Time a shell command adaptively, see ``sample_adaptively``
+
+        With ``max_interference``, the CPU time other processes take on the
+        cores this process may run on (see ``isolation.interference``) is
+        sampled around each run. Runs above it are flagged, or discarded
+        and replaced with ``discard_noisy``.
+
+        Returns
+        -------
+        dict
+            The result entry of a hyperfine JSON export, with the relative
+            confidence interval half-width achieved (``precision``), the
+            ``target_precision``, the ``confidence`` level and the
+            ``stop_reason``. With ``max_interference``, the interference of
+            every kept run, the indices of the ``noisy_runs`` among them and
+            the number of ``discarded_runs`` are added.
+    """
+    cores = sorted(os.sched_getaffinity(0))
+    run_interference = []
+    discarded = []
+
+    def measure():
+        before = sample_cpu(cores)
+        start = time.perf_counter()
+        proc = run(cmd, shell=True, stdout=DEVNULL)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(f"{cmd} failed with exit code {proc.returncode}")
+        run_interference.append(interference(before, sample_cpu(cores), len(cores)))
+        return elapsed
+
+    def keep():
+        if discard_noisy and run_interference[-1] > max_interference:
+            discarded.append(run_interference.pop())
+            return False
+        return True
+
+    usage_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    times, stop_reason = sample_adaptively(
+        measure,
+        precision,
+        min_runs,
+        max_runs,
+        budget,
+        warmup,
+        confidence,
+        keep if max_interference is not None else None,
+    )
+    # Warmup runs are sampled too
+    run_interference = run_interference[warmup:]
+    usage_stop = resource.getrusage(resource.RUSAGE_CHILDREN)
+    if not times:
+        raise RuntimeError(f"All runs of {cmd} were discarded for interference")
+    n_runs = max(warmup + len(times), 1)
+    result = {"command": cmd}
+    result.update(summarize_times(times))
+    result["user"] = (usage_stop.ru_utime - usage_start.ru_utime) / n_runs
+    result["system"] = (usage_stop.ru_stime - usage_start.ru_stime) / n_runs
+    achieved = relative_halfwidth(times, confidence)
+    result["precision"] = achieved if np.isfinite(achieved) else None
+    result["target_precision"] = precision
+    result["confidence"] = confidence
+    result["stop_reason"] = stop_reason
+    result["warmup"] = warmup
+    if max_interference is not None:
+        result["cores"] = cores
+        result["interference"] = run_interference
+        result["max_interference"] = max_interference
+        result["noisy_runs"] = [
+            i for i, value in enumerate(run_interference) if value > max_interference
+        ]
+        result["discarded_runs"] = len(discarded)
+    return result
+
+
+@click.command()
+@click.option(
+    "--lib",
+    "-l",
+    type=str,
+    help="The stochastic simulation library. Supported libraries: cayenne, BioSimulator, BioSimulatorIntp, ensemble, GillespieSSA, Tellurium.",
+)
+@click.option("--model", "-m", type=str, help="The DSMTS ID of the model to benchmark")
+@click.option(
+    "--algo",
+    "-a",
+    type=str,
+    help="The stochastic algorithm to benchmark. Supported algorithms: direct, tau_leaping, tau_adaptive.",
+)
+@click.option(
+    "--nrep", "-n", type=int, help="The number of repetitions in the simulation"
+)
+@click.option(
+    "--precision",
+    default=0.02,
+    type=float,
+    help="The target confidence interval half-width of the mean time, relative to the mean",
+)
+@click.option("--min-runs", default=3, type=int, help="The minimum number of runs")
+@click.option("--max-runs", default=100, type=int, help="The maximum number of runs")
+@click.option(
+    "--budget",
+    default=3600.0,
+    type=float,
+    help="The seconds that all runs may take in total",
+)
+@click.option(
+    "--warmup", "-w", default=0, type=int, help="The number of untimed warmup runs"
+)
+@click.option(
+    "--max-interference",
+    type=float,
+    help="Flag runs in which other processes used more than this fraction of the cores the benchmark may run on",
+)
+@click.option(
+    "--discard-noisy/--flag-noisy",
+    default=False,
+    help="Discard and replace the runs flagged by --max-interference",
+)
+@click.option(
+    "--export-json", "-o", type=str, help="The file to write the benchmark results to"
+)
+def main(
+    lib: str,
+    model: str,
+    algo: str,
+    nrep: int,
+    precision: float,
+    min_runs: int,
+    max_runs: int,
+    budget: float,
+    warmup: int,
+    max_interference: float,
+    discard_noisy: bool,
+    export_json: str,
+) -> None:
+    """
+        Time the simulation command of a given library (lib), model ID
+        (model) and algorithm (algo) until the mean time is precise.
+
+        Examples:
+
+        python adaptive_benchmarks.py -l cayenne -m 00001 -a direct -n 10000 --precision 0.01 -o benchmarks/adaptive/cayenne-direct-00001-10000.json
+    """
+    cmd = get_cmd(lib, model, algo, nrep, write=False)
+    result = time_command(
+        cmd,
+        precision,
+        min_runs,
+        max_runs,
+        budget,
+        warmup,
+        max_interference=max_interference,
+        discard_noisy=discard_noisy,
+    )
+    precision_str = (
+        "n/a" if result["precision"] is None else f"{result['precision']:.2%}"
+    )
+    print(
+        f"{result['mean']:.4f} s ± {precision_str} after {len(result['times'])} runs "
+        f"(stopped on {result['stop_reason']})"
+    )
+    if max_interference is not None:
+        print(
+            f"{len(result['noisy_runs'])} noisy runs kept, "
+            f"{result['discarded_runs']} discarded"
+        )
+    if export_json:
+        fpath = pathlib.Path(export_json)
+        fpath.parent.mkdir(parents=True, exist_ok=True)
+        with open(fpath, "w") as fid:
+            json.dump({"results": [result]}, fid, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+# Long-lived worker that runs make_biosim_results.jl jobs read from stdin.
+# Each line holds the command line arguments of one job. Packages are loaded
+# and compiled once, so only the first job pays for JIT compilation.
+
+include("make_biosim_results.jl")
+
+println("WORKER_READY")
+flush(stdout)
+for line in eachline(stdin)
+    args = String.(split(strip(line)))
+    if isempty(args)
+        continue
+    end
+    start = time()
+    try
+        main(args)
+        println("\nWORKER_DONE ", time() - start)
+    catch err
+        println("\nWORKER_ERROR ", replace(sprint(showerror, err), "\n" => " "))
+    end
+    flush(stdout)
+end
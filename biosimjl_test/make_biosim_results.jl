@@ -1,11 +1,14 @@
 using BioSimulator
-using CSV
 using DataFrames
+using Random
 using BioSimulator: tablefy
 
 include("models.jl")
 
-function run_model(model, algorithm, nreps, interpolation)
+# Seed of replicate rep of a job, see accuracy/seeds.py
+replicate_seed(master_seed, rep) = mod(mod(master_seed, 2147483647) * 1000003 + rep, 2147483647)
+
+function run_model(model, algorithm, nreps, interpolation, seeds=nothing)
     # simulation parameters
     time_final = 51.0
     # simulate
@@ -19,39 +22,74 @@ function run_model(model, algorithm, nreps, interpolation)
     else
         error("Unsupported algorithm")
     end
-    if interpolation == "True"
-        results = [simulate(model, algo_func, tfinal=time_final, save_points=0:1:time_final) for _ in 1:nreps]
-    else
-        results = [simulate(model, algo_func, tfinal=time_final, save_points=nothing) for _ in 1:nreps]
+    save_points = interpolation == "True" ? (0:1:time_final) : nothing
+    results = []
+    for i in 1:nreps
+        if seeds !== nothing
+            Random.seed!(seeds[i])
+        end
+        push!(results, simulate(model, algo_func, tfinal=time_final, save_points=save_points))
     end
     return results
 end
 
-function write_results(results, dir_name, nspecies)
-    mkpath(dir_name)
-    for i = 1:length(results)
-        file_name = string(dir_name, i, ".csv")
-        CSV.write(file_name, DataFrame(tablefy(results[i])), delim=',', writeheader=false)
+# Write all repetitions to a single trajectory store (see accuracy/trajstore.py)
+function write_results(results, file_name, seeds=nothing)
+    mkpath(dirname(file_name))
+    tables = [Matrix{Float64}(DataFrame(tablefy(result))) for result in results]
+    nreps = length(tables)
+    nspecies = size(tables[1], 2) - 1
+    offsets = vcat(0, cumsum([size(table, 1) for table in tables]))
+    open(file_name, "w") do io
+        write(io, b"CAYTRJ01")
+        write(io, Int64[nreps, nspecies, offsets[end]])
+        write(io, Int64.(offsets))
+        # status is not reported by BioSimulator, seeds only for shards
+        write(io, zeros(Int64, nreps))
+        write(io, seeds === nothing ? zeros(Int64, nreps) : Int64.(seeds))
+        for table in tables
+            write(io, table[:, 1])
+        end
+        for table in tables
+            # Julia writes column-major, so transpose to get row-major states
+            write(io, permutedims(table[:, 2:end]))
+        end
     end
 end
 
-# Actual execution
-model_name = ARGS[1]
-algorithm = ARGS[2]
-nreps = parse(Int64, ARGS[3])
-interpolation = ARGS[4]
-write_results_flag = ARGS[5]
-model = get_model(model_name)
-if model_name == "00030" || model_name == "00031"
-    nspecies = 2
-else
-    nspecies = 1
+# Run one job, with the same arguments as the command line
+function main(args)
+    model_name = args[1]
+    algorithm = args[2]
+    nreps = parse(Int64, args[3])
+    interpolation = args[4]
+    write_results_flag = args[5]
+    # Optional output file, seed and first replicate, used to generate a
+    # shard of repetitions (the seed is then the job's master seed)
+    if length(args) >= 7
+        Random.seed!(parse(Int64, args[7]))
+    end
+    seeds = nothing
+    if length(args) >= 8
+        first_rep = parse(Int64, args[8])
+        seeds = [replicate_seed(parse(Int64, args[7]), first_rep + i) for i in 0:(nreps - 1)]
+    end
+    model = get_model(model_name)
+    results = run_model(model, algorithm, nreps, interpolation, seeds)
+    folder_name = interpolation == "True" ? "/BioSimulatorIntp_" : "/BioSimulator_"
+    if length(args) >= 6
+        file_name = args[6]
+    else
+        file_name = string("./results/", model_name, folder_name, algorithm, ".traj")
+    end
+    if write_results_flag == "True"
+        write_results(results, file_name, seeds)
+    else
+        print("Not saving results")
+    end
 end
-results = run_model(model, algorithm, nreps, interpolation)
-folder_name = interpolation == "True" ? "/BioSimulatorIntp_" : "/BioSimulator_"
-dir_name = string("./results/", model_name, folder_name, algorithm, "/")
-if write_results_flag == "True"
-    write_results(results, dir_name, nspecies)
-else
-    print("Not saving results")
+
+# Actual execution, unless included by biosim_worker.jl
+if abspath(PROGRAM_FILE) == @__FILE__
+    main(ARGS)
 end
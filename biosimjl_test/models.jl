@@ -165,6 +165,10 @@ end
 
 
 function get_model(model_name)
+    if startswith(model_name, "syn_")
+        # Synthetic networks are written by synthetic_networks.py
+        return include(joinpath(pwd(), "results", "synthetic", string(model_name, ".jl")))
+    end
     fn_name = string("model_", model_name)
     try
         fn = getfield(Main, Symbol(fn_name))
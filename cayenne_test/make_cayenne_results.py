@@ -1,38 +1,151 @@
 #!/usr/bin/env python3
 
 import pathlib
-import os
 import sys
 
 import numpy as np
 from cayenne import Simulation
+from cayenne.algorithms.direct import direct
+from cayenne.algorithms.tau_adaptive import tau_adaptive
+from cayenne.algorithms.tau_leaping import tau_leaping
+from cayenne.results import Results
 
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 from models import get_model
+from accuracy.accuracy import make_accumulator, read_reference
+from accuracy.eventlog import write_store
+from accuracy.helpers import get_states_on_grid
+from accuracy.seeds import replicate_entropy, replicate_seeds
+from accuracy.streaming import summary_path
 
+STREAM_BATCH_SIZE = 1000
 
-def run_model(model_id, algorithm, n_rep):
+
+def setup_model(model_id):
+    """Build the simulation object of a model with its run settings."""
     species_names, rxn_names, V_r, V_p, X0, k, max_t, max_iter, _ = get_model(model_id)
     sim = Simulation(species_names, rxn_names, V_r, V_p, X0, k)
+    return sim, max_t, max_iter
+
+
+def simulate_model(model, algorithm, n_rep, seed=0, n_procs=1):
+    sim, max_t, max_iter = model
     sim.simulate(
         algorithm=algorithm,
         max_t=max_t,
         max_iter=max_iter,
         chem_flag=False,
         n_rep=n_rep,
+        seed=seed,
+        n_procs=n_procs,
         debug=False,
     )
     return sim.results
 
 
-def write_model(results, dir_path, n_reps):
-    os.makedirs(dir_path, exist_ok=True)
-    for i, (x, t, _) in enumerate(results):
-        file_name = f"{dir_path}/{i + 1}.csv"
-        sim = np.hstack([t.reshape(x.shape[0], 1), x])
-        if x.shape[1] == 1:
-            np.savetxt(file_name, sim, delimiter=",", fmt=["%.8e", "%d"])
-        else:
-            np.savetxt(file_name, sim, delimiter=",", fmt=["%.8e", "%d", "%d"])
+def on_grid(t_array, x_array, time_arr, algorithm):
+    """Return a replicate as its states at the time points of a grid."""
+    states = get_states_on_grid(t_array, x_array, time_arr, algorithm)
+    return np.asarray(time_arr, dtype=float), states
+
+
+def simulate_replicate(model, algorithm, seed):
+    """Simulate one replicate, seeding the algorithm's generator with ``seed``.
+
+    This runs the algorithm as ``Simulation.simulate`` does, with its default
+    settings, but without drawing the seed of the replicate from
+    ``np.random.randint(0, 1e7)``, so any entropy, like an array of 32-bit
+    words, reaches ``np.random.seed`` unchanged.
+    """
+    sim, max_t, max_iter = model
+    common = (sim._react_stoic, sim._prod_stoic, sim._init_state, sim._k_det)
+    if algorithm == "direct":
+        args = (max_t, max_iter, sim._volume, seed, sim._chem_flag)
+        return direct(*common, *args)
+    if algorithm == "tau_leaping":
+        return tau_leaping(*common, 0.1, max_t, sim._volume, seed, sim._chem_flag)
+    if algorithm == "tau_adaptive":
+        hor = sim.HOR.astype(np.int64)
+        args = (hor, 10, 0.03, max_t, max_iter, sim._volume, seed, sim._chem_flag)
+        return tau_adaptive(*common, *args)
+    raise ValueError("Requested algorithm not supported")
+
+
+def simulate_shard(model, algorithm, n_rep, master_seed, first_rep, time_arr=None):
+    """Simulate replicates first_rep onwards, each with its own seed stream.
+
+    The results of a replicate only depend on the master seed and its number
+    (see ``accuracy/seeds.py``), so the shards of a job can be simulated in
+    any number of processes. With ``time_arr``, each replicate is replaced by
+    its states at those time points as soon as it finishes.
+    """
+    sim = model[0]
+    t_list, x_list, status_list = [], [], []
+    entropy = replicate_entropy(master_seed, first_rep, n_rep)
+    for words in entropy:
+        t_array, x_array, status = simulate_replicate(model, algorithm, words)
+        if time_arr is not None:
+            t_array, x_array = on_grid(t_array, x_array, time_arr, algorithm)
+        t_list.append(t_array)
+        x_list.append(x_array)
+        status_list.append(status)
+    seeds = replicate_seeds(master_seed, first_rep, n_rep)
+    return Results(
+        sim.species_names, sim.rxn_names, t_list, x_list, status_list, algorithm, seeds
+    )
+
+
+def run_model(
+    model_id, algorithm, n_rep, seed=0, n_procs=1, first_rep=None, grid=False
+):
+    """Simulate a model, on the analytical time points only with ``grid``."""
+    model = setup_model(model_id)
+    time_arr = read_reference(model_id)[0] if grid else None
+    if first_rep is not None:
+        return simulate_shard(model, algorithm, n_rep, seed, first_rep, time_arr)
+    results = simulate_model(model, algorithm, n_rep, seed, n_procs)
+    if grid:
+        t_list, x_list = [], []
+        for x_array, t_array, _ in results:
+            t_array, x_array = on_grid(t_array, x_array, time_arr, algorithm)
+            t_list.append(t_array)
+            x_list.append(x_array)
+        results = Results(
+            results.species_names,
+            results.rxn_names,
+            t_list,
+            x_list,
+            results.status_list,
+            algorithm,
+            results.sim_seeds,
+        )
+    return results
+
+
+def stream_model(model_id, algorithm, n_rep, seed=0, batch_size=STREAM_BATCH_SIZE):
+    """Fold repetitions into the accuracy statistics batch by batch.
+
+    Only one batch of trajectories is held in memory at a time, the rest are
+    discarded as soon as they are added to the accumulator. The replicates
+    are seeded like those of a stored job with master seed ``seed``.
+    """
+    model = setup_model(model_id)
+    accumulator = make_accumulator(model_id, algorithm)
+    for start in range(0, n_rep, batch_size):
+        n_batch = min(batch_size, n_rep - start)
+        accumulator.add_results(simulate_shard(model, algorithm, n_batch, seed, start))
+    return accumulator
+
+
+def write_model(results, file_path, events=False):
+    write_store(
+        file_path,
+        results.t_list,
+        results.x_list,
+        results.status_list,
+        results.sim_seeds,
+        events,
+    )
 
 
 if __name__ == "__main__":
@@ -40,9 +153,23 @@ if __name__ == "__main__":
     ALGO = sys.argv[2]
     N_REPS = int(sys.argv[3])
     WRITE_RESULTS_FLAG = sys.argv[4]
-    DIR_PATH = pathlib.Path(f"./results/{MODEL_ID}/cayenne_{ALGO}/")
-    results = run_model(MODEL_ID, ALGO, N_REPS)
-    if WRITE_RESULTS_FLAG == "True":
-        write_model(results, DIR_PATH, N_REPS)
+    # Optional output file, seed and first replicate, used to generate a
+    # shard of repetitions (the seed is then the job's master seed)
+    if len(sys.argv) > 5:
+        FILE_PATH = pathlib.Path(sys.argv[5])
+    else:
+        FILE_PATH = pathlib.Path(f"./results/{MODEL_ID}/cayenne_{ALGO}.traj")
+    SEED = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+    FIRST_REP = int(sys.argv[7]) if len(sys.argv) > 7 else None
+    if WRITE_RESULTS_FLAG == "Stream":
+        accumulator = stream_model(MODEL_ID, ALGO, N_REPS, SEED)
+        accumulator.write_summary(summary_path(MODEL_ID, "cayenne", ALGO))
+        print(f"Failed tests: {accumulator.failed_list()}")
+        sys.exit(0)
+    # With Grid, only the states at the analytical time points are written
+    GRID = WRITE_RESULTS_FLAG == "Grid"
+    results = run_model(MODEL_ID, ALGO, N_REPS, SEED, first_rep=FIRST_REP, grid=GRID)
+    if WRITE_RESULTS_FLAG in ["True", "Grid", "Events"]:
+        write_model(results, FILE_PATH, events=WRITE_RESULTS_FLAG == "Events")
     else:
         print("Not saving results")
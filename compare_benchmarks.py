@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+"""
+    Performance-regression detection from the benchmark history.
+
+    The latest run of every benchmark configuration (library, algorithm,
+    model, nrep and harness) in a baseline, selected by library version,
+    git commit and/or host fingerprint, is compared with the latest run of
+    the same configuration in a candidate selection. A configuration has
+    regressed if its mean time grew by more than the threshold and a
+    one-sided Welch t-test on the log run times rejects, at level alpha,
+    that the slowdown is within the threshold.
+"""
+
+import sys
+
+import click
+import numpy as np
+
+from results_db import DB_FILE, RUN_KEY, connect, read_benchmark_runs
+
+
+def latest_runs(runs: list) -> dict:
+    """Return the latest of the runs, oldest first, of each configuration."""
+    return {tuple(run[column] for column in RUN_KEY): run for run in runs}
+
+
+def slowdown_pvalue(baseline: list, candidate: list, threshold: float = 0.05):
+    """
+        Test whether the candidate times are more than ``threshold`` slower
+
+        The null hypothesis is that the candidate's geometric mean time is at
+        most ``1 + threshold`` times the baseline's, tested with a one-sided
+        Welch t-test on the log times.
+
+        Returns
+        -------
+        float or None
+            The p-value, or None if either side has less than 2 runs
+    """
+    if len(baseline) < 2 or len(candidate) < 2:
+        return None
+    from scipy.stats import t
+
+    log_base = np.log(baseline) + np.log1p(threshold)
+    log_cand = np.log(candidate)
+    var_base = log_base.var(ddof=1) / len(log_base)
+    var_cand = log_cand.var(ddof=1) / len(log_cand)
+    diff = log_cand.mean() - log_base.mean()
+    std_err = np.sqrt(var_base + var_cand)
+    if std_err == 0:
+        return 0.0 if diff > 0 else 1.0
+    dof = (var_base + var_cand) ** 2 / (
+        var_base ** 2 / (len(log_base) - 1) + var_cand ** 2 / (len(log_cand) - 1)
+    )
+    return float(t.sf(diff / std_err, dof))
+
+
+def compare_runs(
+    baseline: list, candidate: list, threshold: float = 0.05, alpha: float = 0.05
+) -> list:
+    """
+        Compare the latest baseline and candidate runs of each configuration
+
+        Parameters
+        ----------
+        baseline, candidate : list
+            Runs as returned by ``results_db.read_benchmark_runs``
+        threshold : float
+            The relative slowdown tolerated
+        alpha : float
+            The significance level of the slowdown test
+
+        Returns
+        -------
+        list
+            One dict per configuration in both selections with its baseline
+            and candidate mean times, their ratio, the p-value of the
+            slowdown test and whether it regressed. Without a p-value, for
+            single runs, the ratio alone decides.
+    """
+    baseline, candidate = latest_runs(baseline), latest_runs(candidate)
+    comparisons = []
+    for key in sorted(set(baseline).intersection(candidate)):
+        base_run, cand_run = baseline[key], candidate[key]
+        if base_run["id"] == cand_run["id"]:
+            continue
+        base_times = base_run["result"].get("times", [base_run["mean"]])
+        cand_times = cand_run["result"].get("times", [cand_run["mean"]])
+        ratio = cand_run["mean"] / base_run["mean"]
+        p_value = slowdown_pvalue(base_times, cand_times, threshold)
+        regression = ratio > 1 + threshold and (p_value is None or p_value < alpha)
+        comparison = dict(zip(RUN_KEY, key))
+        comparison.update(
+            {
+                "baseline": base_run["mean"],
+                "candidate": cand_run["mean"],
+                "ratio": ratio,
+                "p_value": p_value,
+                "regression": regression,
+            }
+        )
+        comparisons.append(comparison)
+    return comparisons
+
+
+@click.command()
+@click.option("--baseline-version", help="The library version of the baseline runs")
+@click.option("--baseline-commit", help="The git commit of the baseline runs")
+@click.option("--baseline-host", help="The host fingerprint of the baseline runs")
+@click.option(
+    "--candidate-version",
+    help="The library version of the candidate runs. Default is any version.",
+)
+@click.option(
+    "--candidate-commit",
+    help="The git commit of the candidate runs. Default is any commit.",
+)
+@click.option(
+    "--candidate-host",
+    help="The host fingerprint of the candidate runs. Default is any host.",
+)
+@click.option("--lib", "-l", type=str, help="Only compare the runs of this library")
+@click.option(
+    "--harness",
+    default="hyperfine",
+    type=click.Choice(["hyperfine", "inprocess", "worker", "adaptive"]),
+    help="The harness of the compared runs",
+)
+@click.option(
+    "--threshold",
+    default=0.05,
+    type=float,
+    help="The relative slowdown tolerated before a run counts as a regression",
+)
+@click.option(
+    "--alpha", default=0.05, type=float, help="The significance level of the test"
+)
+@click.option("--db", default=DB_FILE, help="The results database")
+def main(
+    baseline_version: str,
+    baseline_commit: str,
+    baseline_host: str,
+    candidate_version: str,
+    candidate_commit: str,
+    candidate_host: str,
+    lib: str,
+    harness: str,
+    threshold: float,
+    alpha: float,
+    db: str,
+) -> None:
+    """
+        Compare the latest benchmark runs with a baseline and exit with
+        status 1 if any configuration slowed down by more than the
+        threshold.
+
+        The candidate runs are the latest ones of each configuration unless
+        selected.
+
+        Examples:
+
+        python compare_benchmarks.py -l cayenne --baseline-version 1.0.2 --threshold 0.1
+
+        python compare_benchmarks.py --baseline-commit 9aa720b --candidate-commit 6f8a504
+    """
+    if not (baseline_version or baseline_commit or baseline_host):
+        raise click.UsageError("Select the baseline by version, commit or host")
+    conn = connect(db)
+    baseline = read_benchmark_runs(
+        conn,
+        lib=lib,
+        harness=harness,
+        version=baseline_version,
+        git_commit=baseline_commit,
+        host=baseline_host,
+    )
+    candidate = read_benchmark_runs(
+        conn,
+        lib=lib,
+        harness=harness,
+        version=candidate_version,
+        git_commit=candidate_commit,
+        host=candidate_host,
+    )
+    conn.close()
+    comparisons = compare_runs(baseline, candidate, threshold, alpha)
+    if not comparisons:
+        print("No configuration has both baseline and candidate runs")
+    for comparison in comparisons:
+        p_value = comparison["p_value"]
+        p_str = "n/a" if p_value is None else f"{p_value:.3g}"
+        status = "REGRESSION" if comparison["regression"] else "ok"
+        print(
+            f"{comparison['lib']} {comparison['algo']} {comparison['model']} "
+            f"{comparison['nrep']}: {comparison['baseline']:.4f} s -> "
+            f"{comparison['candidate']:.4f} s ({comparison['ratio']:.3f}x, "
+            f"p = {p_str}) {status}"
+        )
+    if any(comparison["regression"] for comparison in comparisons):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
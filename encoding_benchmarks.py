@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+    Compression and decoding benchmarks of the event-log encoding.
+
+    The exact (direct) trajectories of every DSMTS model are simulated with
+    cayenne and written both as a trajectory store and as an event log (see
+    ``accuracy/eventlog.py``). The sizes of the two files are compared, the
+    event log is checked to give back the same states, and its times to
+    within half a tick, and both are read back ``runs`` times to measure the
+    decoding throughput in rows (events) per second.
+"""
+
+import json
+import pathlib
+import tempfile
+import time
+
+import click
+import numpy as np
+
+from accuracy.eventlog import read_event_log, write_event_log
+from accuracy.trajstore import read_trajectories, write_trajectories
+from phase_benchmarks import load_runner, summarize_times
+
+DSMTS_MODELS = [
+    "00001",
+    "00003",
+    "00004",
+    "00005",
+    "00011",
+    "00020",
+    "00021",
+    "00022",
+    "00023",
+    "00030",
+    "00031",
+    "00037",
+    "00038",
+    "00039",
+]
+ENCODING_FILE = "benchmarks/encoding.json"
+
+
+def measure_encoding(t_list: list, x_list: list, runs: int = 5) -> dict:
+    """
+        Compare the event log of trajectories with their trajectory store
+
+        Returns
+        -------
+        dict
+            The number of ``rows``, the bytes of the ``store`` and of the
+            ``event_log``, their ratio (``compression``), the largest time
+            error of the event log (``max_time_error``), whether its states
+            are exact, and the hyperfine-like summaries of the read times of
+            both files with their median throughputs in rows per second
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_file = pathlib.Path(tmp_dir) / "store.traj"
+        log_file = pathlib.Path(tmp_dir) / "events.traj"
+        write_trajectories(store_file, t_list, x_list)
+        write_event_log(log_file, t_list, x_list)
+        store = read_trajectories(store_file, mmap=False)
+        decoded = read_event_log(log_file)
+        timings = {}
+        for name, read in [
+            ("store", lambda: read_trajectories(store_file, mmap=False)),
+            ("event_log", lambda: read_event_log(log_file)),
+        ]:
+            times = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                read()
+                times.append(time.perf_counter() - start)
+            timings[name] = summarize_times(times)
+        sizes = {
+            "store": store_file.stat().st_size,
+            "event_log": log_file.stat().st_size,
+        }
+    n_rows = len(store.time)
+    result = {
+        "rows": n_rows,
+        "store": sizes["store"],
+        "event_log": sizes["event_log"],
+        "compression": sizes["store"] / sizes["event_log"],
+        "max_time_error": float(np.abs(decoded.time - store.time).max()),
+        "exact_states": bool((decoded.states == store.states).all()),
+    }
+    for name, summary in timings.items():
+        result[f"{name}_read"] = summary
+        result[f"{name}_rows_per_second"] = n_rows / summary["median"]
+    return result
+
+
+@click.command()
+@click.option(
+    "--models",
+    "-m",
+    multiple=True,
+    help="The DSMTS ID of a model to benchmark. Specify multiple with additional -m tags. Default is all of them.",
+)
+@click.option(
+    "--nrep", "-n", default=100, type=int, help="The number of repetitions per model"
+)
+@click.option(
+    "--runs", "-r", default=5, type=int, help="The number of reads of each file"
+)
+@click.option("--output", "-o", default=ENCODING_FILE, help="The results file")
+def main(models: list, nrep: int, runs: int, output: str) -> None:
+    """
+        Benchmark the size and decoding speed of event logs against
+        trajectory stores on the DSMTS models.
+
+        Examples:
+
+        python encoding_benchmarks.py -n 100
+
+        python encoding_benchmarks.py -m 00001 -m 00005 -n 1000 -r 10
+    """
+    runner = load_runner("cayenne")
+    results = {}
+    for model in models or DSMTS_MODELS:
+        sim = runner.run_model(model, "direct", nrep)
+        result = measure_encoding(sim.t_list, sim.x_list, runs)
+        results[model] = result
+        print(
+            f"{model}: {result['rows']} rows, {result['store'] / 1e6:.2f} MB -> "
+            f"{result['event_log'] / 1e6:.2f} MB ({result['compression']:.1f}x), "
+            f"decoded at {result['event_log_rows_per_second'] / 1e6:.1f} M rows/s "
+            f"(store read at {result['store_rows_per_second'] / 1e6:.1f} M rows/s)"
+        )
+    fpath = pathlib.Path(output)
+    fpath.parent.mkdir(parents=True, exist_ok=True)
+    with open(fpath, "w") as fid:
+        json.dump(results, fid, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+from collections import namedtuple
+import pathlib
+import sys
+
+import numpy as np
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from cayenne_test.models import get_model
+from ensemble_test.ensemble import simulate_ensemble
+from accuracy.accuracy import make_accumulator, read_reference
+from accuracy.eventlog import write_store
+from accuracy.seeds import replicate_seeds
+from accuracy.streaming import summary_path
+
+EnsembleResults = namedtuple("EnsembleResults", ["time", "states", "status", "seeds"])
+
+
+def model_grid(model_id, max_t):
+    """Return the analytical time points of a model, or whole seconds up to
+    max_t for models without analytical results, like synthetic networks."""
+    if model_id.startswith("syn_"):
+        return np.arange(0, int(max_t) + 1, dtype=float)
+    return np.asarray(read_reference(model_id)[0], dtype=float)
+
+
+def setup_model(model_id):
+    """Read a model with its run settings and recorded time points."""
+    _, _, V_r, V_p, X0, k, max_t, max_iter, _ = get_model(model_id)
+    return V_r, V_p, X0, k, max_t, max_iter, model_grid(model_id, max_t)
+
+
+def simulate_model(model, algorithm, n_rep, seed=0, first_rep=0):
+    """Simulate all replicates as one batch.
+
+    The batch draws from one random generator, seeded with the seed of its
+    first replicate (see ``accuracy/seeds.py``), which is also recorded as
+    the seed of each of its replicates. A shard is thus reproducible, but
+    unlike those of the other libraries, its replicates differ from the same
+    replicates of a batch that starts elsewhere, so the results of a job
+    depend on its chunk size and number of shards.
+    """
+    V_r, V_p, X0, k, max_t, max_iter, time_arr = model
+    batch_seed = int(replicate_seeds(seed, first_rep, 1)[0])
+    states, status = simulate_ensemble(
+        V_r, V_p, X0, k, max_t, max_iter, time_arr, n_rep, algorithm, batch_seed
+    )
+    return EnsembleResults(time_arr, states, status, np.full(n_rep, batch_seed))
+
+
+def run_model(model_id, algorithm, n_rep, seed=0, first_rep=None):
+    model = setup_model(model_id)
+    return simulate_model(model, algorithm, n_rep, seed, first_rep or 0)
+
+
+def stream_model(model_id, algorithm, n_rep, seed=0):
+    """Fold the whole batch into the accuracy statistics at once."""
+    accumulator = make_accumulator(model_id, algorithm)
+    accumulator.add_states(run_model(model_id, algorithm, n_rep, seed).states)
+    return accumulator
+
+
+def write_model(results, file_path, events=False):
+    # Every replicate is recorded on the same time points
+    write_store(
+        file_path,
+        [results.time] * len(results.states),
+        list(results.states),
+        results.status,
+        results.seeds,
+        events,
+    )
+
+
+if __name__ == "__main__":
+    MODEL_ID = sys.argv[1]
+    ALGO = sys.argv[2]
+    N_REPS = int(sys.argv[3])
+    WRITE_RESULTS_FLAG = sys.argv[4]
+    # Optional output file, seed and first replicate, used to generate a
+    # shard of repetitions (the seed is then the job's master seed)
+    if len(sys.argv) > 5:
+        FILE_PATH = pathlib.Path(sys.argv[5])
+    else:
+        FILE_PATH = pathlib.Path(f"./results/{MODEL_ID}/ensemble_{ALGO}.traj")
+    SEED = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+    FIRST_REP = int(sys.argv[7]) if len(sys.argv) > 7 else None
+    if WRITE_RESULTS_FLAG == "Stream":
+        accumulator = stream_model(MODEL_ID, ALGO, N_REPS, SEED)
+        accumulator.write_summary(summary_path(MODEL_ID, "ensemble", ALGO))
+        print(f"Failed tests: {accumulator.failed_list()}")
+        sys.exit(0)
+    # The ensemble always records the analytical time points, so True and
+    # Grid write the same store
+    results = run_model(MODEL_ID, ALGO, N_REPS, SEED, first_rep=FIRST_REP)
+    if WRITE_RESULTS_FLAG in ["True", "Grid"]:
+        write_model(results, FILE_PATH)
+    else:
+        print("Not saving results")
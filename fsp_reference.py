@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+
+"""
+    Exact reference means and standard deviations from the chemical master
+    equation, for models without precomputed results.
+
+    The finite state projection (FSP) of Munsky and Khammash (2006) restricts
+    a model to the states reachable from ``X0`` within a box of molecule
+    counts. The generator of the chemical master equation on those states is
+    a sparse matrix built from ``V_r``, ``V_p`` and ``k`` with cayenne's
+    propensities, in which the reactions that leave the box drain probability
+    instead of moving it. The probability left in the box at time ``t`` is
+    thus a lower bound of the exact distribution, and the mass that leaked
+    out, the truncation error, bounds the l1 error of the distribution. It is
+    propagated to the requested time points with a Krylov approximation of
+    the matrix exponential (``expv``), and the box is grown on the sides that
+    the probability leaks through until the error is below the tolerance.
+
+    The states and propensities of a box do not depend on the rate
+    constants, so a sweep over parameter combinations only rebuilds the
+    sparse generator, a weighted sum of the propensities, for each of them.
+"""
+
+from collections import namedtuple
+import pathlib
+import time
+
+import click
+import numpy as np
+
+from accuracy.kinetics import propensities, stochastic_rates
+
+Truncation = namedtuple(
+    "Truncation", ["lower", "upper", "states", "unit_prop", "targets", "exits"]
+)
+FSPResult = namedtuple("FSPResult", ["time", "mean", "std", "error", "truncation"])
+
+DEFAULT_TIMES = "0:50:1"
+MAX_STATES = 10_000_000
+KRYLOV_DIM = 30
+KRYLOV_TOL = 1e-10
+# The marker of transitions that would make a count negative, which never
+# happen, and of those that leave the box
+_INVALID = -2
+_LEAVES = -1
+
+
+def _box_index(states, lower, upper):
+    return np.ravel_multi_index((states - lower).T, upper - lower + 1)
+
+
+def truncate(V_r: np.array, V_p: np.array, X0: np.array, lower, upper) -> Truncation:
+    """
+        Enumerate the states reachable from ``X0`` within a box of counts
+
+        Parameters
+        ----------
+        V_r, V_p, X0
+            The model, as returned by ``cayenne_test/models.py``.
+        lower, upper
+            The smallest and largest count of each species in the box.
+
+        Returns
+        -------
+        Truncation
+            The box, its reachable ``states``, their propensities with unit
+            rate constants (``unit_prop``), the index of the state that each
+            reaction leads to from each state (``targets``, -1 if it leaves
+            the box and -2 if it cannot happen) and, for those that leave, the
+            side of the box they cross (``exits``, ``2 * species`` for the
+            lower bound and ``2 * species + 1`` for the upper one).
+
+        Raises
+        ------
+        ValueError
+            If the box holds more than ``MAX_STATES`` states.
+    """
+    V_r = np.asarray(V_r, dtype=np.int64)
+    V = (np.asarray(V_p, dtype=np.int64) - V_r).T
+    lower = np.asarray(lower, dtype=np.int64)
+    upper = np.asarray(upper, dtype=np.int64)
+    n_box = int(np.prod(upper - lower + 1, dtype=float))
+    if n_box > MAX_STATES:
+        raise ValueError(f"The truncation needs more than {MAX_STATES} states")
+    ones = np.ones(V.shape[0])
+    # Breadth-first search of the states reachable within the box
+    visited = np.zeros(n_box, dtype=bool)
+    frontier = np.asarray(X0, dtype=np.int64)[None, :]
+    visited[_box_index(frontier, lower, upper)] = True
+    layers = [frontier]
+    while frontier.size:
+        prop = propensities(frontier, ones, V_r)
+        reached = []
+        for rxn in range(V.shape[0]):
+            target = frontier[prop[:, rxn] > 0] + V[rxn]
+            inside = ((target >= lower) & (target <= upper)).all(axis=1)
+            reached.append(_box_index(target[inside], lower, upper))
+        reached = np.unique(np.concatenate(reached))
+        reached = reached[~visited[reached]]
+        visited[reached] = True
+        frontier = np.column_stack(np.unravel_index(reached, upper - lower + 1))
+        frontier = frontier.reshape(-1, V.shape[1]) + lower
+        layers.append(frontier)
+    states = np.concatenate(layers)
+    lookup = np.full(n_box, _LEAVES, dtype=np.int64)
+    lookup[_box_index(states, lower, upper)] = np.arange(states.shape[0])
+    unit_prop = propensities(states, ones, V_r)
+    targets = np.full(unit_prop.shape, _INVALID, dtype=np.int64)
+    exits = np.full(unit_prop.shape, -1, dtype=np.int64)
+    for rxn in range(V.shape[0]):
+        target = states + V[rxn]
+        valid = (unit_prop[:, rxn] > 0) & (target >= 0).all(axis=1)
+        below = target < lower
+        above = target > upper
+        inside = valid & ~(below | above).any(axis=1)
+        targets[valid, rxn] = _LEAVES
+        targets[inside, rxn] = lookup[_box_index(target[inside], lower, upper)]
+        # The first side crossed, lower bounds before upper ones
+        sides = np.column_stack([below, above]).reshape(-1, 2, V.shape[1])
+        sides = sides.transpose(0, 2, 1).reshape(states.shape[0], -1)
+        leaving = valid & ~inside
+        exits[leaving, rxn] = sides[leaving].argmax(axis=1)
+    return Truncation(lower, upper, states, unit_prop, targets, exits)
+
+
+def cme_generator(truncation: Truncation, kstoc: np.array):
+    """
+        Build the generator of the truncated chemical master equation
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            The matrix ``A`` of ``dp/dt = A p`` over the truncated states,
+            whose columns sum to minus the rate at which probability leaves
+            the box.
+    """
+    from scipy import sparse
+
+    prop = truncation.unit_prop * kstoc
+    valid = truncation.targets != _INVALID
+    inside = truncation.targets >= 0
+    sources = np.broadcast_to(np.arange(prop.shape[0])[:, None], prop.shape)
+    rows = np.concatenate([truncation.targets[inside], np.arange(prop.shape[0])])
+    cols = np.concatenate([sources[inside], np.arange(prop.shape[0])])
+    data = np.concatenate([prop[inside], -np.where(valid, prop, 0.0).sum(axis=1)])
+    n_states = prop.shape[0]
+    return sparse.csr_matrix((data, (rows, cols)), shape=(n_states, n_states))
+
+
+def expv(A, v: np.array, t: float, m: int = KRYLOV_DIM, tol: float = KRYLOV_TOL):
+    """
+        Compute ``expm(t * A) @ v`` in a Krylov subspace
+
+        This is Sidje's ``expv`` of Expokit (1998): the action of the
+        exponential is approximated in an Arnoldi basis of dimension ``m``,
+        with steps whose length is chosen from an estimate of the local error.
+        The Krylov approximation only needs sparse products with ``A``, and
+        unlike scipy's truncated Taylor series its steps do not shrink with
+        the norm of the stiff generators of large boxes.
+
+        Parameters
+        ----------
+        A
+            A sparse or dense square matrix.
+        v
+            The vector to propagate.
+        t
+            The time to propagate ``v`` for.
+        m
+            The dimension of the Krylov subspace.
+        tol
+            The largest local error per unit time.
+
+        Returns
+        -------
+        np.array
+            The approximation of ``expm(t * A) @ v``.
+    """
+    from scipy.linalg import expm
+
+    w = np.array(v, dtype=float)
+    n = w.shape[0]
+    beta = np.linalg.norm(w)
+    anorm = abs(A).sum(axis=0).max()
+    if t == 0 or beta == 0 or anorm == 0:
+        return w
+    if n == 1:
+        return np.exp(t * A[0, 0]) * w
+    m = min(m, n - 1)
+    # Happy breakdown threshold, safety factor and error tolerance slack
+    btol, gamma, delta = 1e-12, 0.9, 1.2
+    fact = ((m + 1) / np.e) ** (m + 1) * np.sqrt(2 * np.pi * (m + 1))
+    t_new = ((fact * tol) / (4 * beta * anorm)) ** (1 / m) / anorm
+    t_now = 0.0
+    while t_now < t:
+        t_step = min(t - t_now, t_new)
+        V = np.zeros((m + 1, n))
+        H = np.zeros((m + 2, m + 2))
+        V[0] = w / beta
+        # Arnoldi with reorthogonalization, stored as rows of V
+        extra, dim = 2, m
+        for j in range(m):
+            p = A @ V[j]
+            h = V[: j + 1] @ p
+            p -= h @ V[: j + 1]
+            h2 = V[: j + 1] @ p
+            p -= h2 @ V[: j + 1]
+            H[: j + 1, j] = h + h2
+            s = np.linalg.norm(p)
+            if s < btol:
+                # The subspace is invariant, so the step is exact
+                extra, dim = 0, j + 1
+                t_step = t - t_now
+                break
+            H[j + 1, j] = s
+            V[j + 1] = p / s
+        if extra:
+            H[m + 1, m] = 1
+            avnorm = np.linalg.norm(A @ V[m])
+        while True:
+            F = expm(t_step * H[: dim + extra, : dim + extra])
+            if not extra:
+                err_loc, xm = btol, 1 / m
+                break
+            phi1 = abs(beta * F[m, 0])
+            phi2 = abs(beta * F[m + 1, 0] * avnorm)
+            if phi1 > 10 * phi2:
+                err_loc, xm = phi2, 1 / m
+            elif phi1 > phi2:
+                err_loc, xm = phi1 * phi2 / (phi1 - phi2), 1 / m
+            else:
+                err_loc, xm = phi1, 1 / (m - 1)
+            if err_loc <= delta * t_step * tol:
+                break
+            t_step = gamma * t_step * (t_step * tol / err_loc) ** xm
+        mx = dim + max(0, extra - 1)
+        w = (beta * F[:mx, 0]) @ V[:mx]
+        beta = np.linalg.norm(w)
+        t_now += t_step
+        t_new = gamma * t_step * (t_step * tol / max(err_loc, 1e-300)) ** xm
+    return w
+
+
+def propagate(A, p0: np.array, time_arr: np.array, max_error=None) -> np.array:
+    """Return the distributions at ``time_arr``, of shape ``(n_time, n_states)``.
+
+    The time points must be sorted and start at 0, the time of ``p0``. The
+    propagation stops at the first time point at which more than
+    ``max_error`` of the probability has left the box, so that a box that is
+    too small is found early, and only the distributions up to it are
+    returned.
+    """
+    dists = [p0]
+    for step in np.diff(np.asarray(time_arr, dtype=float)):
+        dists.append(np.maximum(expv(A, dists[-1], step), 0))
+        if max_error is not None and 1 - dists[-1].sum() > max_error:
+            break
+    return np.array(dists)
+
+
+def _initial_box(X0: np.array):
+    half_width = np.maximum(16, X0 // 4)
+    return np.maximum(X0 - half_width, 0), X0 + half_width
+
+
+def _grow_box(truncation: Truncation, kstoc: np.array, dists: np.array):
+    """Widen the sides of the box that the probability leaks through."""
+    lower, upper = truncation.lower.copy(), truncation.upper.copy()
+    flux = np.zeros(2 * lower.shape[0])
+    prop = truncation.unit_prop * kstoc
+    states, rxns = np.nonzero(truncation.targets == _LEAVES)
+    np.add.at(
+        flux,
+        truncation.exits[states, rxns],
+        prop[states, rxns] * dists[:, states].max(axis=0),
+    )
+    width = np.maximum(upper - lower + 1, 16)
+    for side in np.nonzero(flux >= 1e-3 * flux.max())[0]:
+        species = side // 2
+        if side % 2:
+            upper[species] += width[species]
+        else:
+            lower[species] = max(lower[species] - width[species], 0)
+    return lower, upper
+
+
+def solve_fsp(
+    V_r: np.array,
+    V_p: np.array,
+    X0: np.array,
+    k: np.array,
+    time_arr: np.array,
+    tol: float = 1e-6,
+    truncation: Truncation = None,
+) -> FSPResult:
+    """
+        Compute the exact means and standard deviations of a model
+
+        Parameters
+        ----------
+        V_r, V_p, X0, k
+            The model, as returned by ``cayenne_test/models.py``.
+        time_arr
+            Sorted time points, starting at 0.
+        tol
+            The largest truncation error, the probability that leaves the
+            box by the last time point.
+        truncation
+            A box to start from, as returned by a previous solve of the same
+            model with other rate constants. It is grown if needed.
+
+        Returns
+        -------
+        FSPResult
+            The time points, the ``mean`` and ``std`` of each species of
+            shape ``(n_time, n_species)``, the truncation ``error`` at each
+            time point and the ``truncation`` used.
+
+        Raises
+        ------
+        ValueError
+            If the truncation error needs more than ``MAX_STATES`` states.
+    """
+    X0 = np.asarray(X0, dtype=np.int64)
+    V_r = np.asarray(V_r, dtype=np.int64)
+    kstoc = stochastic_rates(V_r, k)
+    if truncation is None:
+        truncation = truncate(V_r, V_p, X0, *_initial_box(X0))
+    while True:
+        A = cme_generator(truncation, kstoc)
+        p0 = np.zeros(truncation.states.shape[0])
+        p0[0] = 1.0
+        dists = propagate(A, p0, time_arr, max_error=tol)
+        mass = dists.sum(axis=1)
+        if len(dists) == len(time_arr) and 1 - mass[-1] <= tol:
+            break
+        lower, upper = _grow_box(truncation, kstoc, dists)
+        truncation = truncate(V_r, V_p, X0, lower, upper)
+    # The moments of the distribution in the box, normalized by its mass
+    mean = dists @ truncation.states / mass[:, None]
+    second = dists @ truncation.states.astype(float) ** 2 / mass[:, None]
+    std = np.sqrt(np.maximum(second - mean ** 2, 0))
+    # Rounding errors of the propagation can push the mass slightly above 1
+    error = np.maximum(1 - mass, 0)
+    return FSPResult(np.asarray(time_arr, float), mean, std, error, truncation)
+
+
+def sweep_references(model: tuple, rate_sets: list, time_arr: np.array, tol=1e-6):
+    """
+        Solve a model for many combinations of rate constants
+
+        Each solve starts from the box of the previous one, so the states are
+        only enumerated again when a combination needs a larger box.
+
+        Parameters
+        ----------
+        model
+            The model, as returned by ``get_model``.
+        rate_sets
+            The rate constants ``k`` of each combination.
+
+        Returns
+        -------
+        list of FSPResult
+    """
+    _, _, V_r, V_p, X0, _, _, _, _ = model
+    results, truncation = [], None
+    for k in rate_sets:
+        result = solve_fsp(V_r, V_p, X0, k, time_arr, tol, truncation)
+        truncation = result.truncation
+        results.append(result)
+    return results
+
+
+def write_reference(file_name: str, result: FSPResult):
+    """
+        Write means and standard deviations in the schema of ``data/``
+
+        One species is written as ``time,X-mean,X-sd`` and two species as
+        ``time,P-mean,P2-mean,P-sd,P2-sd``, as read by ``read_reference``.
+    """
+    n_species = result.mean.shape[1]
+    if n_species == 1:
+        header = "time,X-mean,X-sd"
+    elif n_species == 2:
+        header = "time,P-mean,P2-mean,P-sd,P2-sd"
+    else:
+        raise ValueError(f"References can only track 1 or 2 species, not {n_species}")
+    table = np.column_stack([result.time, result.mean, result.std])
+    fpath = pathlib.Path(file_name)
+    fpath.parent.mkdir(parents=True, exist_ok=True)
+    np.savetxt(fpath, table, delimiter=",", header=header, comments="", fmt="%.10g")
+
+
+def parse_times(times: str) -> np.array:
+    """Parse ``start:stop:step`` into time points, including stop."""
+    start, stop, step = (float(value) for value in times.split(":"))
+    return np.arange(round((stop - start) / step) + 1) * step + start
+
+
+@click.command()
+@click.option(
+    "--models",
+    "-m",
+    multiple=True,
+    required=True,
+    help="The ID of a model of cayenne_test/models.py or synthetic_networks.py. Specify multiple with additional -m tags.",
+)
+@click.option(
+    "--rates",
+    "-k",
+    multiple=True,
+    help="Comma-separated rate constants replacing those of the model, one combination per tag. Written to results_{model}_{i}.csv, numbered from 1.",
+)
+@click.option(
+    "--times",
+    "-t",
+    default=DEFAULT_TIMES,
+    help="The time points, as start:stop:step, starting at 0",
+)
+@click.option("--tol", default=1e-6, type=float, help="The largest truncation error")
+@click.option("--output", "-o", default="data", help="The folder of the results")
+def main(models: list, rates: list, times: str, tol: float, output: str) -> None:
+    """
+        Compute exact reference means and standard deviations with the
+        finite state projection of the chemical master equation.
+
+        Examples:
+
+        python fsp_reference.py -m syn_S2_R4_O2_P2_s0 -o data
+
+        python fsp_reference.py -m 00001 -k 0.1,0.11 -k 0.2,0.21 -o references
+    """
+    from cayenne_test.models import get_model
+
+    time_arr = parse_times(times)
+    for model_id in models:
+        model = get_model(model_id)
+        if rates:
+            rate_sets = [np.array(rate.split(","), dtype=float) for rate in rates]
+            names = [f"{model_id}_{i + 1}" for i in range(len(rates))]
+        else:
+            rate_sets, names = [model[5]], [model_id]
+        start = time.perf_counter()
+        results = sweep_references(model, rate_sets, time_arr, tol)
+        seconds = time.perf_counter() - start
+        for name, result in zip(names, results):
+            write_reference(pathlib.Path(output) / f"results_{name}.csv", result)
+        print(
+            f"{model_id}: {len(results)} references in {seconds:.2f} s, "
+            f"{len(result.truncation.states)} states, "
+            f"truncation error {max(r.error[-1] for r in results):.1e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
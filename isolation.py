@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""
+    Noise control for the benchmarks.
+
+    A benchmark in isolated mode runs pinned to dedicated cores, with the
+    thread pools of numpy's BLAS, OpenMP and Julia capped at the number of
+    those cores so they cannot oversubscribe them. The CPU time the other
+    processes of the system spend on the dedicated cores is sampled from
+    ``/proc/stat`` before and after each run: the cores' busy time minus the
+    CPU time of the benchmark's own process tree, including the process
+    that times it. Runs in which it exceeds a fraction of the cores'
+    capacity were taken under interference and are flagged or discarded.
+"""
+
+import os
+import resource
+import time
+
+THREAD_ENV_VARS = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "JULIA_NUM_THREADS",
+]
+# Fields of a /proc/stat cpu line counted as busy: user, nice, system, irq,
+# softirq and steal (time taken by the hypervisor for other guests)
+BUSY_FIELDS = [0, 1, 2, 5, 6, 7]
+
+
+def parse_cores(spec: str) -> list:
+    """Parse a core list like "2,3" or "0-3,6" into sorted core numbers."""
+    cores = set()
+    for part in spec.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            cores.update(range(int(first), int(last) + 1))
+        elif part.strip():
+            cores.add(int(part))
+    return sorted(cores)
+
+
+def default_cores(n_cores: int = 1) -> list:
+    """Return the last ``n_cores`` cores available, away from core 0."""
+    return sorted(os.sched_getaffinity(0))[-n_cores:]
+
+
+def isolated_env(n_threads: int, env: dict = None) -> dict:
+    """Return a copy of the environment with the thread pools capped."""
+    env = dict(os.environ if env is None else env)
+    for name in THREAD_ENV_VARS:
+        env[name] = str(n_threads)
+    return env
+
+
+def pin_to(cores: list):
+    """Return a ``preexec_fn`` that pins the child process (tree) to cores."""
+
+    def pin():
+        os.sched_setaffinity(0, cores)
+
+    return pin
+
+
+def read_busy_time(cores: list) -> float:
+    """Return the seconds the cores have been busy since boot."""
+    ticks = 0
+    wanted = {f"cpu{core}" for core in cores}
+    with open("/proc/stat") as fid:
+        for line in fid:
+            fields = line.split()
+            if fields and fields[0] in wanted:
+                ticks += sum(int(fields[1 + i]) for i in BUSY_FIELDS)
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+def sample_cpu(cores: list) -> dict:
+    """
+        Sample the CPU use of the cores and of this process tree
+
+        ``own`` only includes children that have been waited for, so sample
+        after a benchmark process has exited.
+    """
+    own = 0.0
+    for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]:
+        usage = resource.getrusage(who)
+        own += usage.ru_utime + usage.ru_stime
+    return {
+        "wall": time.perf_counter(),
+        "busy": read_busy_time(cores),
+        "own": own,
+        "load": os.getloadavg()[0],
+    }
+
+
+def interference(before: dict, after: dict, n_cores: int) -> float:
+    """
+        Return the fraction of the cores' capacity used by other processes
+        between two samples
+    """
+    wall = after["wall"] - before["wall"]
+    if wall <= 0:
+        return 0.0
+    foreign = (after["busy"] - before["busy"]) - (after["own"] - before["own"])
+    return max(foreign, 0.0) / (wall * n_cores)
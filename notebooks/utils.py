@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
 
 import json
-import matplotlib.pyplot as plt
 import pathlib
+import sqlite3
+import sys
 
 import numpy as np
 import pandas as pd
-import seaborn as sns
 
-PALETTE_5 = sns.color_palette("Set2", n_colors=5)
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from results_db import read_accuracy
+
+# matplotlib, scipy and seaborn are imported by the functions that use them.
+# The palettes are seaborn's "Set2" colors.
+PALETTE_5 = [
+    (0.4, 0.7607843137254902, 0.6470588235294118),
+    (0.9882352941176471, 0.5529411764705883, 0.3843137254901961),
+    (0.5529411764705883, 0.6274509803921569, 0.796078431372549),
+    (0.9058823529411765, 0.5411764705882353, 0.7647058823529411),
+    (0.6509803921568628, 0.8470588235294118, 0.32941176470588235),
+]
 LIB_PALETTE = {
     "Cayenne": PALETTE_5[0],
     "BioSimulator-CI": PALETTE_5[1],
@@ -16,7 +27,7 @@ LIB_PALETTE = {
     "GillespieSSA": PALETTE_5[3],
     "Tellurium": PALETTE_5[4],
 }
-PALETTE_3 = sns.color_palette("Set2", n_colors=3)
+PALETTE_3 = PALETTE_5[:3]
 ALGO_PALETTE = {
     "direct": PALETTE_3[0],
     "tau_leaping": PALETTE_3[1],
@@ -64,9 +75,27 @@ LIBID_NAME_DICT = {
 
 def make_accuracy_df(filename: str, use_ratio_for_approx=True):
     """ Compile all accuracy results into a pandas dataframe """
+    df = pd.read_csv(filename, dtype={"model": str})
+    return score_accuracy_df(df, use_ratio_for_approx)
+
+
+def load_accuracy_df(db_file, lib=None, nrep=10000, use_ratio_for_approx=True):
+    """ Load the accuracy results from the results database
+
+    Returns what ``make_accuracy_df`` builds from the results CSV file of
+    ``lib``, or of all libraries if ``lib`` is None. Only the most recently
+    updated library version of each (model, lib, algo) is kept.
+    """
+    conn = sqlite3.connect(db_file)
+    df = read_accuracy(conn, lib, nrep)
+    conn.close()
+    return score_accuracy_df(df, use_ratio_for_approx)
+
+
+def score_accuracy_df(df, use_ratio_for_approx=True):
+    """ Add the number of tests and the pass rate to the raw accuracy results """
     full_algos = ["direct"]
     approx_algos = ["tau_leaping", "tau_adaptive"]
-    df = pd.read_csv(filename, dtype={"model": str})
     df.replace({"model": MODELID_NAME_DICT}, inplace=True)
     df.replace({"lib": LIBID_NAME_DICT}, inplace=True)
     df.loc[:, "nspecies"] = 1
@@ -114,8 +143,12 @@ def make_accuracy_df(filename: str, use_ratio_for_approx=True):
     return df
 
 
-def make_benchmark_df(path):
-    """ Compile all benchmark results into a pandas dataframe """
+def make_benchmark_df(path, nrep=10000):
+    """ Compile all benchmark results into a pandas dataframe
+
+    Only the results with ``nrep`` repetitions are kept, or all of them if
+    ``nrep`` is None.
+    """
     files = list(pathlib.Path(path).glob("*.json"))
     results = []
     for this_file in files:
@@ -131,12 +164,120 @@ def make_benchmark_df(path):
     df = pd.DataFrame(results)
     df.replace({"model": MODELID_NAME_DICT}, inplace=True)
     df.replace({"lib": LIBID_NAME_DICT}, inplace=True)
-    df = df[df.nrep == 10000]
+    if nrep is not None:
+        df = df[df.nrep == nrep]
+    return df
+
+
+def load_benchmark_df(db_file, nrep=10000, harness="hyperfine"):
+    """ Load the benchmark results from the results database
+
+    Returns what ``make_benchmark_df`` builds from the benchmark files of
+    ``harness``, with one query instead of reading every file. Only the most
+    recently updated library version of each benchmark is kept.
+    """
+    query = "SELECT lib, algo, model, nrep, result FROM benchmarks WHERE harness = ?"
+    params = [harness]
+    if nrep is not None:
+        query += " AND nrep = ?"
+        params.append(nrep)
+    conn = sqlite3.connect(db_file)
+    rows = conn.execute(query + " ORDER BY updated", params).fetchall()
+    conn.close()
+    results = {}
+    for lib, algo, model, nreps, result in rows:
+        this_result = json.loads(result)
+        this_result.update({"lib": lib, "algo": algo, "model": model, "nrep": nreps})
+        results[lib, algo, model, nreps] = this_result
+    df = pd.DataFrame(list(results.values()))
+    df.replace({"model": MODELID_NAME_DICT}, inplace=True)
+    df.replace({"lib": LIBID_NAME_DICT}, inplace=True)
+    return df
+
+
+def fit_cost_model(df, confidence=0.95):
+    """ Fit time = fixed + marginal * nrep for each lib, algo and model in the df
+
+    Every timed run is one point of a weighted least squares fit. The weights
+    are the inverse squared times, so that the small nrep of a log-spaced
+    sweep, which carry the fixed cost, count as much as the large ones.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per lib, algo and model with the fixed cost (s), marginal
+        cost (s per repetition), their confidence intervals, the peak
+        throughput (repetitions per s) and the nrep at which the fixed and
+        per-repetition costs are equal (half of the peak throughput).
+    """
+    from scipy import stats
+
+    times = df.explode("times")
+    fits = []
+    for (lib, algo, model), group in times.groupby(["lib", "algo", "model"]):
+        nrep = group["nrep"].to_numpy(dtype=float)
+        time = group["times"].to_numpy(dtype=float)
+        dof = len(time) - 2
+        if len(np.unique(nrep)) < 2 or dof < 1:
+            continue
+        design = np.column_stack([np.ones_like(nrep), nrep])
+        weights = 1 / time ** 2
+        cov = np.linalg.inv((design.T * weights) @ design)
+        fixed, marginal = cov @ ((design.T * weights) @ time)
+        residuals = time - design @ [fixed, marginal]
+        scale = (weights * residuals ** 2).sum() / dof
+        fixed_se, marginal_se = np.sqrt(np.diag(cov) * scale)
+        quantile = stats.t.ppf(0.5 + confidence / 2, dof)
+        fits.append(
+            {
+                "lib": lib,
+                "algo": algo,
+                "model": model,
+                "fixed": fixed,
+                "fixed_low": fixed - quantile * fixed_se,
+                "fixed_high": fixed + quantile * fixed_se,
+                "marginal": marginal,
+                "marginal_low": marginal - quantile * marginal_se,
+                "marginal_high": marginal + quantile * marginal_se,
+                "peak_throughput": 1 / marginal,
+                "half_throughput_nrep": fixed / marginal,
+            }
+        )
+    return pd.DataFrame(fits)
+
+
+def make_network_benchmark_df(path, nrep=None):
+    """ Compile the benchmark results of synthetic networks into a pandas dataframe """
+    df = make_benchmark_df(path, nrep)
+    df = df[df.model.str.startswith("syn_")].copy()
+    sizes = df.model.str.extract(r"syn_S(\d+)_R(\d+)").astype(int)
+    df.loc[:, "n_species"] = sizes[0]
+    df.loc[:, "n_reactions"] = sizes[1]
+    return df
+
+
+def make_scaling_df(path):
+    """ Compile all scaling benchmark results into a pandas dataframe """
+    files = list(pathlib.Path(path).glob("*.json"))
+    results = []
+    for this_file in files:
+        with open(this_file) as fid:
+            data_dict = json.load(fid)
+        for this_result in data_dict["results"]:
+            for key in ["lib", "algo", "model", "mode", "parallelism", "saturation"]:
+                this_result[key] = data_dict[key]
+            results.append(this_result)
+    df = pd.DataFrame(results)
+    df.replace({"model": MODELID_NAME_DICT}, inplace=True)
+    df.replace({"lib": LIBID_NAME_DICT}, inplace=True)
     return df
 
 
 def plot_accuracy_barplot(df, hue="algo"):
     """ Plot a barplot of total success for each test in the df """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     plt.figure(figsize=(14, 5))
     if hue == "lib":
         current_palette = sns.color_palette("Set1", n_colors=5)
@@ -207,5 +348,112 @@ def plot_accuracy_barplot(df, hue="algo"):
 
 def plot_benchmark_barplot(df):
     """ Plot a barplot of time taken for each simulation in the df """
+    import seaborn as sns
+
     times = df.explode("times")
     sns.barplot(x="model", y="times", hue="lib", data=times)
+
+
+def plot_throughput(df, fits=None):
+    """ Plot the throughput (repetitions per second) against nrep in the df
+
+    If given, the cost model ``fits`` from ``fit_cost_model`` are drawn as
+    lines.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    df = df.assign(throughput=df.nrep / df["mean"])
+    libs = set(df["lib"])
+    palette = {key: value for key, value in LIB_PALETTE.items() if key in libs}
+    g = sns.scatterplot(
+        x="nrep", y="throughput", hue="lib", style="algo", data=df, palette=palette
+    )
+    if fits is not None:
+        nrep = np.geomspace(df.nrep.min(), df.nrep.max(), 100)
+        for _, fit in fits[fits.lib.isin(libs)].iterrows():
+            g.plot(
+                nrep,
+                nrep / (fit.fixed + fit.marginal * nrep),
+                color=palette.get(fit.lib),
+                linewidth=1,
+            )
+    g.set_xscale("log")
+    g.set_yscale("log")
+    plt.ylabel("Repetitions per second")
+    plt.xlabel("nrep")
+
+
+def plot_accuracy_speed(df, size="max_rss", ax=None):
+    """ Plot the time taken against the accuracy with a resource as marker size
+
+    ``df`` is a benchmark df merged with an accuracy df on lib, algo and
+    model. The marker area is proportional to the resource column ``size``,
+    the peak memory by default (shown in MB), or constant if ``size`` is None.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    libs = set(df["lib"])
+    palette = {key: value for key, value in LIB_PALETTE.items() if key in libs}
+    if size == "max_rss":
+        df = df.assign(**{"Peak memory (MB)": df["max_rss"] / 1e6})
+        size = "Peak memory (MB)"
+    g = sns.scatterplot(
+        x="total_pass",
+        y="mean",
+        hue="lib",
+        style="algo",
+        size=size,
+        sizes=(20, 400),
+        data=df,
+        palette=palette,
+        alpha=0.7,
+        ax=ax,
+    )
+    g.set_yscale("log")
+    plt.xlim(-5, 105)
+    plt.xlabel("Accuracy")
+    plt.ylabel("Time (s)")
+    return g
+
+
+def plot_scaling(df, y="speedup"):
+    """ Plot the speedup or efficiency against the number of cores in the df """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    libs = set(df["lib"])
+    palette = {key: value for key, value in LIB_PALETTE.items() if key in libs}
+    g = sns.lineplot(
+        x="n_procs",
+        y=y,
+        hue="lib",
+        style="parallelism",
+        data=df,
+        palette=palette,
+        marker="o",
+    )
+    if y == "speedup":
+        n_procs = np.sort(df.n_procs.unique())
+        g.plot(n_procs, n_procs, color="gray", linestyle=":", label="ideal")
+        g.set_yscale("log", base=2)
+    g.set_xscale("log", base=2)
+    plt.ylabel(y.capitalize())
+    plt.xlabel("Cores")
+
+
+def plot_network_benchmarks(df, x="n_reactions"):
+    """ Plot the time taken against the network size for each simulation in the df """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    libs = set(df["lib"])
+    palette = {key: value for key, value in LIB_PALETTE.items() if key in libs}
+    g = sns.lineplot(
+        x=x, y="mean", hue="lib", style="algo", data=df, palette=palette, marker="o"
+    )
+    g.set_xscale("log")
+    g.set_yscale("log")
+    plt.ylabel("Time (s)")
+    plt.xlabel("Reactions" if x == "n_reactions" else "Species")
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+
+"""
+    In-process, phase-resolved benchmarks of the Python libraries.
+
+    The import, setup, simulate and (optionally) write phases of a simulation
+    are timed separately within one process, so the reported times are not
+    dominated by interpreter startup and package imports. The results are
+    written in hyperfine's JSON format, with the simulate phase as the main
+    timing and all phases under an extra ``phases`` key.
+"""
+
+import importlib.util
+import json
+import pathlib
+import resource
+import sys
+import tempfile
+import time
+
+import click
+import numpy as np
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parent
+PYTHON_RUNNERS = {
+    "cayenne": "cayenne_test/make_cayenne_results.py",
+    "ensemble": "ensemble_test/make_ensemble_results.py",
+    "Tellurium": "tellurium_test/make_tel_results.py",
+}
+
+
+def load_runner(lib: str):
+    """Import the simulation script of a Python library as a module."""
+    if lib not in PYTHON_RUNNERS:
+        raise ValueError(f"In-process benchmarks are not supported for library: {lib}")
+    runner_path = ROOT_DIR / PYTHON_RUNNERS[lib]
+    # The scripts import their models module from their own folder
+    sys.path.insert(0, str(runner_path.parent))
+    spec = importlib.util.spec_from_file_location(runner_path.stem, runner_path)
+    runner = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(runner)
+    return runner
+
+
+def get_phases(runner, lib: str, model: str, algo: str, nrep: int):
+    """
+        Create the setup, simulate and write phases of a library's simulation
+
+        Returns
+        -------
+        setup : callable
+            Takes no arguments and returns the model
+        simulate : callable
+            Takes the model and returns the results
+        write : callable
+            Takes the results and a file name and writes the results
+    """
+    if lib == "cayenne":
+        setup = lambda: runner.setup_model(model)
+        simulate = lambda sim: runner.simulate_model(sim, algo, nrep)
+        write = runner.write_model
+    elif lib == "ensemble":
+        setup = lambda: runner.setup_model(model)
+        simulate = lambda model_args: runner.simulate_model(model_args, algo, nrep)
+        write = runner.write_model
+    elif lib == "Tellurium":
+        if algo != "direct":
+            raise ValueError(f"Unsupported algorithm for Tellurium: {algo}")
+        setup = lambda: runner.load_model(model)
+        simulate = lambda te_model: runner.simulate_model(te_model, nrep)
+        write = lambda results, file_name: runner.write_model(results, file_name, nrep)
+    else:
+        raise ValueError(f"In-process benchmarks are not supported for library: {lib}")
+    return setup, simulate, write
+
+
+def cpu_times():
+    """Return the user and system CPU time used by this process so far."""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime, usage.ru_stime
+
+
+def summarize_times(times: list) -> dict:
+    """Summarize a list of wall times the way hyperfine does."""
+    times = np.asarray(times, dtype=float)
+    return {
+        "mean": float(times.mean()),
+        "stddev": float(times.std(ddof=1)) if len(times) > 1 else 0.0,
+        "median": float(np.median(times)),
+        "min": float(times.min()),
+        "max": float(times.max()),
+        "times": times.tolist(),
+    }
+
+
+def time_phases(
+    lib: str,
+    model: str,
+    algo: str,
+    nrep: int,
+    runs: int = 7,
+    warmup: int = 1,
+    write: bool = False,
+) -> dict:
+    """
+        Time the phases of a simulation within this process
+
+        Parameters
+        ----------
+        lib : str
+            The stochastic simulation library to be used
+        model : str
+            The id of the model to be simulated
+        algo : {direct, tau_leaping, tau_adaptive}
+            The algorithm to be used for the simulations
+        nrep : int
+            The number of repetitions in the stochastic simulation
+        runs : int
+            The number of timed runs
+        warmup : int
+            The number of untimed runs before the timed ones
+        write : bool
+            Whether to also time writing the results to a trajectory store
+
+        Returns
+        -------
+        dict
+            The result entry of a hyperfine JSON export, with an extra
+            ``phases`` key holding the summary of each phase. The import
+            phase is only timed once since modules are cached after the
+            first import.
+    """
+    start = time.perf_counter()
+    runner = load_runner(lib)
+    import_time = time.perf_counter() - start
+    setup, simulate, write_results = get_phases(runner, lib, model, algo, nrep)
+    phase_times = {"setup": [], "simulate": [], "write": []}
+    user_time, system_time = 0.0, 0.0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = pathlib.Path(tmp_dir) / f"{lib}_{algo}.traj"
+        for i in range(warmup + runs):
+            start = time.perf_counter()
+            sim_model = setup()
+            setup_time = time.perf_counter() - start
+            user_start, system_start = cpu_times()
+            start = time.perf_counter()
+            results = simulate(sim_model)
+            simulate_time = time.perf_counter() - start
+            user_stop, system_stop = cpu_times()
+            if write:
+                start = time.perf_counter()
+                write_results(results, file_name)
+                write_time = time.perf_counter() - start
+            del results
+            if i < warmup:
+                continue
+            phase_times["setup"].append(setup_time)
+            phase_times["simulate"].append(simulate_time)
+            user_time += user_stop - user_start
+            system_time += system_stop - system_start
+            if write:
+                phase_times["write"].append(write_time)
+    result = {"command": f"{lib} {algo} {model} {nrep}"}
+    result.update(summarize_times(phase_times["simulate"]))
+    result["user"] = user_time / runs
+    result["system"] = system_time / runs
+    result["phases"] = {"import": summarize_times([import_time])}
+    for phase, times in phase_times.items():
+        if times:
+            result["phases"][phase] = summarize_times(times)
+    result["warmup"] = warmup
+    return result
+
+
+def time_worker(
+    lib: str, model: str, algo: str, nrep: int, runs: int = 7, warmup: int = 0
+) -> dict:
+    """
+        Time the cold start and warm jobs of a persistent Julia or R worker
+
+        The first job after the worker starts is the cold one, since it
+        also compiles the simulation code. It is followed by ``warmup``
+        untimed jobs and ``runs`` timed warm jobs.
+
+        Returns
+        -------
+        dict
+            The result entry of a hyperfine JSON export of the warm jobs,
+            with the ``startup``, ``cold`` (startup and first job) and
+            ``simulate`` (warm jobs) timings under an extra ``phases`` key.
+    """
+    # run_simulations is only needed here, keep it out of the import phase
+    from run_simulations import get_job_args
+    from workers import WORKER_CMDS, Worker
+
+    if lib not in WORKER_CMDS:
+        raise ValueError(f"Workers are not supported for library: {lib}")
+    args = get_job_args(lib, model, algo, nrep, write=False)
+    worker = Worker(WORKER_CMDS[lib])
+    job_times = []
+    try:
+        for i in range(1 + warmup + runs):
+            start = time.perf_counter()
+            worker.run(args)
+            job_times.append(time.perf_counter() - start)
+    finally:
+        worker.close()
+    result = {"command": f"{WORKER_CMDS[lib]} < {' '.join(args)}"}
+    result.update(summarize_times(job_times[1 + warmup :]))
+    result["phases"] = {
+        "startup": summarize_times([worker.startup_time]),
+        "cold": summarize_times([worker.startup_time + job_times[0]]),
+        "simulate": summarize_times(job_times[1 + warmup :]),
+    }
+    result["warmup"] = warmup
+    return result
+
+
+@click.command()
+@click.option(
+    "--lib",
+    "-l",
+    type=str,
+    help="The stochastic simulation library. Supported libraries: cayenne, Tellurium, and BioSimulator, BioSimulatorIntp, GillespieSSA with --worker.",
+)
+@click.option("--model", "-m", type=str, help="The DSMTS ID of the model to benchmark")
+@click.option(
+    "--algo",
+    "-a",
+    type=str,
+    help="The stochastic algorithm to benchmark. Supported algorithms: direct, tau_leaping, tau_adaptive.",
+)
+@click.option(
+    "--nrep", "-n", type=int, help="The number of repetitions in the simulation"
+)
+@click.option("--runs", "-r", default=7, type=int, help="The number of timed runs")
+@click.option(
+    "--warmup", "-w", default=1, type=int, help="The number of untimed warmup runs"
+)
+@click.option("--write/--no-write", default=False, help="Also time writing the results")
+@click.option(
+    "--worker/--no-worker",
+    default=False,
+    help="Benchmark a persistent Julia or R worker, timing its cold start and warm jobs separately",
+)
+@click.option(
+    "--export-json", "-o", type=str, help="The file to write the benchmark results to"
+)
+def main(
+    lib: str,
+    model: str,
+    algo: str,
+    nrep: int,
+    runs: int,
+    warmup: int,
+    write: bool,
+    worker: bool,
+    export_json: str,
+) -> None:
+    """
+        Time the import, setup, simulate and write phases of a simulation for
+        a given library (lib), model ID (model) and algorithm (algo).
+
+        Examples:
+
+        python phase_benchmarks.py -l cayenne -m 00001 -a direct -n 10000 -o benchmarks/inprocess/cayenne-direct-00001-10000.json
+
+        python phase_benchmarks.py -l BioSimulator -m 00001 -a direct -n 10000 --worker -o benchmarks/worker/BioSimulator-direct-00001-10000.json
+    """
+    if worker:
+        result = time_worker(lib, model, algo, nrep, runs, warmup)
+    else:
+        result = time_phases(lib, model, algo, nrep, runs, warmup, write)
+    for phase, summary in result["phases"].items():
+        print(f"{phase}: {summary['mean']:.4f} s ± {summary['stddev']:.4f} s")
+    if export_json:
+        fpath = pathlib.Path(export_json)
+        fpath.parent.mkdir(parents=True, exist_ok=True)
+        with open(fpath, "w") as fid:
+            json.dump({"results": [result]}, fid, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+"""
+    Resource accounting of the simulation and benchmark jobs.
+
+    A ``ResourceMonitor`` accounts for the child processes that a job starts
+    while it is active: their user and system CPU time and their voluntary
+    and involuntary context switches, from the rusage of the waited
+    children, and the bytes the job wrote to storage, from ``/proc/self/io``.
+    The peak resident memory of the whole process tree is sampled from
+    ``/proc`` on a background thread, since the rusage only gives the peak
+    of the largest single child over the life of the process.
+"""
+
+import os
+import resource
+import threading
+
+# The accounted resources, with the name of their column in the results
+RESOURCE_COLUMNS = [
+    "max_rss",
+    "cpu_user",
+    "cpu_system",
+    "voluntary_switches",
+    "involuntary_switches",
+    "bytes_written",
+]
+
+
+def read_write_bytes() -> int:
+    """Return the bytes this process and its waited children wrote to storage."""
+    try:
+        with open("/proc/self/io") as fid:
+            for line in fid:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def descendants(pid: int) -> list:
+    """Return the ids of the running descendants of a process."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as fid:
+                stat = fid.read()
+        except OSError:
+            continue
+        # The command name, in parentheses, may contain spaces
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    found = []
+    stack = list(children.get(pid, []))
+    while stack:
+        child = stack.pop()
+        found.append(child)
+        stack.extend(children.get(child, []))
+    return found
+
+
+def tree_rss(pid: int) -> int:
+    """
+        Return the resident memory of the descendants of a process, in bytes
+
+        This is the larger of their total current resident memory and the
+        peak of any single one of them.
+    """
+    total, peak = 0, 0
+    for child in descendants(pid):
+        try:
+            with open(f"/proc/{child}/status") as fid:
+                for line in fid:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                    elif line.startswith("VmHWM:"):
+                        peak = max(peak, int(line.split()[1]) * 1024)
+        except OSError:
+            continue
+    return max(total, peak)
+
+
+def _snapshot() -> dict:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "max_rss": usage.ru_maxrss * 1024,
+        "cpu_user": usage.ru_utime,
+        "cpu_system": usage.ru_stime,
+        "voluntary_switches": usage.ru_nvcsw,
+        "involuntary_switches": usage.ru_nivcsw,
+        "bytes_written": read_write_bytes(),
+    }
+
+
+class ResourceMonitor:
+    """Context manager accounting the resources of the children of a job.
+
+    Parameters
+    ----------
+    interval
+        Seconds between samples of the resident memory of the process tree.
+
+    Attributes
+    ----------
+    usage
+        Once the context is exited, a dict with the peak resident memory of
+        the children (``max_rss``, bytes), their user and system CPU time
+        (``cpu_user`` and ``cpu_system``, seconds), their
+        ``voluntary_switches`` and ``involuntary_switches``, and the
+        ``bytes_written`` to storage by the job.
+
+    Notes
+    -----
+    Only children that exited and were waited for within the context are
+    accounted for, and the job should be the only one of this process.
+    """
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.usage = None
+        self._peak_rss = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._start = _snapshot()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        pid = os.getpid()
+        while not self._stop.wait(self.interval):
+            self._peak_rss = max(self._peak_rss, tree_rss(pid))
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        end = _snapshot()
+        self.usage = {
+            column: end[column] - self._start[column] for column in RESOURCE_COLUMNS
+        }
+        # The rusage peak only tells about this job if a child set a new one
+        rusage_peak = end["max_rss"] if end["max_rss"] > self._start["max_rss"] else 0
+        self.usage["max_rss"] = max(self._peak_rss, rusage_peak)
+        return False
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+
+"""
+    Embedded, concurrency-safe store of the accuracy and benchmark results.
+
+    The results live in one SQLite database in WAL mode, so any number of
+    campaigns can record results at the same time while the notebook reads
+    them. Every write is a transactional upsert keyed on (model, lib, algo,
+    nrep, library version), plus the harness for benchmarks, so rerunning a
+    job replaces its row and results of other library versions are kept.
+    Benchmark runs are also appended to a history that is never
+    overwritten, keyed by library version, git commit and host fingerprint,
+    so performance can be compared across upgrades and hardware.
+
+    Tables::
+
+        accuracy        model, lib, algo, nrep, version, test0-3, rtest0-3,
+                        metadata, updated
+        sequential_accuracy
+                        model, lib, algo, nrep, version, test0-3, rtest0-3,
+                        nrep_used, metadata, updated
+        benchmarks      model, lib, algo, nrep, version, harness, mean,
+                        stddev, median, min, max, result, metadata, updated
+        benchmark_runs  id, model, lib, algo, nrep, version, harness,
+                        git_commit, host, mean, stddev, median, min, max,
+                        result, metadata, recorded
+
+    ``result`` is the hyperfine-like result entry as JSON, with the time of
+    every run, and ``metadata`` records the host the results come from.
+    Sequential tests stop counting the failures of a test type at its first
+    failed test, so their counts are lower bounds. They are kept apart, with
+    the number of replicates used, and never exported to the results CSV
+    files.
+"""
+
+from functools import lru_cache
+import hashlib
+import json
+import os
+import pathlib
+import platform
+import sqlite3
+from subprocess import PIPE, Popen, TimeoutExpired
+import time
+
+import click
+
+from resource_usage import RESOURCE_COLUMNS
+
+DB_FILE = "results/results.db"
+TEST_COLUMNS = [
+    "test0",
+    "test1",
+    "test2",
+    "test3",
+    "rtest0",
+    "rtest1",
+    "rtest2",
+    "rtest3",
+]
+TIME_COLUMNS = ["mean", "stddev", "median", "min", "max"]
+# The columns that identify a benchmark configuration in the history
+RUN_KEY = ["lib", "algo", "model", "nrep", "harness"]
+UNKNOWN_VERSION = "unknown"
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS accuracy (
+    model TEXT, lib TEXT, algo TEXT, nrep INTEGER, version TEXT,
+    {", ".join(f"{column} INTEGER" for column in TEST_COLUMNS)},
+    metadata TEXT, updated REAL,
+    PRIMARY KEY (model, lib, algo, nrep, version)
+);
+CREATE TABLE IF NOT EXISTS sequential_accuracy (
+    model TEXT, lib TEXT, algo TEXT, nrep INTEGER, version TEXT,
+    {", ".join(f"{column} INTEGER" for column in TEST_COLUMNS)},
+    nrep_used INTEGER, metadata TEXT, updated REAL,
+    PRIMARY KEY (model, lib, algo, nrep, version)
+);
+CREATE TABLE IF NOT EXISTS benchmarks (
+    model TEXT, lib TEXT, algo TEXT, nrep INTEGER, version TEXT, harness TEXT,
+    {", ".join(f"{column} REAL" for column in TIME_COLUMNS)},
+    result TEXT, metadata TEXT, updated REAL,
+    PRIMARY KEY (model, lib, algo, nrep, version, harness)
+);
+CREATE TABLE IF NOT EXISTS benchmark_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    model TEXT, lib TEXT, algo TEXT, nrep INTEGER, version TEXT, harness TEXT,
+    git_commit TEXT, host TEXT,
+    {", ".join(f"{column} REAL" for column in TIME_COLUMNS)},
+    result TEXT, metadata TEXT, recorded REAL
+);
+CREATE INDEX IF NOT EXISTS benchmark_runs_config
+    ON benchmark_runs (lib, algo, model, nrep, harness);
+"""
+ROOT_DIR = pathlib.Path(__file__).resolve().parent
+VERSION_CMDS = {
+    "BioSimulator": "julia -e 'import Pkg; for p in values(Pkg.dependencies()); p.name == \"BioSimulator\" && println(p.version); end'",
+    "GillespieSSA": "Rscript -e 'cat(as.character(packageVersion(\"GillespieSSA\")))'",
+    "Tellurium": "python -c 'import tellurium; print(tellurium.__version__)'",
+    "cayenne": "python -c 'import cayenne; print(cayenne.__version__)'",
+    # The ensemble engine is part of this repository, its results are
+    # told apart by the git commit and the NumPy version
+    "ensemble": "python -c 'import numpy; print(numpy.__version__)'",
+}
+VERSION_CMDS["BioSimulatorIntp"] = VERSION_CMDS["BioSimulator"]
+
+
+def connect(file_name: str = DB_FILE) -> sqlite3.Connection:
+    """Open the results database in WAL mode, creating it if needed."""
+    pathlib.Path(file_name).parent.mkdir(parents=True, exist_ok=True)
+    # Concurrent writers wait for the lock instead of failing
+    conn = sqlite3.connect(str(file_name), timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+@lru_cache(maxsize=None)
+def library_version(lib: str) -> str:
+    """Return the installed version of a library, or "unknown"."""
+    if lib not in VERSION_CMDS:
+        return UNKNOWN_VERSION
+    proc = Popen(VERSION_CMDS[lib], shell=True, stdout=PIPE, stderr=PIPE)
+    try:
+        stdout, _ = proc.communicate(timeout=300)
+    except TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        return UNKNOWN_VERSION
+    version = stdout.decode().strip()
+    if proc.returncode != 0 or not version:
+        return UNKNOWN_VERSION
+    return version
+
+
+@lru_cache(maxsize=None)
+def git_commit() -> str:
+    """Return the commit of this repository, suffixed with -dirty if modified."""
+    proc = Popen(
+        "git rev-parse --short HEAD && git status --porcelain --untracked-files=no",
+        shell=True,
+        cwd=ROOT_DIR,
+        stdout=PIPE,
+        stderr=PIPE,
+    )
+    stdout, _ = proc.communicate()
+    lines = stdout.decode().splitlines()
+    if proc.returncode != 0 or not lines:
+        return UNKNOWN_VERSION
+    return lines[0] + ("-dirty" if len(lines) > 1 else "")
+
+
+def cpu_model() -> str:
+    """Return the CPU model name, or the machine type if it is unknown."""
+    try:
+        with open("/proc/cpuinfo") as fid:
+            for line in fid:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+@lru_cache(maxsize=None)
+def host_fingerprint():
+    """
+        Return the fingerprint of the hardware and Python the runs are timed on
+
+        Returns
+        -------
+        fingerprint : str
+            A short hash of the details
+        details : dict
+            The CPU model, core count and Python version
+    """
+    details = {
+        "cpu_model": cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+    digest = hashlib.sha1(json.dumps(details, sort_keys=True).encode())
+    return digest.hexdigest()[:12], details
+
+
+def host_metadata(**extra) -> str:
+    return json.dumps(
+        {
+            "host": platform.node(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            **extra,
+        }
+    )
+
+
+def record_accuracy(conn: sqlite3.Connection, data: dict, version: str = None):
+    """
+        Upsert the accuracy test counts of a job
+
+        Parameters
+        ----------
+        conn : sqlite3.Connection
+            The results database
+        data : dict
+            The model, lib, algo, nrep and failed test counts, as returned by
+            ``run_simulation``. The resources of the job (see
+            ``resource_usage.RESOURCE_COLUMNS``) are kept in the metadata.
+            The counts of a sequential test, with the number of replicates
+            it used, ``nrep_used``, go to ``sequential_accuracy``.
+        version : str, optional
+            The library version. Default is the installed version.
+
+        Returns
+        -------
+        bool
+            Whether the counts were recorded. The -1 counts of jobs that
+            failed or timed out are never recorded, so they cannot replace
+            the results of a previous run.
+    """
+    if any(data[column] < 0 for column in TEST_COLUMNS):
+        return False
+    if version is None:
+        version = library_version(data["lib"])
+    extra = {}
+    for column in RESOURCE_COLUMNS:
+        if data.get(column) is not None:
+            extra[column] = data[column]
+    table = "accuracy"
+    columns = ["model", "lib", "algo", "nrep", "version"] + TEST_COLUMNS
+    values = [data["model"], data["lib"], data["algo"], data["nrep"], version]
+    values += [data[column] for column in TEST_COLUMNS]
+    if data.get("nrep_used") is not None:
+        table = "sequential_accuracy"
+        columns.append("nrep_used")
+        values.append(int(data["nrep_used"]))
+    with conn:
+        conn.execute(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}, metadata, updated) "
+            f"VALUES ({', '.join('?' * len(columns))}, ?, ?)",
+            values + [host_metadata(**extra), time.time()],
+        )
+    return True
+
+
+def record_benchmark(
+    conn: sqlite3.Connection,
+    lib: str,
+    algo: str,
+    model: str,
+    nrep: int,
+    harness: str,
+    result: dict,
+    version: str = None,
+    updated: float = None,
+):
+    """
+        Upsert the timings of a benchmark
+
+        ``result`` is a hyperfine-like result entry, with the summary
+        statistics of the runs and their ``times``.
+    """
+    if version is None:
+        version = library_version(lib)
+    if updated is None:
+        updated = time.time()
+    times = [result.get(column) for column in TIME_COLUMNS]
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO benchmarks VALUES "
+            f"(?, ?, ?, ?, ?, ?, {', '.join('?' * len(TIME_COLUMNS))}, ?, ?, ?)",
+            [model, lib, algo, nrep, version, harness]
+            + times
+            + [json.dumps(result), host_metadata(), updated],
+        )
+
+
+def record_benchmark_run(
+    conn: sqlite3.Connection,
+    lib: str,
+    algo: str,
+    model: str,
+    nrep: int,
+    harness: str,
+    result: dict,
+    version: str = None,
+    commit: str = None,
+    recorded: float = None,
+):
+    """
+        Append the timings of a benchmark run to the history
+
+        The run is recorded with the library version, the git commit and the
+        fingerprint of this host. The version and commit default to the
+        installed and checked out ones.
+    """
+    if version is None:
+        version = library_version(lib)
+    if commit is None:
+        commit = git_commit()
+    if recorded is None:
+        recorded = time.time()
+    host, details = host_fingerprint()
+    times = [result.get(column) for column in TIME_COLUMNS]
+    with conn:
+        conn.execute(
+            "INSERT INTO benchmark_runs (model, lib, algo, nrep, version, harness, "
+            f"git_commit, host, {', '.join(TIME_COLUMNS)}, result, metadata, recorded) "
+            f"VALUES ({', '.join('?' * (len(TIME_COLUMNS) + 11))})",
+            [model, lib, algo, nrep, version, harness, commit, host]
+            + times
+            + [json.dumps(result), host_metadata(**details), recorded],
+        )
+
+
+def read_benchmark_runs(conn: sqlite3.Connection, **filters) -> list:
+    """
+        Return the benchmark runs of the history, oldest first
+
+        Keyword arguments filter on the columns of ``benchmark_runs``, e.g.
+        ``lib="cayenne"`` or ``version="1.0.3"``. None values are ignored.
+
+        Returns
+        -------
+        list
+            One dict per run with the columns of ``benchmark_runs``, and the
+            result entry decoded under ``result``
+    """
+    query = "SELECT * FROM benchmark_runs WHERE 1"
+    params = []
+    for column, value in filters.items():
+        if value is not None:
+            query += f" AND {column} = ?"
+            params.append(value)
+    cursor = conn.execute(query + " ORDER BY recorded, id", params)
+    columns = [description[0] for description in cursor.description]
+    runs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    for run in runs:
+        run["result"] = json.loads(run["result"])
+    return runs
+
+
+def record_benchmark_file(
+    conn: sqlite3.Connection,
+    file_name: str,
+    harness: str = "hyperfine",
+    version: str = UNKNOWN_VERSION,
+    history: bool = False,
+):
+    """
+        Upsert a benchmark file named {lib}-{algo}-{model}-{nrep}.json, as of
+        its mtime
+
+        With ``history``, the run is also appended to the history, as a run
+        of the current commit on this host.
+    """
+    fpath = pathlib.Path(file_name)
+    lib, algo, model, nrep = fpath.stem.split("-")
+    with open(fpath) as fid:
+        result = json.load(fid)["results"][0]
+    record_benchmark(
+        conn,
+        lib,
+        algo,
+        model,
+        int(nrep),
+        harness,
+        result,
+        version,
+        fpath.stat().st_mtime,
+    )
+    if history:
+        record_benchmark_run(
+            conn,
+            lib,
+            algo,
+            model,
+            int(nrep),
+            harness,
+            result,
+            version,
+            recorded=fpath.stat().st_mtime,
+        )
+
+
+def import_accuracy_csv(conn: sqlite3.Connection, file_name: str):
+    """
+        Import a results CSV file written by older versions of run_simulations
+
+        The rows are recorded with an unknown version, and never replace
+        results already in the database.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(file_name, dtype={"model": str})
+    columns = ["model", "lib", "algo", "nrep", "version"] + TEST_COLUMNS
+    rows = [
+        [row.model, row.lib, row.algo, int(row.nrep), UNKNOWN_VERSION]
+        + [int(getattr(row, column)) for column in TEST_COLUMNS]
+        + [None, 0.0]
+        for row in df.itertuples()
+    ]
+    with conn:
+        conn.executemany(
+            f"INSERT OR IGNORE INTO accuracy ({', '.join(columns)}, metadata, updated) "
+            f"VALUES ({', '.join('?' * (len(columns) + 2))})",
+            rows,
+        )
+
+
+def read_accuracy(
+    conn: sqlite3.Connection, lib: str = None, nrep: int = 10_000
+) -> "pd.DataFrame":
+    """
+        Return the latest accuracy results in the layout of the results CSV files
+
+        Only the most recently updated version of each (model, lib, algo) is
+        kept. Filter on ``lib`` and ``nrep`` unless they are None.
+    """
+    query = "SELECT * FROM accuracy WHERE 1"
+    params = []
+    if lib is not None:
+        query += " AND lib = ?"
+        params.append(lib)
+    if nrep is not None:
+        query += " AND nrep = ?"
+        params.append(nrep)
+    import pandas as pd
+
+    df = pd.read_sql_query(query, conn, params=params)
+    df = df.sort_values("updated").drop_duplicates(
+        ["model", "lib", "algo", "nrep"], keep="last"
+    )
+    columns = ["model", "lib", "algo", "nrep"] + TEST_COLUMNS
+    return df[columns].sort_values(["model", "lib", "algo"]).reset_index(drop=True)
+
+
+def export_accuracy_csv(conn: sqlite3.Connection, lib: str, file_name: str):
+    """
+        Rewrite a library's results CSV file from the database
+
+        Rows of the file not yet in the database are imported first, so
+        nothing is lost. The file is replaced atomically.
+    """
+    if pathlib.Path(file_name).is_file():
+        import_accuracy_csv(conn, file_name)
+    df = read_accuracy(conn, lib)
+    tmp_name = f"{file_name}.tmp"
+    df.to_csv(tmp_name, index=False)
+    os.replace(tmp_name, file_name)
+    return df
+
+
+@click.command()
+@click.option(
+    "--benchmarks",
+    "-b",
+    multiple=True,
+    help="A folder of hyperfine benchmark files to import. Specify multiple with additional -b tags.",
+)
+@click.option(
+    "--harness",
+    default="hyperfine",
+    type=click.Choice(["hyperfine", "inprocess", "worker", "adaptive"]),
+    help="The harness of the imported benchmark files",
+)
+@click.option(
+    "--accuracy",
+    "-c",
+    multiple=True,
+    help="A results CSV file to import. Specify multiple with additional -c tags.",
+)
+@click.option("--db", default=DB_FILE, help="The results database")
+def main(benchmarks: list, harness: str, accuracy: list, db: str) -> None:
+    """
+        Import existing benchmark and accuracy result files into the results
+        database.
+
+        Examples:
+
+        python results_db.py -b benchmarks -c notebooks/cayenne_results.csv
+    """
+    conn = connect(db)
+    for folder in benchmarks:
+        for fpath in sorted(pathlib.Path(folder).glob("*.json")):
+            record_benchmark_file(conn, fpath, harness)
+    for file_name in accuracy:
+        import_accuracy_csv(conn, file_name)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
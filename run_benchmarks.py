@@ -1,14 +1,50 @@
 #!/usr/bin/env python3
 
+import json
+import os
 import pathlib
 from subprocess import Popen, PIPE, TimeoutExpired
 
 import click
+import numpy as np
 
+from isolation import (
+    default_cores,
+    interference,
+    isolated_env,
+    parse_cores,
+    pin_to,
+    sample_cpu,
+)
+from phase_benchmarks import PYTHON_RUNNERS
+from resource_usage import RESOURCE_COLUMNS, ResourceMonitor
+from results_db import (
+    connect,
+    git_commit,
+    host_fingerprint,
+    library_version,
+    read_benchmark_runs,
+    record_benchmark_file,
+)
 from run_simulations import get_cmd
+from workers import WORKER_CMDS
 
 
-def get_benchmark_cmd(lib: str, model: str, algo: str, nrep: int) -> str:
+def get_benchmark_cmd(
+    lib: str,
+    model: str,
+    algo: str,
+    nrep: int,
+    harness: str = "hyperfine",
+    runs: int = 7,
+    warmup: int = 0,
+    precision: float = 0.02,
+    min_runs: int = 3,
+    max_runs: int = 100,
+    budget: float = 3600.0,
+    max_interference: float = None,
+    discard_noisy: bool = False,
+) -> str:
     """
         Create the benchmark command for the simulation
 
@@ -22,26 +58,212 @@ def get_benchmark_cmd(lib: str, model: str, algo: str, nrep: int) -> str:
             The algorithm to be used for the simulations
         nrep : int
             The number of repetitions in the stochastic simulation
+        harness : {hyperfine, inprocess, worker, adaptive}
+            Time the whole simulation command with hyperfine, time its
+            phases within the Python process (cayenne and Tellurium only),
+            time the cold start and warm jobs of a persistent worker
+            (BioSimulator, BioSimulatorIntp and GillespieSSA only), or time
+            the whole simulation command until its mean time is precise
+        runs : int
+            The number of timed runs
+        warmup : int
+            The number of untimed warmup runs
+        precision : float
+            The target confidence interval half-width of the mean time,
+            relative to the mean, of the adaptive harness
+        min_runs, max_runs : int
+            The smallest and largest number of runs of the adaptive harness
+        budget : float
+            The seconds that all runs of the adaptive harness may take
+        max_interference : float, optional
+            The interference above which the adaptive harness flags a run
+        discard_noisy : bool
+            Whether the adaptive harness discards the flagged runs
 
         Returns
         -------
         str
             The benchmark command
     """
-    sim_cmd = get_cmd(lib, model, algo, nrep)
-    fname = f"benchmarks/{lib}-{algo}-{model}-{nrep}.json"
-    benchmark_cmd = (
-        f"hyperfine --runs 7 --export-json {fname} --show-output '{sim_cmd} False'"
-    )
+    if harness == "hyperfine":
+        sim_cmd = get_cmd(lib, model, algo, nrep, write=False)
+        fname = f"benchmarks/{lib}-{algo}-{model}-{nrep}.json"
+        benchmark_cmd = f"hyperfine --runs {runs} --warmup {warmup} --export-json {fname} --show-output '{sim_cmd}'"
+    elif harness == "inprocess":
+        if lib not in PYTHON_RUNNERS:
+            raise ValueError(
+                f"In-process benchmarks are not supported for library: {lib}"
+            )
+        fname = f"benchmarks/inprocess/{lib}-{algo}-{model}-{nrep}.json"
+        benchmark_cmd = f"python phase_benchmarks.py -l {lib} -m {model} -a {algo} -n {nrep} -r {runs} -w {warmup} -o {fname}"
+    elif harness == "worker":
+        if lib not in WORKER_CMDS:
+            raise ValueError(f"Workers are not supported for library: {lib}")
+        fname = f"benchmarks/worker/{lib}-{algo}-{model}-{nrep}.json"
+        benchmark_cmd = f"python phase_benchmarks.py -l {lib} -m {model} -a {algo} -n {nrep} -r {runs} -w {warmup} --worker -o {fname}"
+    elif harness == "adaptive":
+        fname = f"benchmarks/adaptive/{lib}-{algo}-{model}-{nrep}.json"
+        benchmark_cmd = f"python adaptive_benchmarks.py -l {lib} -m {model} -a {algo} -n {nrep} -w {warmup} --precision {precision} --min-runs {min_runs} --max-runs {max_runs} --budget {budget} -o {fname}"
+        if max_interference is not None:
+            benchmark_cmd += f" --max-interference {max_interference}"
+            if discard_noisy:
+                benchmark_cmd += " --discard-noisy"
+    else:
+        raise ValueError(f"Unsupported harness: {harness}")
     return fname, benchmark_cmd
 
 
+def nrep_grid(nrep_min: int, nrep_max: int, points_per_decade: int = 2) -> list:
+    """Return a log-spaced grid of repetition counts from nrep_min to nrep_max."""
+    n_points = int(round(np.log10(nrep_max / nrep_min) * points_per_decade)) + 1
+    grid = np.geomspace(nrep_min, nrep_max, max(n_points, 1))
+    return sorted(set(int(round(nrep)) for nrep in grid))
+
+
+def per_run_usage(usage: dict, result: dict, warmup: int = 0) -> dict:
+    """
+        Return the resources of a benchmark per simulation run
+
+        The totals of ``usage`` (see ``resource_usage.ResourceMonitor``) are
+        divided by all the runs the harness made, the ``warmup`` and
+        discarded runs included. The peak memory is kept.
+    """
+    n_runs = len(result["times"]) + result.get("warmup", warmup)
+    n_runs = max(n_runs + result.get("discarded_runs", 0), 1)
+    per_run = {column: usage[column] / n_runs for column in RESOURCE_COLUMNS}
+    per_run["max_rss"] = usage["max_rss"]
+    return per_run
+
+
+def run_benchmark(
+    lib: str,
+    model: str,
+    algo: str,
+    nrep: int,
+    timeout: int = 10_000,
+    harness: str = "hyperfine",
+    runs: int = 7,
+    warmup: int = 0,
+    precision: float = 0.02,
+    min_runs: int = 3,
+    max_runs: int = 100,
+    budget: float = 3600.0,
+    force: bool = False,
+    cores: list = None,
+    max_interference: float = 0.05,
+    discard_noisy: bool = False,
+) -> None:
+    """
+        Benchmark a simulation and append the run to the benchmark history
+
+        A configuration is skipped if the history already has a run of it
+        with the installed library version, at the current git commit and on
+        this host, unless ``force`` is set. The results file holds the latest
+        run.
+
+        With ``cores``, the benchmark runs in isolated mode: its process tree
+        is pinned to the cores, with the thread pools capped at their
+        number, and the interference of other processes on them is sampled
+        (see ``isolation.py``). The adaptive harness checks every run, the
+        other harnesses the whole benchmark. Results above
+        ``max_interference`` are flagged, or discarded with
+        ``discard_noisy``.
+
+        The resources of the benchmark processes (see ``resource_usage.py``)
+        are added to the results file, per simulation run.
+    """
+    print(
+        f"Running library: {lib}, algorithm: {algo}, model: {model} with nrep = {nrep}"
+    )
+    fname, cmd = get_benchmark_cmd(
+        lib,
+        model,
+        algo,
+        nrep,
+        harness,
+        runs,
+        warmup,
+        precision,
+        min_runs,
+        max_runs,
+        budget,
+        max_interference if cores else None,
+        discard_noisy,
+    )
+    fpath = pathlib.Path(fname)
+    version = library_version(lib)
+    conn = connect()
+    previous_runs = read_benchmark_runs(
+        conn,
+        lib=lib,
+        algo=algo,
+        model=model,
+        nrep=nrep,
+        harness=harness,
+        version=version,
+        git_commit=git_commit(),
+        host=host_fingerprint()[0],
+    )
+    conn.close()
+    if previous_runs and not force:
+        print(
+            f"Benchmarks already exist for {fpath.stem} with {lib} {version} "
+            f"at commit {git_commit()} on this host"
+        )
+        return None
+    popen_kwargs = {}
+    sampled_cores = sorted(os.sched_getaffinity(0))
+    if cores:
+        popen_kwargs = {"env": isolated_env(len(cores)), "preexec_fn": pin_to(cores)}
+        sampled_cores = cores
+    before = sample_cpu(sampled_cores)
+    with ResourceMonitor() as monitor:
+        proc = Popen(cmd, shell=True, stderr=PIPE, stdout=PIPE, **popen_kwargs)
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except TimeoutExpired:
+            print(f"{cmd} timeout")
+            proc.kill()
+            stdout, stderr = proc.communicate()
+    after = sample_cpu(sampled_cores)
+    if proc.returncode != 0:
+        print(f"{cmd} failed")
+    elif fpath.is_file():
+        with open(fpath) as fid:
+            data = json.load(fid)
+        result = data["results"][0]
+        if cores and harness != "adaptive":
+            value = interference(before, after, len(cores))
+            if value > max_interference and discard_noisy:
+                print(f"Discarding {fpath.stem}, {value:.1%} interference")
+                fpath.unlink()
+                return None
+            result.update(
+                {
+                    "cores": cores,
+                    "interference": value,
+                    "max_interference": max_interference,
+                    "noisy": value > max_interference,
+                    "load_before": before["load"],
+                    "load_after": after["load"],
+                }
+            )
+            if value > max_interference:
+                print(f"Flagging {fpath.stem}, {value:.1%} interference")
+        result.update(per_run_usage(monitor.usage, result, warmup))
+        with open(fpath, "w") as fid:
+            json.dump(data, fid, indent=2)
+        conn = connect()
+        record_benchmark_file(conn, fpath, harness, version, history=True)
+        conn.close()
+
+
 @click.command()
 @click.option(
     "--lib",
     "-l",
     type=str,
-    help="The stochastic simulation library. Supported libraries: cayenne, BioSimulator, BioSimulatorIntp, GillespieSSA, Tellurium.",
+    help="The stochastic simulation library. Supported libraries: cayenne, BioSimulator, BioSimulatorIntp, ensemble, GillespieSSA, Tellurium.",
 )
 @click.option("--model", "-m", type=str, help="The DSMTS ID of the model to benchmark")
 @click.option(
@@ -59,37 +281,152 @@ def get_benchmark_cmd(lib: str, model: str, algo: str, nrep: int) -> str:
 @click.option(
     "--timeout", "-t", default=10_000, type=int, help="Seconds to wait until timeout"
 )
-def main(lib: str, model: str, algo: str, nrep: int, timeout: int) -> None:
+@click.option(
+    "--harness",
+    default="hyperfine",
+    type=click.Choice(["hyperfine", "inprocess", "worker", "adaptive"]),
+    help="Time the whole command with hyperfine, the import, setup and simulate phases within the Python process (cayenne and Tellurium only), the cold start and warm jobs of a persistent Julia or R worker, or the whole command until its mean time is precise.",
+)
+@click.option("--runs", "-r", default=7, type=int, help="The number of timed runs")
+@click.option(
+    "--warmup", "-w", default=0, type=int, help="The number of untimed warmup runs"
+)
+@click.option(
+    "--precision",
+    default=0.02,
+    type=float,
+    help="With --harness adaptive, the target confidence interval half-width of the mean time, relative to the mean",
+)
+@click.option(
+    "--min-runs",
+    default=3,
+    type=int,
+    help="With --harness adaptive, the minimum number of runs",
+)
+@click.option(
+    "--max-runs",
+    default=100,
+    type=int,
+    help="With --harness adaptive, the maximum number of runs",
+)
+@click.option(
+    "--budget",
+    default=3600.0,
+    type=float,
+    help="With --harness adaptive, the seconds that all runs may take in total",
+)
+@click.option(
+    "--force/--no-force",
+    default=False,
+    help="Rerun benchmarks that the history already has for this library version, commit and host",
+)
+@click.option(
+    "--isolate/--no-isolate",
+    default=False,
+    help="Pin the benchmark to dedicated cores, cap the BLAS, OpenMP and Julia threads at their number, and check the runs for interference from other processes",
+)
+@click.option(
+    "--cores",
+    type=str,
+    help="With --isolate, the cores to pin the benchmark to, e.g. 2,3 or 4-7. Default is the last core.",
+)
+@click.option(
+    "--max-interference",
+    default=0.05,
+    type=float,
+    help="With --isolate, the fraction of the cores' time used by other processes above which a run is noisy",
+)
+@click.option(
+    "--discard-noisy/--flag-noisy",
+    default=False,
+    help="With --isolate, discard noisy runs instead of flagging them",
+)
+@click.option(
+    "--sweep/--no-sweep",
+    default=False,
+    help="Benchmark every nrep of a log-spaced grid instead of a single nrep",
+)
+@click.option("--nrep-min", default=10, type=int, help="The smallest nrep of the sweep")
+@click.option(
+    "--nrep-max", default=100_000, type=int, help="The largest nrep of the sweep"
+)
+@click.option(
+    "--points-per-decade",
+    default=2,
+    type=int,
+    help="The number of nrep values per decade of the sweep",
+)
+def main(
+    lib: str,
+    model: str,
+    algo: str,
+    nrep: int,
+    timeout: int,
+    harness: str,
+    runs: int,
+    warmup: int,
+    precision: float,
+    min_runs: int,
+    max_runs: int,
+    budget: float,
+    force: bool,
+    isolate: bool,
+    cores: str,
+    max_interference: float,
+    discard_noisy: bool,
+    sweep: bool,
+    nrep_min: int,
+    nrep_max: int,
+    points_per_decade: int,
+) -> None:
     """
         Benchmark a stochastic simulation for a given library (lib), model ID
         (model) and algorithm (algo).
 
-        NOTE: You need `hyperfine` installed to run this script. It can be
-        found here: https://github.com/sharkdp/hyperfine .
+        NOTE: You need `hyperfine` installed to run this script with the
+        default harness. It can be found here:
+        https://github.com/sharkdp/hyperfine .
 
         Examples:
 
         python run_benchmarks --lib cayenne --model 00001 --algo direct --nrep 10000
 
         python run_benchmarks -l cayenne -m 00001 -a direct -n 10000
+
+        python run_benchmarks -l cayenne -m 00001 -a direct -n 10000 --harness inprocess --warmup 1
+
+        python run_benchmarks -l GillespieSSA -m 00001 -a direct -n 10000 --harness adaptive --precision 0.01 --budget 7200
+
+        python run_benchmarks -l cayenne -m 00001 -a direct -n 10000 --isolate --cores 2,3 --discard-noisy
+
+        python run_benchmarks -l cayenne -m 00001 -a direct --sweep --nrep-min 10 --nrep-max 100000
     """
-    print(
-        f"Running library: {lib}, algorithm: {algo}, model: {model} with nrep = {nrep}"
-    )
-    fname, cmd = get_benchmark_cmd(lib, model, algo, nrep)
-    fpath = pathlib.Path(fname)
-    if fpath.exists() and fpath.is_file():
-        print(f"Benchmarks already exist for {fpath.stem}")
-        return None
-    proc = Popen(cmd, shell=True, stderr=PIPE, stdout=PIPE)
-    try:
-        stdout, stderr = proc.communicate(timeout=timeout)
-    except TimeoutExpired:
-        print(f"{cmd} timeout")
-        proc.kill()
-        stdout, stderr = proc.communicate()
-    if proc.returncode != 0:
-        print(f"{cmd} failed")
+    pinned_cores = None
+    if isolate:
+        pinned_cores = parse_cores(cores) if cores else default_cores()
+    if sweep:
+        nreps = nrep_grid(nrep_min, nrep_max, points_per_decade)
+    else:
+        nreps = [nrep]
+    for this_nrep in nreps:
+        run_benchmark(
+            lib,
+            model,
+            algo,
+            this_nrep,
+            timeout,
+            harness,
+            runs,
+            warmup,
+            precision,
+            min_runs,
+            max_runs,
+            budget,
+            force,
+            pinned_cores,
+            max_interference,
+            discard_noisy,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import click
+
+from run_benchmarks import run_benchmark
+from synthetic_networks import network_id, write_model_files
+
+
+@click.command()
+@click.option(
+    "--libs",
+    "-l",
+    multiple=True,
+    help="The stochastic simulation libraries. Specify multiple with additional -l tags. Supported libraries: cayenne, BioSimulator, BioSimulatorIntp, ensemble, GillespieSSA, Tellurium.",
+)
+@click.option(
+    "--algos",
+    "-a",
+    multiple=True,
+    help="The stochastic algorithms to be used. Specify multiple with additional -a tags. Supported algorithms: direct, tau_leaping, tau_adaptive.",
+)
+@click.option(
+    "--species",
+    "-s",
+    multiple=True,
+    type=int,
+    default=[10, 30, 100, 300],
+    help="The numbers of species of the networks. Specify multiple with additional -s tags.",
+)
+@click.option(
+    "--reactions-per-species",
+    default=2,
+    type=int,
+    help="The number of reactions per species of the networks",
+)
+@click.option(
+    "--max-order", default=2, type=int, help="The largest order of the reactions"
+)
+@click.option(
+    "--max-products",
+    default=2,
+    type=int,
+    help="The largest number of product molecules of a reaction",
+)
+@click.option("--seed", default=0, type=int, help="The seed of the network generator")
+@click.option(
+    "--nrep",
+    "-n",
+    default=100,
+    type=int,
+    help="The number of repetitions in the stochastic simulation",
+)
+@click.option(
+    "--harness",
+    default="hyperfine",
+    type=click.Choice(["hyperfine", "inprocess", "worker"]),
+    help="The benchmark harness, see run_benchmarks.py",
+)
+@click.option("--runs", "-r", default=3, type=int, help="The number of timed runs")
+@click.option(
+    "--warmup", "-w", default=0, type=int, help="The number of untimed warmup runs"
+)
+@click.option(
+    "--timeout", "-t", default=10_000, type=int, help="Seconds to wait until timeout"
+)
+def main(
+    libs: list,
+    algos: list,
+    species: list,
+    reactions_per_species: int,
+    max_order: int,
+    max_products: int,
+    seed: int,
+    nrep: int,
+    harness: str,
+    runs: int,
+    warmup: int,
+    timeout: int,
+) -> None:
+    """
+        Benchmark libraries (libs) and algorithms (algos) on synthetic
+        reaction networks of increasing size.
+
+        The networks are generated by synthetic_networks.py and named
+        syn_S{species}_R{reactions}_O{max_order}_P{max_products}_s{seed}.
+        The results are written to the benchmarks folder like any other
+        benchmark.
+
+        Examples:
+
+        python run_network_benchmarks.py -l cayenne -l GillespieSSA -a direct -s 10 -s 100 -n 100
+    """
+    for n_species in species:
+        model = network_id(
+            n_species, reactions_per_species * n_species, max_order, max_products, seed
+        )
+        write_model_files(model)
+        for lib in libs:
+            for algo in algos:
+                if lib == "Tellurium" and algo != "direct":
+                    continue
+                run_benchmark(lib, model, algo, nrep, timeout, harness, runs, warmup)
+
+
+if __name__ == "__main__":
+    main()
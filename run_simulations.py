@@ -1,38 +1,193 @@
 #!/usr/bin/env python3
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from functools import partial
-import multiprocessing as mp
+import json
+import os
 import pathlib
+import shutil
 from subprocess import Popen, PIPE, TimeoutExpired
 import sys
+import time
 
 import click
-import pandas as pd
+import numpy as np
 
-from accuracy.accuracy import test_accuracy
+from accuracy.accuracy import make_sequential_test, read_reference, test_accuracy
+from accuracy.plots import plot_data_path, render_plots, save_plot_data, stale_plots
+from accuracy.streaming import read_summary, summary_path
+from accuracy.trajstore import (
+    merge_trajectories,
+    read_header,
+    read_trajectories,
+    store_path,
+)
+from resource_usage import ResourceMonitor
+from results_db import connect, export_accuracy_csv, record_accuracy
+from scheduler import (
+    estimate_costs,
+    longest_first,
+    predict_makespan,
+    read_history,
+    record_job,
+    write_history,
+)
+from workers import WORKER_CMDS, get_worker
+
+
+def timed_wrapper(x, func):
+    """Run the indexed job x = (index, args) and also return its duration."""
+    index, args = x
+    start = time.time()
+    result = func(*args)
+    return index, result, time.time() - start
+
+
+SIM_SCRIPTS = {
+    "BioSimulator": "julia biosimjl_test/make_biosim_results.jl",
+    "BioSimulatorIntp": "julia biosimjl_test/make_biosim_results.jl",
+    "Tellurium": "python tellurium_test/make_tel_results.py",
+    "GillespieSSA": "Rscript GillespieSSA_test/make_gillespieSSA_results.R",
+    "cayenne": "python cayenne_test/make_cayenne_results.py",
+    "ensemble": "python ensemble_test/make_ensemble_results.py",
+}
 
 
-def wrapper(x, func):
-    return func(*x)
+# The master seed of new jobs, the default seed of the library's script
+DEFAULT_SEEDS = {"Tellurium": 1234}
 
+# The libraries whose scripts support each output mode
+STREAM_LIBS = ["cayenne", "ensemble", "Tellurium"]
+GRID_LIBS = ["cayenne", "ensemble", "Tellurium"]
+EVENT_LIBS = ["cayenne", "Tellurium"]
 
-def get_cmd(lib, model, algo, nrep):
+
+def get_job_args(
+    lib,
+    model,
+    algo,
+    nrep,
+    write=True,
+    out=None,
+    seed=None,
+    stream=False,
+    first_rep=None,
+    grid=False,
+    events=False,
+):
+    """
+        Create the arguments of a library's simulation script
+
+        Parameters
+        ----------
+        lib : str
+            The stochastic simulation library to be used
+        model : str
+            The id of the model to be simulated
+        algo : {direct, tau_leaping, tau_adaptive}
+            The algorithm to be used for the simulations
+        nrep : int
+            The number of repetitions in the stochastic simulation
+        write : bool
+            Whether the simulation results are written to disk
+        out : str, optional
+            The file to write the results to. Default is the library's
+            trajectory store in the results folder. With ``stream``, only its
+            position matters, as the scripts write their summary to
+            ``summary_path``.
+        seed : int, optional
+            The seed of the simulations, only used together with ``out``
+        stream : bool
+            Compute the accuracy statistics while simulating instead of
+            writing results (cayenne, ensemble and Tellurium only)
+        first_rep : int, optional
+            The number of the first replicate of a shard, only used together
+            with ``out``. Each replicate is then simulated with its own seed,
+            derived from ``seed`` and its number (see accuracy/seeds.py).
+        grid : bool
+            Write each repetition only at the analytical time points of the
+            model instead of at every event (cayenne, ensemble and Tellurium
+            only, the ensemble always does)
+        events : bool
+            Write the exact trajectories as compact event logs (see
+            accuracy/eventlog.py) instead of trajectory stores (cayenne and
+            Tellurium only), exclusive with ``grid``
+
+        Returns
+        -------
+        list of str
+            The arguments, also accepted by the Julia and R workers
+    """
+    if grid and events:
+        raise ValueError("Grid output cannot be written as event logs")
+    if stream:
+        if lib not in STREAM_LIBS:
+            raise ValueError(f"Streaming accuracy is not supported for library: {lib}")
+        flag = "Stream"
+    elif grid and write:
+        if lib not in GRID_LIBS:
+            raise ValueError(f"Grid output is not supported for library: {lib}")
+        flag = "Grid"
+    elif events and write:
+        if lib not in EVENT_LIBS:
+            raise ValueError(f"Event logs are not supported for library: {lib}")
+        flag = "Events"
+    else:
+        flag = "True" if write else "False"
     if lib == "BioSimulator":
-        cmd = f"julia biosimjl_test/make_biosim_results.jl {model} {algo} {nrep} False"
+        args = [model, algo, nrep, "False", flag]
     elif lib == "BioSimulatorIntp":
-        cmd = f"julia biosimjl_test/make_biosim_results.jl {model} {algo} {nrep} True"
+        args = [model, algo, nrep, "True", flag]
     elif lib == "Tellurium":
-        cmd = f"python tellurium_test/make_tel_results.py {model} {nrep} True"
-    elif lib == "GillespieSSA":
-        cmd = f"Rscript GillespieSSA_test/make_gillespieSSA_results.R {model} {algo} {nrep}"
-    elif lib == "cayenne":
-        cmd = f"python cayenne_test/make_cayenne_results.py {model} {algo} {nrep} True"
+        args = [model, nrep, flag]
+    elif lib in ["GillespieSSA", "cayenne", "ensemble"]:
+        args = [model, algo, nrep, flag]
     else:
         raise ValueError(f"Unsupported library: {lib}")
-    return cmd
+    if out is not None:
+        args += [out, seed if seed is not None else 0]
+        if first_rep is not None:
+            args.append(first_rep)
+    return [str(arg) for arg in args]
+
+
+def get_cmd(
+    lib,
+    model,
+    algo,
+    nrep,
+    write=True,
+    out=None,
+    seed=None,
+    stream=False,
+    first_rep=None,
+    grid=False,
+    events=False,
+):
+    """
+        Create the command that simulates a model with a library
+
+        Takes the same parameters as ``get_job_args``.
+
+        Returns
+        -------
+        str
+            The simulation command
+    """
+    args = get_job_args(
+        lib, model, algo, nrep, write, out, seed, stream, first_rep, grid, events
+    )
+    return " ".join([SIM_SCRIPTS[lib]] + args)
 
 
 def results_check(lib, model, algo, nrep):
+    store_file = pathlib.Path(store_path(model, lib, algo))
+    if store_file.is_file():
+        try:
+            n_stored, _, _ = read_header(store_file)
+        except OSError:
+            n_stored = 0
+        return n_stored >= nrep
     if algo:
         folder_name = f"{lib}_{algo}"
     else:
@@ -49,27 +204,404 @@ def results_check(lib, model, algo, nrep):
     return check
 
 
-def run_simulation(lib, model, algo, nrep, timeout=10_000):
-    print(
-        f"Running library: {lib}, algorithm: {algo}, model: {model} with nrep = {nrep}"
+def manifest_path(lib, model, algo):
+    return f"results/{model}/{lib}_{algo}.manifest.json"
+
+
+def read_manifest(lib, model, algo):
+    """Read the manifest of completed chunks, or start an empty one."""
+    fpath = pathlib.Path(manifest_path(lib, model, algo))
+    if fpath.is_file():
+        with open(fpath) as fid:
+            return json.load(fid)
+    seed = DEFAULT_SEEDS.get(lib, 0)
+    return {"lib": lib, "model": model, "algo": algo, "seed": seed, "chunks": []}
+
+
+def write_manifest(manifest):
+    """Atomically replace the manifest on disk."""
+    fpath = pathlib.Path(
+        manifest_path(manifest["lib"], manifest["model"], manifest["algo"])
+    )
+    fpath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = fpath.with_name(fpath.name + ".tmp")
+    with open(tmp_path, "w") as fid:
+        json.dump(manifest, fid, indent=2)
+    os.replace(tmp_path, fpath)
+
+
+def missing_chunks(manifest, nrep, chunk_size):
+    """Return the (start, stop) replicate ranges not yet in the manifest."""
+    done = np.zeros(nrep, dtype=bool)
+    for chunk in manifest["chunks"]:
+        done[chunk["start"] : min(chunk["stop"], nrep)] = True
+    chunks = []
+    start = 0
+    while start < nrep:
+        if done[start]:
+            start += 1
+            continue
+        stop = start
+        while stop < nrep and not done[stop] and stop - start < chunk_size:
+            stop += 1
+        chunks.append((start, stop))
+        start = stop
+    return chunks
+
+
+def stored_chunks(manifest):
+    """Return the chunks of the manifest whose trajectory store still exists."""
+    store_file = pathlib.Path(
+        store_path(manifest["model"], manifest["lib"], manifest["algo"])
     )
-    if not results_check(lib, model, algo, nrep):
-        cmd = get_cmd(lib, model, algo, nrep)
-        proc = Popen(cmd, shell=True, stderr=PIPE, stdout=PIPE)
+    if manifest.get("merged"):
+        return manifest["chunks"] if store_file.is_file() else []
+    parts_dir = pathlib.Path(f"{store_file}.parts")
+    return [
+        chunk for chunk in manifest["chunks"] if (parts_dir / chunk["file"]).is_file()
+    ]
+
+
+def missing_replicates(lib, model, algo, nrep):
+    """Return how many of the first nrep replicates of a job are not stored."""
+    if results_check(lib, model, algo, nrep):
+        return 0
+    manifest = read_manifest(lib, model, algo)
+    manifest["chunks"] = stored_chunks(manifest)
+    chunks = missing_chunks(manifest, nrep, max(nrep, 1))
+    return sum(stop - start for start, stop in chunks)
+
+
+def shard_size(nrep, chunk_size, n_shards):
+    """Return the chunk size that gives each of the n_shards shards some work."""
+    return max(1, min(chunk_size, -(-nrep // max(n_shards, 1))))
+
+
+def generate_replicates(
+    lib,
+    model,
+    algo,
+    nrep,
+    timeout,
+    chunk_size,
+    use_workers=False,
+    n_shards=1,
+    grid=False,
+    events=False,
+):
+    """
+        Simulate the replicates of a job in committed chunks
+
+        Each chunk is a shard of the job: it is written to its own trajectory
+        store and recorded in a manifest once it is complete. Up to
+        ``n_shards`` chunks are simulated at a time, each in its own process.
+        Every replicate has its own seed, derived from the job's master seed
+        and its number, so the results do not depend on the chunk size or on
+        the number of shards, except for the ensemble, which simulates each
+        chunk from a single generator. A restarted job only simulates the replicates
+        missing from the manifest. When all chunks are done they are merged,
+        in replicate order, into the library's trajectory store. With
+        ``use_workers``, the chunks of the Julia and R libraries are run one
+        at a time by a persistent worker instead of a new process each. With
+        ``grid``, the replicates are only stored at the analytical time
+        points, and with ``events`` as event logs (see ``get_job_args``).
+
+        Returns
+        -------
+        bool
+            True if all ``nrep`` replicates were generated
+    """
+    manifest = read_manifest(lib, model, algo)
+    # Manifests written before per-replicate seeds have no master seed
+    master_seed = manifest.setdefault("seed", DEFAULT_SEEDS.get(lib, 0))
+    store_file = pathlib.Path(store_path(model, lib, algo))
+    parts_dir = pathlib.Path(f"{store_file}.parts")
+    merged_file = parts_dir / "merged.traj"
+    if manifest.get("merged") and store_file.is_file():
+        # More replicates are wanted than were merged, extend the store
+        parts_dir.mkdir(parents=True, exist_ok=True)
+        os.replace(store_file, merged_file)
+        manifest["merged"] = False
+    # Chunks whose store was deleted, like a removed merged store, are
+    # simulated again
+    manifest["chunks"] = stored_chunks(manifest)
+    manifest["merged"] = False
+    write_manifest(manifest)
+    end_time = time.time() + timeout
+    use_workers = use_workers and lib in WORKER_CMDS
+
+    def run_chunk(start, stop):
+        remaining = end_time - time.time()
+        if remaining <= 0:
+            print(
+                f"Timeout before replicates {start + 1}-{stop} of {lib}, {algo}, {model}"
+            )
+            return None
+        part_file = parts_dir / f"{start + 1}-{stop}.traj"
+        job_args = dict(out=part_file, seed=master_seed, first_rep=start)
+        if use_workers:
+            args = get_job_args(lib, model, algo, stop - start, **job_args)
+            run_worker_job(lib, args, remaining)
+        else:
+            cmd = get_cmd(
+                lib, model, algo, stop - start, grid=grid, events=events, **job_args
+            )
+            run_cmd(cmd, remaining)
         try:
-            stdout, stderr = proc.communicate(timeout=timeout)
-        except TimeoutExpired:
-            print(f"{cmd} timeout")
-            proc.kill()
-            stdout, stderr = proc.communicate()
-        if proc.returncode != 0:
-            print(f"{cmd} failed")
-    else:
-        print(f"Results already exist for {lib}, {algo}, {model}")
+            n_stored, _, _ = read_header(part_file)
+        except OSError:
+            n_stored = 0
+        if n_stored != stop - start:
+            print(f"Replicates {start + 1}-{stop} of {lib}, {algo}, {model} incomplete")
+            return None
+        return part_file
+
+    complete = True
+    chunks = missing_chunks(manifest, nrep, shard_size(nrep, chunk_size, n_shards))
+    with ThreadPoolExecutor(max_workers=1 if use_workers else n_shards) as executor:
+        futures = {
+            executor.submit(run_chunk, start, stop): (start, stop)
+            for start, stop in chunks
+        }
+        for future in as_completed(futures):
+            start, stop = futures[future]
+            part_file = future.result()
+            if part_file is None:
+                complete = False
+                continue
+            manifest["chunks"].append(
+                {"start": start, "stop": stop, "file": part_file.name}
+            )
+            write_manifest(manifest)
+    if not complete:
+        return False
+    chunks = sorted(manifest["chunks"], key=lambda chunk: chunk["start"])
+    part_files = []
+    for chunk in chunks:
+        part_file = parts_dir / chunk["file"]
+        if part_file not in part_files:
+            part_files.append(part_file)
+    merge_trajectories(part_files, store_file)
+    shutil.rmtree(parts_dir)
+    for chunk in chunks:
+        chunk["file"] = merged_file.name
+    manifest["chunks"] = chunks
+    manifest["merged"] = True
+    write_manifest(manifest)
+    return True
+
+
+def check_options(lib, stream, grid, events, sequential):
+    """
+        Check that the output options are supported by the library and can be
+        combined, raising ``click.UsageError`` if not
+    """
+    if stream:
+        for name, value in [
+            ("--grid", grid),
+            ("--events", events),
+            ("--sequential", sequential),
+        ]:
+            if value:
+                raise click.UsageError(f"--stream cannot be combined with {name}")
+    if grid and events:
+        raise click.UsageError("--grid cannot be combined with --events")
+    for name, value, libs in [
+        ("--stream", stream, STREAM_LIBS),
+        ("--grid", grid, GRID_LIBS),
+        ("--events", events, EVENT_LIBS),
+    ]:
+        if value and lib not in libs:
+            raise click.BadParameter(
+                f"not supported by the {lib} library, only by {', '.join(libs)}",
+                param_hint=name,
+            )
+
+
+def run_cmd(cmd, timeout):
+    proc = Popen(cmd, shell=True, stderr=PIPE, stdout=PIPE)
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except TimeoutExpired:
+        print(f"{cmd} timeout")
+        proc.kill()
+        stdout, stderr = proc.communicate()
+    if proc.returncode != 0:
+        print(f"{cmd} failed")
+    return proc.returncode
+
+
+def run_worker_job(lib, args, timeout):
+    job = " ".join(args)
     try:
-        failed_list = test_accuracy(model, lib, algo, nrep)
-    except OSError:
-        failed_list = [-1, -1, -1, -1, -1, -1, -1, -1]
+        get_worker(lib).run(args, timeout)
+    except TimeoutError:
+        print(f"{lib} worker job {job} timeout")
+        return 1
+    except (RuntimeError, OSError) as err:
+        print(f"{lib} worker job {job} failed: {err}")
+        return 1
+    return 0
+
+
+def run_sequential(
+    lib,
+    model,
+    algo,
+    nrep,
+    timeout,
+    chunk_size,
+    use_workers=False,
+    n_shards=1,
+    grid=False,
+    events=False,
+):
+    """
+        Simulate a job in batches until its accuracy verdict is settled
+
+        Each batch of ``chunk_size * n_shards`` replicates is added to the
+        trajectory store, as with ``generate_replicates``, and folded into a
+        ``SequentialAccuracyTest``. The job stops as soon as every test has
+        passed or failed, or after ``nrep`` replicates. Replicates already
+        in the store are reused, so a rerun costs no new simulations.
+
+        Returns
+        -------
+        SequentialAccuracyTest
+            The test, with the number of replicates used as ``n_rep``
+    """
+    test = make_sequential_test(
+        model, algo, nrep, saved_results_interpolated=lib == "BioSimulatorIntp"
+    )
+    end_time = time.time() + timeout
+    batch = chunk_size * max(n_shards, 1)
+    n_done = 0
+    while n_done < nrep:
+        n_next = min(n_done + batch, nrep)
+        if not results_check(lib, model, algo, n_next):
+            remaining = end_time - time.time()
+            if not generate_replicates(
+                lib,
+                model,
+                algo,
+                n_next,
+                remaining,
+                chunk_size,
+                use_workers,
+                n_shards,
+                grid,
+                events,
+            ):
+                raise OSError(f"Replicates of {lib}, {algo}, {model} incomplete")
+        store = read_trajectories(store_path(model, lib, algo))
+        first, last = store.offsets[n_done], store.offsets[n_next]
+        test.add_trajectories(
+            store.offsets[n_done : n_next + 1] - first,
+            store.time[first:last],
+            store.states[first:last],
+        )
+        n_done = n_next
+        if test.update():
+            break
+    z_arr, y_arr, mu_obs, std_obs = test.running.calculate_zy()
+    time_list, mu_list, std_list = read_reference(model)
+    save_plot_data(
+        plot_data_path(model, lib, algo, nrep),
+        time_list,
+        mu_list,
+        std_list,
+        mu_obs,
+        std_obs,
+        z_arr,
+        y_arr,
+    )
+    return test
+
+
+def run_simulation(
+    lib,
+    model,
+    algo,
+    nrep,
+    timeout=10_000,
+    stream=False,
+    chunk_size=1000,
+    use_workers=False,
+    n_shards=1,
+    sequential=False,
+    grid=False,
+    events=False,
+    n_procs=None,
+):
+    print(
+        f"Running library: {lib}, algorithm: {algo}, model: {model} with nrep = {nrep}"
+    )
+    # Replicates simulated by this run, not read from an earlier one
+    nrep_simulated = 0
+    # Resources of the simulation processes started for this job
+    with ResourceMonitor() as monitor:
+        if stream:
+            # Accuracy statistics are computed by the simulation script itself
+            summary_file = summary_path(model, lib, algo)
+            if pathlib.Path(summary_file).is_file():
+                pathlib.Path(summary_file).unlink()
+            # Streamed replicates are seeded like the stored ones of the job
+            seed = read_manifest(lib, model, algo)["seed"]
+            cmd = get_cmd(
+                lib, model, algo, nrep, out=summary_file, seed=seed, stream=True
+            )
+            run_cmd(cmd, timeout)
+            try:
+                failed_list = read_summary(summary_file)["failed_list"]
+                nrep_simulated = nrep
+            except OSError:
+                failed_list = [-1, -1, -1, -1, -1, -1, -1, -1]
+        elif sequential:
+            n_stored = nrep - missing_replicates(lib, model, algo, nrep)
+            try:
+                test = run_sequential(
+                    lib,
+                    model,
+                    algo,
+                    nrep,
+                    timeout,
+                    chunk_size,
+                    use_workers,
+                    n_shards,
+                    grid,
+                    events,
+                )
+                failed_list = test.failed_list()
+                nrep_used = test.n_rep
+                nrep_simulated = max(nrep_used - n_stored, 0)
+                print(
+                    f"{lib}, {algo}, {model} settled with {nrep_used} of {nrep} replicates"
+                )
+            except OSError:
+                failed_list = [-1, -1, -1, -1, -1, -1, -1, -1]
+                nrep_used = None
+        else:
+            n_missing = missing_replicates(lib, model, algo, nrep)
+            if n_missing:
+                if generate_replicates(
+                    lib,
+                    model,
+                    algo,
+                    nrep,
+                    timeout,
+                    chunk_size,
+                    use_workers,
+                    n_shards,
+                    grid,
+                    events,
+                ):
+                    nrep_simulated = n_missing
+            else:
+                print(f"Results already exist for {lib}, {algo}, {model}")
+            try:
+                failed_list = test_accuracy(model, lib, algo, nrep, n_procs)
+            except OSError:
+                failed_list = [-1, -1, -1, -1, -1, -1, -1, -1]
     data = {
         "model": model,
         "lib": lib,
@@ -83,33 +615,23 @@ def run_simulation(lib, model, algo, nrep, timeout=10_000):
         "rtest1": failed_list[5],
         "rtest2": failed_list[6],
         "rtest3": failed_list[7],
+        "nrep_simulated": nrep_simulated,
     }
+    if sequential:
+        data["nrep_used"] = nrep_used
+    data.update(monitor.usage)
     return data
 
 
-def update_file(file_name, data_list):
-    df = pd.read_csv(file_name, dtype={"model": str})
-    condn = lambda x, y, z: (df["model"] == x) & (df["lib"] == y) & (df["algo"] == z)
-    for data_item in data_list:
-        model = data_item["model"]
-        lib = data_item["lib"]
-        algo = data_item["algo"]
-        row = df.loc[condn(model, lib, algo)]
-        if row.shape[0] == 0:
-            df = df.append(data_item, ignore_index=True)
-        elif row.shape[0] == 1:
-            df.loc[row.index, "test0"] = data_item["test0"]
-            df.loc[row.index, "test1"] = data_item["test1"]
-            df.loc[row.index, "test2"] = data_item["test2"]
-            df.loc[row.index, "test3"] = data_item["test3"]
-            df.loc[row.index, "rtest0"] = data_item["rtest0"]
-            df.loc[row.index, "rtest1"] = data_item["rtest1"]
-            df.loc[row.index, "rtest2"] = data_item["rtest2"]
-            df.loc[row.index, "rtest3"] = data_item["rtest3"]
-        else:
-            raise RuntimeError("Data file contains duplicate rows")
-    df.to_csv(file_name, index=False)
-    return df
+def stale_job_plots(simulation_args):
+    """
+        Return the stale plot data files of the jobs, not those of other runs
+    """
+    job_files = {
+        plot_data_path(model, lib, algo, nrep)
+        for lib, model, algo, nrep in simulation_args
+    }
+    return [data_file for data_file in stale_plots() if data_file in job_files]
 
 
 @click.command()
@@ -117,7 +639,7 @@ def update_file(file_name, data_list):
     "--lib",
     "-l",
     type=str,
-    help="The stochastic simulation library. Supported libraries: cayenne, BioSimulator, BioSimulatorIntp, GillespieSSA, Tellurium.",
+    help="The stochastic simulation library. Supported libraries: cayenne, BioSimulator, BioSimulatorIntp, ensemble, GillespieSSA, Tellurium.",
 )
 @click.option(
     "--models",
@@ -141,7 +663,66 @@ def update_file(file_name, data_list):
     help="The number of CPU processes to use for accuracy test.",
 )
 @click.option("--save/--no-save", default=False, help="Save results of the simulation")
-def main(lib: str, models: list, algos: list, nrep: int, nprocs: int, save: bool):
+@click.option(
+    "--stream/--no-stream",
+    default=False,
+    help="Compute accuracy statistics while simulating without storing trajectories. Supported libraries: cayenne, ensemble, Tellurium.",
+)
+@click.option(
+    "--grid/--no-grid",
+    default=False,
+    help="Store each repetition only at the time points of the analytical results instead of at every reaction event. Supported libraries: cayenne, ensemble (always on the grid), Tellurium.",
+)
+@click.option(
+    "--events/--no-events",
+    default=False,
+    help="Store the trajectories of exact algorithms as compact logs of reaction events, about 3 times smaller than the default stores. Supported libraries: cayenne, Tellurium.",
+)
+@click.option(
+    "--chunk-size",
+    "-c",
+    default=1000,
+    type=int,
+    help="The number of repetitions simulated and saved at a time. An interrupted run resumes from the last saved chunk.",
+)
+@click.option(
+    "--shards",
+    "-s",
+    default=1,
+    type=int,
+    help="The number of processes that simulate the chunks of a job at the same time. The results do not depend on it, except for the ensemble library.",
+)
+@click.option(
+    "--sequential/--no-sequential",
+    default=False,
+    help="Simulate in batches of chunk-size times shards repetitions and stop as soon as the accuracy tests are settled, using at most nrep repetitions.",
+)
+@click.option(
+    "--plots/--no-plots",
+    default=True,
+    help="Render the accuracy plots of the jobs once they are all scored, skipping plots whose data did not change.",
+)
+@click.option(
+    "--workers/--no-workers",
+    default=False,
+    help="Run the simulations of the Julia and R libraries in persistent sessions, so packages are loaded and compiled once per process. Supported libraries: BioSimulator, BioSimulatorIntp, GillespieSSA.",
+)
+def main(
+    lib: str,
+    models: list,
+    algos: list,
+    nrep: int,
+    nprocs: int,
+    save: bool,
+    stream: bool,
+    grid: bool,
+    events: bool,
+    chunk_size: int,
+    shards: int,
+    sequential: bool,
+    plots: bool,
+    workers: bool,
+):
     """
         Run stochastic simulations for the library (lib), model IDs (models) and algorithms (algos).
 
@@ -151,20 +732,72 @@ def main(lib: str, models: list, algos: list, nrep: int, nprocs: int, save: bool
 
         python run_simulations.py -l cayenne -m 00001 -m 00003 -a direct -a tau_leaping -n 10000 -p 4 --save
     """
+    # Fail before any job starts rather than in the pool workers
+    check_options(lib, stream, grid, events, sequential)
     simulation_args = []
     for model in models:
         for algo in algos:
             simulation_args.append((lib, model, algo, nrep))
-    func = partial(wrapper, func=run_simulation)
-    with mp.Pool(processes=nprocs) as pool:
-        data_map = pool.map(func, simulation_args)
-    data_list = list(data_map)
+    n_procs = nprocs if nprocs else os.cpu_count()
+    func = partial(
+        timed_wrapper,
+        func=partial(
+            run_simulation,
+            stream=stream,
+            chunk_size=chunk_size,
+            use_workers=workers,
+            n_shards=shards,
+            sequential=sequential,
+            grid=grid,
+            events=events,
+            # The cores left to each of the n_procs jobs that run at once
+            n_procs=max(1, os.cpu_count() // n_procs),
+        ),
+    )
+    # Longest jobs first, each idle process pulls the next job
+    history = read_history()
+    costs, calibrated = estimate_costs(simulation_args, history)
+    order = longest_first(costs)
+    data_list = [None] * len(simulation_args)
+    publish = save and nrep == 10_000
+    conn = connect()
+    start = time.time()
+    # Unlike those of mp.Pool, the workers of a ProcessPoolExecutor are not
+    # daemonic, so a job can read its CSV folders with a pool of its own,
+    # of its share of the cores.
+    # The jobs are queued in order and taken by the first idle worker.
+    with ProcessPoolExecutor(max_workers=n_procs) as executor:
+        futures = [executor.submit(func, (i, simulation_args[i])) for i in order]
+        for future in as_completed(futures):
+            index, data, seconds = future.result()
+            data_list[index] = data
+            # Each job is committed as soon as it is done, if its results
+            # are to be published
+            if publish:
+                record_accuracy(conn, data)
+            # Only runs that simulated the whole job calibrate its cost, not
+            # cached, resumed, stopped early or failed ones
+            if data["nrep_simulated"] == nrep:
+                record_job(history, simulation_args[index], seconds)
+    makespan = time.time() - start
+    write_history(history)
+    predicted = predict_makespan(costs, n_procs)
+    if calibrated:
+        print(f"Makespan: {makespan:.1f} s, predicted {predicted:.1f} s")
+    else:
+        print(f"Makespan: {makespan:.1f} s, no job history to predict it")
+    if plots:
+        rendered = render_plots(stale_job_plots(simulation_args), n_procs=n_procs)
+        print(f"Rendered {len(rendered)} accuracy plots")
     file_name = f"results/{lib}_results.csv"
-    if save and nrep == 10_000:
+    if publish:
         print("Updating the results file")
-        df = update_file(file_name, data_list)
+        export_accuracy_csv(conn, lib, file_name)
     else:
         print("Not updating the results file")
+    conn.close()
+    import pandas as pd
+
     df = pd.DataFrame(data_list)
     print(df)
 
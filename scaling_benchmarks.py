@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+"""
+    Multi-core scaling benchmarks.
+
+    A simulation is timed across a ladder of core counts, either with the
+    library's own parallelism (cayenne's ``n_procs``) or with a
+    replicate-level process-parallel baseline that runs the library's
+    simulation script in several processes, each with a share of the
+    repetitions. The baseline works for every library, so libraries can be
+    compared on the same hardware.
+"""
+
+import json
+import os
+import pathlib
+from subprocess import Popen, DEVNULL, TimeoutExpired
+import time
+
+import click
+
+from phase_benchmarks import load_runner, summarize_times
+from run_simulations import get_cmd
+
+NATIVE_PARALLEL_LIBS = ["cayenne"]
+
+
+def core_ladder(max_procs: int) -> list:
+    """Return the core counts 1, 2, 4, ... up to and including max_procs."""
+    ladder = [1]
+    while ladder[-1] * 2 < max_procs:
+        ladder.append(ladder[-1] * 2)
+    if max_procs > 1:
+        ladder.append(max_procs)
+    return ladder
+
+
+def split_reps(nrep: int, n_procs: int) -> list:
+    """Split nrep repetitions into n_procs shares that differ by at most 1."""
+    shares = [nrep // n_procs] * n_procs
+    for i in range(nrep % n_procs):
+        shares[i] += 1
+    return [share for share in shares if share > 0]
+
+
+def time_native(
+    lib: str, model: str, algo: str, nrep: int, n_procs: int, runs: int
+) -> list:
+    """Time the library's own parallel simulation of nrep repetitions."""
+    if lib not in NATIVE_PARALLEL_LIBS:
+        raise ValueError(f"Native parallelism is not supported for library: {lib}")
+    runner = load_runner(lib)
+    sim_model = runner.setup_model(model)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        runner.simulate_model(sim_model, algo, nrep, n_procs=n_procs)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def time_process_parallel(
+    lib: str,
+    model: str,
+    algo: str,
+    nrep: int,
+    n_procs: int,
+    runs: int,
+    timeout: float = 10_000,
+) -> list:
+    """
+        Time nrep repetitions split across n_procs concurrent processes
+
+        Each process runs the library's simulation script, without writing
+        results, on its share of the repetitions. The time is the wall time
+        until the last process finishes, including process startup.
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        procs = [
+            Popen(
+                get_cmd(lib, model, algo, share, write=False),
+                shell=True,
+                stdout=DEVNULL,
+                stderr=DEVNULL,
+            )
+            for share in split_reps(nrep, n_procs)
+        ]
+        try:
+            for proc in procs:
+                proc.wait(max(timeout - (time.perf_counter() - start), 0))
+        except TimeoutExpired:
+            for proc in procs:
+                proc.kill()
+            raise
+        if any(proc.returncode != 0 for proc in procs):
+            raise RuntimeError(f"{lib} {algo} {model} failed on {n_procs} processes")
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def saturation_point(n_procs: list, speedups: list, min_gain: float = 0.05) -> int:
+    """
+        Return the core count at which the speedup saturates
+
+        This is the smallest core count that no larger core count improves on
+        by more than ``min_gain`` (relative).
+    """
+    for i, speedup in enumerate(speedups):
+        if all(other <= speedup * (1 + min_gain) for other in speedups[i + 1 :]):
+            return n_procs[i]
+    return n_procs[-1]
+
+
+def run_scaling(
+    lib: str,
+    model: str,
+    algo: str,
+    nrep: int,
+    max_procs: int,
+    mode: str = "strong",
+    parallelism: str = "native",
+    runs: int = 3,
+    timeout: float = 10_000,
+) -> dict:
+    """
+        Time a simulation across a ladder of core counts
+
+        Parameters
+        ----------
+        lib : str
+            The stochastic simulation library to be used
+        model : str
+            The id of the model to be simulated
+        algo : {direct, tau_leaping, tau_adaptive}
+            The algorithm to be used for the simulations
+        nrep : int
+            The total number of repetitions for strong scaling, or the number
+            of repetitions per core for weak scaling
+        max_procs : int
+            The largest core count of the ladder
+        mode : {strong, weak}
+            Keep the total work fixed (strong) or the work per core (weak)
+        parallelism : {native, process}
+            Use the library's own parallelism or the process-parallel
+            baseline
+        runs : int
+            The number of timed runs per core count
+
+        Returns
+        -------
+        dict
+            One hyperfine-like result entry per core count under ``results``,
+            with its ``speedup`` and parallel ``efficiency`` relative to one
+            core, and the ``saturation`` core count. For weak scaling the
+            speedup is the scaled speedup ``n_procs * T1 / Tn``.
+    """
+    if mode not in ["strong", "weak"]:
+        raise ValueError(f"Unsupported scaling mode: {mode}")
+    if parallelism == "native":
+        time_func = time_native
+    elif parallelism == "process":
+        time_func = lambda *args: time_process_parallel(*args, timeout=timeout)
+    else:
+        raise ValueError(f"Unsupported parallelism: {parallelism}")
+    ladder = core_ladder(max_procs)
+    results = []
+    for n_procs in ladder:
+        total_nrep = nrep * n_procs if mode == "weak" else nrep
+        print(f"{lib}, {algo}, {model}: nrep = {total_nrep} on {n_procs} cores")
+        times = time_func(lib, model, algo, total_nrep, n_procs, runs)
+        result = {"n_procs": n_procs, "nrep": total_nrep}
+        result.update(summarize_times(times))
+        results.append(result)
+    base_time = results[0]["mean"]
+    for result in results:
+        if mode == "strong":
+            result["speedup"] = base_time / result["mean"]
+        else:
+            result["speedup"] = result["n_procs"] * base_time / result["mean"]
+        result["efficiency"] = result["speedup"] / result["n_procs"]
+    return {
+        "lib": lib,
+        "algo": algo,
+        "model": model,
+        "mode": mode,
+        "parallelism": parallelism,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+        "saturation": saturation_point(
+            ladder, [result["speedup"] for result in results]
+        ),
+    }
+
+
+@click.command()
+@click.option(
+    "--lib",
+    "-l",
+    type=str,
+    help="The stochastic simulation library. Supported libraries: cayenne, BioSimulator, BioSimulatorIntp, ensemble, GillespieSSA, Tellurium.",
+)
+@click.option("--model", "-m", type=str, help="The DSMTS ID of the model to benchmark")
+@click.option(
+    "--algo",
+    "-a",
+    type=str,
+    help="The stochastic algorithm to benchmark. Supported algorithms: direct, tau_leaping, tau_adaptive.",
+)
+@click.option(
+    "--nrep",
+    "-n",
+    type=int,
+    help="The total number of repetitions (strong scaling) or the number per core (weak scaling)",
+)
+@click.option(
+    "--max-procs",
+    "-p",
+    default=os.cpu_count(),
+    type=int,
+    help="The largest number of cores. Defaults to all cores.",
+)
+@click.option(
+    "--mode",
+    default="strong",
+    type=click.Choice(["strong", "weak"]),
+    help="Scaling mode",
+)
+@click.option(
+    "--parallelism",
+    type=click.Choice(["native", "process"]),
+    help="Use the library's own parallelism (cayenne only) or run the simulation script in several processes. Defaults to native where supported.",
+)
+@click.option("--runs", "-r", default=3, type=int, help="The number of timed runs")
+@click.option(
+    "--timeout", "-t", default=10_000, type=int, help="Seconds to wait until timeout"
+)
+def main(
+    lib: str,
+    model: str,
+    algo: str,
+    nrep: int,
+    max_procs: int,
+    mode: str,
+    parallelism: str,
+    runs: int,
+    timeout: int,
+) -> None:
+    """
+        Benchmark the strong or weak scaling of a stochastic simulation for a
+        given library (lib), model ID (model) and algorithm (algo).
+
+        Examples:
+
+        python scaling_benchmarks.py -l cayenne -m 00001 -a direct -n 10000 -p 32
+
+        python scaling_benchmarks.py -l GillespieSSA -m 00001 -a direct -n 1000 -p 32 --mode weak
+    """
+    if parallelism is None:
+        parallelism = "native" if lib in NATIVE_PARALLEL_LIBS else "process"
+    fpath = pathlib.Path(
+        f"benchmarks/scaling/{lib}-{algo}-{model}-{nrep}-{mode}-{parallelism}.json"
+    )
+    if fpath.is_file():
+        print(f"Benchmarks already exist for {fpath.stem}")
+        return None
+    scaling = run_scaling(
+        lib, model, algo, nrep, max_procs, mode, parallelism, runs, timeout
+    )
+    for result in scaling["results"]:
+        print(
+            f"{result['n_procs']} cores: {result['mean']:.4f} s, "
+            f"speedup {result['speedup']:.2f}, efficiency {result['efficiency']:.2f}"
+        )
+    print(f"Saturates at {scaling['saturation']} cores")
+    fpath.parent.mkdir(parents=True, exist_ok=True)
+    with open(fpath, "w") as fid:
+        json.dump(scaling, fid, indent=2)
+
+
+if __name__ == "__main__":
+    main()
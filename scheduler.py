@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+"""
+    Cost-model-driven scheduling of the simulation jobs.
+
+    The cost of a (lib, model, algo, nrep) job is predicted from the time its
+    last complete run took, scaled to the new nrep. Runs that reused stored
+    replicates, stopped early or failed are not recorded. Jobs without
+    history fall back to a heuristic, the number of reaction events expected
+    from the initial propensities and max_t, converted to seconds with the
+    history of the other jobs of the library. Jobs are dispatched longest
+    first to workers that pull the next job as soon as they are idle.
+"""
+
+import heapq
+import importlib.util
+import json
+import os
+import pathlib
+
+import numpy as np
+
+HISTORY_FILE = "results/job_history.json"
+ROOT_DIR = pathlib.Path(__file__).resolve().parent
+_MODELS = None
+
+
+def job_key(lib: str, model: str, algo: str) -> str:
+    return f"{lib}|{model}|{algo}"
+
+
+def read_history(file_name: str = HISTORY_FILE) -> dict:
+    """Read the recorded job durations, or start an empty history."""
+    fpath = pathlib.Path(file_name)
+    if fpath.is_file():
+        with open(fpath) as fid:
+            return json.load(fid)
+    return {}
+
+
+def write_history(history: dict, file_name: str = HISTORY_FILE):
+    """Atomically replace the job history on disk."""
+    fpath = pathlib.Path(file_name)
+    fpath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = fpath.with_name(fpath.name + ".tmp")
+    with open(tmp_path, "w") as fid:
+        json.dump(history, fid, indent=2)
+    os.replace(tmp_path, fpath)
+
+
+def record_job(history: dict, job: tuple, seconds: float):
+    """Record the duration of a (lib, model, algo, nrep) job that simulated
+    all nrep replicates."""
+    lib, model, algo, nrep = job
+    history[job_key(lib, model, algo)] = {
+        "nrep": nrep,
+        "seconds": seconds,
+        "heuristic": heuristic_cost(model, algo, nrep),
+    }
+
+
+def _load_models():
+    """Import the cayenne model table, shared by all libraries."""
+    global _MODELS
+    if _MODELS is None:
+        models_path = ROOT_DIR / "cayenne_test" / "models.py"
+        spec = importlib.util.spec_from_file_location("cayenne_models", models_path)
+        _MODELS = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_MODELS)
+    return _MODELS
+
+
+def expected_events(model: str) -> float:
+    """
+        Return the number of reaction events expected per repetition
+
+        This is the total propensity at the initial state times max_t, with
+        cayenne's propensities (rate times the falling factorial of the
+        reactant amounts).
+    """
+    _, _, V_r, _, X0, k, max_t, _, _ = _load_models().get_model(model)
+    propensities = np.array(k, dtype=float)
+    for i, x0 in enumerate(X0):
+        for j in np.nonzero(V_r[i])[0]:
+            propensities[j] *= np.prod(x0 - np.arange(V_r[i, j]))
+    return float(propensities.sum() * max_t)
+
+
+def heuristic_cost(model: str, algo: str, nrep: int) -> float:
+    """
+        Return a relative cost of a job without history
+
+        The cost is the number of events expected over all repetitions. If
+        the model table cannot be loaded, it is the number of repetitions.
+    """
+    try:
+        return nrep * (1 + expected_events(model))
+    except (ImportError, KeyError, ValueError):
+        return float(nrep)
+
+
+def _calibrate(points: list):
+    """Fit seconds = fixed + scale * heuristic to (heuristic, seconds) points."""
+    heuristic, seconds = np.array(points, dtype=float).T
+    if len(points) > 1 and np.ptp(heuristic) > 0:
+        scale, fixed = np.polyfit(heuristic, seconds, 1)
+        if scale > 0 and fixed >= 0:
+            return fixed, scale
+    return 0.0, float(np.median(seconds / heuristic))
+
+
+def estimate_costs(jobs: list, history: dict):
+    """
+        Predict the cost of each job
+
+        Parameters
+        ----------
+        jobs : list
+            The (lib, model, algo, nrep) jobs
+        history : dict
+            The recorded job durations
+
+        Returns
+        -------
+        costs : list
+            The predicted cost of each job, in seconds if ``calibrated``
+        calibrated : bool
+            Whether there was enough history to predict the costs in seconds
+    """
+    # Fit seconds = fixed + scale * heuristic on the history of each library
+    points = {}
+    for key, entry in history.items():
+        if entry.get("heuristic"):
+            lib = key.split("|")[0]
+            points.setdefault(lib, []).append((entry["heuristic"], entry["seconds"]))
+    scales = {lib: _calibrate(lib_points) for lib, lib_points in points.items()}
+    costs = []
+    calibrated = True
+    for lib, model, algo, nrep in jobs:
+        entry = history.get(job_key(lib, model, algo))
+        if entry is not None:
+            costs.append(entry["seconds"] * nrep / entry["nrep"])
+        elif lib in scales:
+            fixed, scale = scales[lib]
+            costs.append(fixed + scale * heuristic_cost(model, algo, nrep))
+        else:
+            costs.append(heuristic_cost(model, algo, nrep))
+            calibrated = False
+    return costs, calibrated
+
+
+def longest_first(costs: list) -> list:
+    """Return the job indices sorted by decreasing cost."""
+    return sorted(range(len(costs)), key=lambda i: costs[i], reverse=True)
+
+
+def predict_makespan(costs: list, n_procs: int) -> float:
+    """Return the makespan of dispatching the jobs longest first to n_procs workers."""
+    finish_times = [0.0] * max(1, min(n_procs, len(costs)))
+    for i in longest_first(costs):
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + costs[i])
+    return max(finish_times)
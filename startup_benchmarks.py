@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+"""
+    Startup-time benchmarks of the entry points.
+
+    Each entry point is imported in fresh interpreters with ``-X importtime``,
+    which reports the time spent in every import. The entry points should
+    cost little more than their numpy and click imports, the baseline, and
+    should not import any of the heavy packages (matplotlib, pandas, scipy,
+    seaborn or the simulation libraries), which are only imported when they
+    are used. The times are compared with the previous results, so slower
+    startups are flagged as regressions.
+"""
+
+import json
+import pathlib
+from subprocess import PIPE, run
+import sys
+
+import click
+
+from phase_benchmarks import ROOT_DIR, summarize_times
+
+ENTRY_POINTS = ["run_simulations", "run_benchmarks", "accuracy.accuracy"]
+BASELINE = "numpy, click"
+HEAVY_MODULES = ["cayenne", "matplotlib", "pandas", "scipy", "seaborn", "tellurium"]
+STARTUP_FILE = "benchmarks/startup.json"
+
+
+def parse_importtime(stderr: str):
+    """
+        Parse the output of ``python -X importtime``
+
+        Returns
+        -------
+        seconds : float
+            The total import time, the sum of the cumulative times of the
+            top-level imports
+        modules : list
+            The names of all imported modules
+    """
+    seconds = 0.0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("imported package"):
+            continue
+        _, cumulative, name = line.split("|")
+        modules.append(name.strip())
+        # Nested imports are indented under the module that imports them
+        if not name[1:].startswith(" "):
+            seconds += int(cumulative) * 1e-6
+    return seconds, modules
+
+
+def time_import(module: str, runs: int = 10):
+    """
+        Import a module in ``runs`` fresh interpreters
+
+        Returns
+        -------
+        dict
+            The hyperfine-like summary of the import times and the heavy
+            modules that were imported
+    """
+    times = []
+    heavy = set()
+    for _ in range(runs):
+        proc = run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT_DIR,
+            stdout=PIPE,
+            stderr=PIPE,
+            universal_newlines=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{proc.stderr}")
+        seconds, modules = parse_importtime(proc.stderr)
+        times.append(seconds)
+        heavy.update(name.split(".")[0] for name in modules)
+    summary = summarize_times(times)
+    summary["heavy_modules"] = sorted(heavy.intersection(HEAVY_MODULES))
+    return summary
+
+
+def check_startup(
+    results: dict, previous: dict = None, max_overhead: float = 0.1, tolerance=0.25
+) -> list:
+    """
+        Return the problems found in the startup times
+
+        An entry point is flagged if it imports a heavy module, if its median
+        import time exceeds the baseline's by more than ``max_overhead``
+        seconds, or if it is more than ``tolerance`` (relative) slower than
+        in the ``previous`` results.
+    """
+    problems = []
+    baseline = results[BASELINE]["median"]
+    for module in ENTRY_POINTS:
+        result = results[module]
+        if result["heavy_modules"]:
+            problems.append(
+                f"{module} imports {', '.join(result['heavy_modules'])} at startup"
+            )
+        if result["median"] > baseline + max_overhead:
+            problems.append(
+                f"{module} takes {result['median']:.3f} s to import, "
+                f"over the budget of {baseline + max_overhead:.3f} s"
+            )
+        if previous and module in previous:
+            before = previous[module]["median"]
+            if result["median"] > before * (1 + tolerance):
+                problems.append(
+                    f"{module} regressed from {before:.3f} s to {result['median']:.3f} s"
+                )
+    return problems
+
+
+@click.command()
+@click.option(
+    "--runs", "-r", default=10, type=int, help="The number of imports per entry point"
+)
+@click.option(
+    "--max-overhead",
+    default=0.1,
+    type=float,
+    help="The import time allowed on top of numpy and click, in seconds",
+)
+@click.option(
+    "--tolerance",
+    default=0.25,
+    type=float,
+    help="The relative slowdown from the previous results flagged as a regression",
+)
+@click.option("--output", "-o", default=STARTUP_FILE, help="The results file")
+def main(runs: int, max_overhead: float, tolerance: float, output: str) -> None:
+    """
+        Benchmark the import time of the entry points and flag regressions.
+
+        Exits with status 1 if any problem is found, so it can run in CI.
+
+        Examples:
+
+        python startup_benchmarks.py -r 20
+    """
+    fpath = pathlib.Path(output)
+    previous = None
+    if fpath.is_file():
+        with open(fpath) as fid:
+            previous = json.load(fid)
+    results = {}
+    for module in [BASELINE] + ENTRY_POINTS:
+        results[module] = time_import(module, runs)
+        print(f"{module}: {results[module]['median']:.3f} s")
+    problems = check_startup(results, previous, max_overhead, tolerance)
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+    # Only a clean run becomes the reference for the next comparison
+    fpath.parent.mkdir(parents=True, exist_ok=True)
+    with open(fpath, "w") as fid:
+        json.dump(results, fid, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+
+"""
+    Random, well-posed reaction networks of any size for speed benchmarks.
+
+    A synthetic model is identified by a string such as
+    ``syn_S100_R200_O2_P2_s0``: 100 species, 200 reactions, reactions of order
+    up to 2 with up to 2 product molecules, generated with seed 0 (the ``O``,
+    ``P`` and ``s`` fields are optional). The same network is emitted in the
+    format of each library, so it can be simulated by every runner.
+
+    The networks are well-posed: every species has a first-order decay, a few
+    species have a constant source, and no other reaction produces more
+    molecules than it consumes. Molecule counts therefore stay bounded.
+"""
+
+from collections import namedtuple
+from math import factorial
+import os
+import pathlib
+import re
+
+import numpy as np
+
+SYNTHETIC_PREFIX = "syn_"
+SYNTHETIC_FOLDER = "results/synthetic"
+_ID_PATTERN = re.compile(
+    r"^syn_S(?P<n_species>\d+)_R(?P<n_reactions>\d+)"
+    r"(?:_O(?P<max_order>\d+))?(?:_P(?P<max_products>\d+))?(?:_s(?P<seed>\d+))?$"
+)
+
+Network = namedtuple(
+    "Network",
+    ["name", "species_names", "rxn_names", "V_r", "V_p", "X0", "rates", "max_t"],
+)
+
+
+def is_synthetic(model_id: str) -> bool:
+    return model_id.startswith(SYNTHETIC_PREFIX)
+
+
+def network_id(
+    n_species: int,
+    n_reactions: int,
+    max_order: int = 2,
+    max_products: int = 2,
+    seed: int = 0,
+) -> str:
+    """Return the model id of a synthetic network."""
+    return f"syn_S{n_species}_R{n_reactions}_O{max_order}_P{max_products}_s{seed}"
+
+
+def parse_network_id(model_id: str) -> dict:
+    """Return the generator parameters encoded in a synthetic model id."""
+    match = _ID_PATTERN.match(model_id)
+    if match is None:
+        raise ValueError(f"Invalid synthetic model id: {model_id}")
+    params = {"max_order": 2, "max_products": 2, "seed": 0}
+    params.update(
+        {key: int(value) for key, value in match.groupdict().items() if value}
+    )
+    return params
+
+
+def generate_network(
+    n_species: int,
+    n_reactions: int,
+    max_order: int = 2,
+    max_products: int = 2,
+    seed: int = 0,
+    x0_max: int = 100,
+    max_t: float = 50.0,
+) -> Network:
+    """
+        Generate a random, well-posed reaction network
+
+        Parameters
+        ----------
+        n_species : int
+            The number of species
+        n_reactions : int
+            The number of reactions, at least ``n_species`` for the decays
+        max_order : int
+            The largest number of reactant molecules of a reaction (1 to 3)
+        max_products : int
+            The largest number of product molecules of a reaction. Never more
+            than its number of reactants, which controls the sparsity of the
+            stoichiometry matrices.
+        seed : int
+            The seed of the generator
+        x0_max : int
+            The largest initial amount of a species
+        max_t : float
+            The simulation end time
+
+        Returns
+        -------
+        Network
+            The stoichiometry matrices ``V_r`` and ``V_p`` of shape
+            ``(n_species, n_reactions)``, initial amounts ``X0`` and
+            stochastic rate constants ``rates``. The propensity of a reaction
+            is its rate times the number of distinct combinations of its
+            reactant molecules.
+    """
+    if n_reactions < n_species:
+        raise ValueError("A network needs at least one reaction per species")
+    if not 1 <= max_order <= 3:
+        raise ValueError("max_order should be between 1 and 3")
+    rng = np.random.RandomState(seed)
+    V_r = np.zeros((n_species, n_reactions), dtype=np.int64)
+    V_p = np.zeros((n_species, n_reactions), dtype=np.int64)
+    rates = np.zeros(n_reactions)
+    X0 = rng.randint(x0_max // 10, x0_max + 1, size=n_species).astype(np.int64)
+    x_typical = X0.mean()
+    # Every species decays
+    V_r[np.arange(n_species), np.arange(n_species)] = 1
+    rates[:n_species] = 10 ** rng.uniform(-2, -1, size=n_species)
+    # A few species have a source, balancing the decays on average
+    n_sources = min(max(1, n_species // 10), n_reactions - n_species)
+    for j in range(n_species, n_species + n_sources):
+        V_p[rng.randint(n_species), j] = 1
+        rates[j] = 10 ** rng.uniform(-1, 0) * x_typical
+    for j in range(n_species + n_sources, n_reactions):
+        order = rng.randint(1, max_order + 1)
+        n_products = rng.randint(0, min(order, max_products) + 1)
+        while True:
+            reactants = np.bincount(
+                rng.randint(n_species, size=order), minlength=n_species
+            )
+            products = np.bincount(
+                rng.randint(n_species, size=n_products), minlength=n_species
+            )
+            if (reactants != products).any():
+                break
+        V_r[:, j] = reactants
+        V_p[:, j] = products
+        rates[j] = 10 ** rng.uniform(-2, 0) / x_typical ** (order - 1)
+    return Network(
+        name=network_id(n_species, n_reactions, max_order, max_products, seed),
+        species_names=[f"S{i + 1}" for i in range(n_species)],
+        rxn_names=[f"r{j + 1}" for j in range(n_reactions)],
+        V_r=V_r,
+        V_p=V_p,
+        X0=X0,
+        rates=rates,
+        max_t=max_t,
+    )
+
+
+def get_network(model_id: str) -> Network:
+    """Generate the synthetic network of a model id."""
+    return generate_network(**parse_network_id(model_id))
+
+
+def initial_propensities(network: Network) -> np.ndarray:
+    """Return the propensity of each reaction at the initial amounts."""
+    combinations = np.ones(len(network.rxn_names))
+    for i, x0 in enumerate(network.X0):
+        for j in np.nonzero(network.V_r[i])[0]:
+            n = network.V_r[i, j]
+            combinations[j] *= np.prod(x0 - np.arange(n)) / factorial(n)
+    return network.rates * combinations
+
+
+def to_cayenne(network: Network, max_iter: int = None):
+    """
+        Return the network in the format of ``cayenne_test/models.py``
+
+        cayenne preallocates ``max_iter`` states, so by default it is twice
+        the number of events expected at the initial propensities, which the
+        decays of the network keep as an upper bound.
+    """
+    if max_iter is None:
+        n_events = initial_propensities(network).sum() * network.max_t
+        max_iter = max(10_000, int(2 * n_events))
+    # cayenne counts ordered reactant combinations, n! times the distinct ones
+    n_orderings = [np.prod([factorial(n) for n in column]) for column in network.V_r.T]
+    k = network.rates / np.array(n_orderings)
+    return (
+        network.species_names,
+        network.rxn_names,
+        network.V_r,
+        network.V_p,
+        network.X0,
+        k,
+        network.max_t,
+        max_iter,
+        10,
+    )
+
+
+def _propensity(network: Network, j: int, rate_name: str) -> str:
+    """Return the propensity of reaction j as an expression of the amounts."""
+    terms = [rate_name]
+    for i in np.nonzero(network.V_r[:, j])[0]:
+        name, n = network.species_names[i], network.V_r[i, j]
+        factors = [name] + [f"({name}-{m})" for m in range(1, n)]
+        term = "*".join(factors)
+        terms.append(f"{term}/{factorial(n)}" if n > 1 else term)
+    return "*".join(terms)
+
+
+def _side(network: Network, V: np.ndarray, j: int, empty: str, sep: str) -> str:
+    species = []
+    for i in np.nonzero(V[:, j])[0]:
+        species.extend([network.species_names[i]] * V[i, j])
+    return sep.join(species) if species else empty
+
+
+def to_antimony(network: Network) -> str:
+    """Return the network as an Antimony model for Tellurium."""
+    lines = []
+    for j, rxn_name in enumerate(network.rxn_names):
+        reactants = _side(network, network.V_r, j, "", " + ")
+        products = _side(network, network.V_p, j, "", " + ")
+        lines.append(
+            f"    {rxn_name}: {reactants} => {products}; "
+            f"{_propensity(network, j, f'k{j + 1}')};"
+        )
+    lines.append("")
+    for j, rate in enumerate(network.rates):
+        lines.append(f"    k{j + 1} = {float(rate)!r};")
+    lines.append("")
+    for name, x0 in zip(network.species_names, network.X0):
+        lines.append(f"    {name} = {x0};")
+    return "\n" + "\n".join(lines) + "\n"
+
+
+def to_r(network: Network) -> str:
+    """Return the network as the GillespieSSA variables of ``get_model``."""
+    net_change = (network.V_p - network.V_r).ravel()
+    parms = ", ".join(
+        f"k{j + 1}={float(rate)!r}" for j, rate in enumerate(network.rates)
+    )
+    x0 = ", ".join(f"{name}={x}" for name, x in zip(network.species_names, network.X0))
+    propensities = ", ".join(
+        f'"{_propensity(network, j, f"k{j + 1}")}"'
+        for j in range(len(network.rxn_names))
+    )
+    return (
+        f"parms <- c({parms})\n"
+        f"x0 <- c({x0})\n"
+        f"nu <- matrix(c({', '.join(str(n) for n in net_change)}), "
+        f"nrow={len(network.species_names)}, byrow=TRUE)\n"
+        f"a <- c({propensities})\n"
+        f"tf <- {float(network.max_t)!r}\n"
+        f'simName <- "{network.name}"\n'
+    )
+
+
+def to_julia(network: Network) -> str:
+    """Return the network as a BioSimulator model, the value of the file."""
+    lines = ["using BioSimulator", "", f'model = Network("{network.name}")']
+    for name, x0 in zip(network.species_names, network.X0):
+        lines.append(f'model <= Species("{name}", {x0})')
+    for j, rxn_name in enumerate(network.rxn_names):
+        reactants = _side(network, network.V_r, j, "0", " + ")
+        products = _side(network, network.V_p, j, "0", " + ")
+        lines.append(
+            f'model <= Reaction("{rxn_name}", {float(network.rates[j])!r}, '
+            f'"{reactants} --> {products}")'
+        )
+    lines.append("model")
+    return "\n".join(lines) + "\n"
+
+
+def model_file(model_id: str, extension: str) -> str:
+    return f"{SYNTHETIC_FOLDER}/{model_id}.{extension}"
+
+
+def write_model_files(model_id: str):
+    """Write the Julia and R models of a synthetic network, if missing."""
+    os.makedirs(SYNTHETIC_FOLDER, exist_ok=True)
+    network = None
+    for extension, emit in [("jl", to_julia), ("R", to_r)]:
+        fpath = pathlib.Path(model_file(model_id, extension))
+        if fpath.is_file():
+            continue
+        if network is None:
+            network = get_network(model_id)
+        with open(fpath, "w") as fid:
+            fid.write(emit(network))
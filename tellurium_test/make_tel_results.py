@@ -1,44 +1,113 @@
 #!/usr/bin/env python3
 
 import pathlib
-import os
 import sys
 
 import numpy as np
 import tellurium as te
 
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 from models import get_model
+from accuracy.accuracy import make_accumulator, read_reference
+from accuracy.eventlog import write_store
+from accuracy.helpers import get_states_on_grid
+from accuracy.seeds import replicate_seeds
+from accuracy.streaming import summary_path
 
 
-def run_model(id_, n_reps):
+def load_model(id_, seed=1234):
     model = get_model(id_)
     te_model = te.loada(model)
     te_model.integrator = "gillespie"
-    te_model.integrator.seed = 1234
+    te_model.integrator.seed = seed
     te_model.integrator.variable_step_size = True
+    return te_model
+
+
+def on_grid(sim, time_arr):
+    """Return a replicate as its states at the time points of a grid."""
+    sim = np.array(sim)
+    states = get_states_on_grid(sim[:, 0], sim[:, 1:], time_arr, "direct")
+    return np.column_stack([time_arr, states])
+
+
+def simulate_model(te_model, n_reps, time_arr=None):
     results = []
     for i in range(n_reps):
         te_model.reset()
         sim = te_model.simulate(0, 50)
+        if time_arr is not None:
+            sim = on_grid(sim, time_arr)
         results.append(sim)
     return results
 
 
-def write_model(results, dir_path, n_reps):
-    os.makedirs(dir_path, exist_ok=True)
-    for i in range(n_reps):
-        sim = np.array(results[i])
-        file_name = f"{dir_path}/{i + 1}.csv"
-        np.savetxt(file_name, sim, delimiter=",")
+def simulate_replicate(te_model, seed, time_arr=None):
+    """Simulate one replicate with its own seed."""
+    te_model.integrator.seed = int(seed)
+    te_model.reset()
+    sim = te_model.simulate(0, 50)
+    if time_arr is not None:
+        sim = on_grid(sim, time_arr)
+    return sim
+
+
+def simulate_shard(te_model, n_reps, master_seed, first_rep, time_arr=None):
+    """Simulate replicates first_rep onwards, each with its own seed stream."""
+    seeds = replicate_seeds(master_seed, first_rep, n_reps)
+    return [simulate_replicate(te_model, seed, time_arr) for seed in seeds]
+
+
+def run_model(id_, n_reps, seed=1234, first_rep=0, grid=False):
+    """Simulate a model, on the analytical time points only with ``grid``.
+
+    Each replicate is seeded from the master seed and its number, whether or
+    not the replicates are a shard of a job.
+    """
+    time_arr = np.asarray(read_reference(id_)[0], dtype=float) if grid else None
+    return simulate_shard(load_model(id_), n_reps, seed, first_rep, time_arr)
+
+
+def stream_model(id_, n_reps, seed=1234):
+    """Fold each repetition into the accuracy statistics and discard it."""
+    te_model = load_model(id_)
+    accumulator = make_accumulator(id_, "direct")
+    for rep_seed in replicate_seeds(seed, 0, n_reps):
+        sim = np.array(simulate_replicate(te_model, rep_seed))
+        accumulator.add(sim[:, 0], sim[:, 1:])
+    return accumulator
+
+
+def write_model(results, file_path, n_reps, sim_seeds=None, events=False):
+    sims = [np.array(results[i]) for i in range(n_reps)]
+    t_list = [sim[:, 0] for sim in sims]
+    x_list = [sim[:, 1:] for sim in sims]
+    write_store(file_path, t_list, x_list, sim_seeds=sim_seeds, events=events)
 
 
 if __name__ == "__main__":
     MODEL_ID = sys.argv[1]
     N_REPS = int(sys.argv[2])
     WRITE_RESULTS_FLAG = sys.argv[3]
-    DIR_PATH = pathlib.Path(f"./results/{MODEL_ID}/Tellurium_direct/")
-    results = run_model(MODEL_ID, N_REPS)
-    if WRITE_RESULTS_FLAG == "True":
-        write_model(results, DIR_PATH, N_REPS)
+    # Optional output file, seed and first replicate, used to generate a
+    # shard of repetitions (the seed is then the job's master seed)
+    if len(sys.argv) > 4:
+        FILE_PATH = pathlib.Path(sys.argv[4])
+    else:
+        FILE_PATH = pathlib.Path(f"./results/{MODEL_ID}/Tellurium_direct.traj")
+    SEED = int(sys.argv[5]) if len(sys.argv) > 5 else 1234
+    FIRST_REP = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+    if WRITE_RESULTS_FLAG == "Stream":
+        accumulator = stream_model(MODEL_ID, N_REPS, SEED)
+        accumulator.write_summary(summary_path(MODEL_ID, "Tellurium", "direct"))
+        print(f"Failed tests: {accumulator.failed_list()}")
+        sys.exit(0)
+    # With Grid, only the states at the analytical time points are written
+    GRID = WRITE_RESULTS_FLAG == "Grid"
+    results = run_model(MODEL_ID, N_REPS, SEED, FIRST_REP, GRID)
+    if WRITE_RESULTS_FLAG in ["True", "Grid", "Events"]:
+        sim_seeds = replicate_seeds(SEED, FIRST_REP, N_REPS)
+        events = WRITE_RESULTS_FLAG == "Events"
+        write_model(results, FILE_PATH, N_REPS, sim_seeds, events)
     else:
         print("Not saving results")
@@ -158,5 +158,10 @@ MODEL_00039 = """
 
 def get_model(model_id):
     """ Returns model given model_id """
+    if model_id.startswith("syn_"):
+        # Synthetic networks are generated, see synthetic_networks.py
+        from synthetic_networks import get_network, to_antimony
+
+        return to_antimony(get_network(model_id))
     model_name = "MODEL_" + model_id
     return globals()[model_name]
@@ -0,0 +1,34 @@
+from itertools import cycle
+
+import numpy as np
+
+from adaptive_benchmarks import relative_halfwidth, sample_adaptively
+
+
+def test_relative_halfwidth():
+    assert relative_halfwidth([1.0]) == np.inf
+    # t(0.975, 3) * std / sqrt(4) / mean
+    assert np.isclose(relative_halfwidth([1.5, 2.0, 3.0, 3.5]), 0.5810, atol=1e-4)
+
+
+def test_sample_adaptively():
+    # Steady runs stop at the minimum, noisy ones at the maximum
+    times, reason = sample_adaptively(lambda: 1.0, min_runs=3)
+    assert (len(times), reason) == (3, "precision")
+    noisy = cycle([1.0, 2.0]).__next__
+    times, reason = sample_adaptively(noisy, precision=0.01, max_runs=20)
+    assert (len(times), reason) == (20, "max_runs")
+    # Runs that would exceed the budget are not started
+    times, reason = sample_adaptively(noisy, precision=0.01, budget=10.0, warmup=1)
+    assert sum(times) <= 10.0 - 1.0
+    assert reason == "budget"
+    times, reason = sample_adaptively(lambda: 5.0, min_runs=3, budget=1.0)
+    assert (len(times), reason) == (1, "budget")
+
+
+def test_sample_adaptively_discards():
+    noisy = cycle([True, False]).__next__
+    times, reason = sample_adaptively(lambda: 1.0, min_runs=3, keep=noisy)
+    assert (len(times), reason) == (3, "precision")
+    times, reason = sample_adaptively(lambda: 1.0, max_runs=4, keep=lambda: False)
+    assert (times, reason) == ([], "interference")
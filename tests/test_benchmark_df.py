@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+from notebooks.utils import fit_cost_model
+
+
+def test_fit_cost_model():
+    nrep = [10, 100, 1000, 10000]
+    times = [[0.5 + 1e-3 * n, 0.5 + 1e-3 * n] for n in nrep]
+    df = pd.DataFrame(
+        {"lib": "Cayenne", "algo": "direct", "model": "001-01", "nrep": nrep}
+    )
+    df["times"] = times
+    fits = fit_cost_model(df)
+    assert fits.shape[0] == 1
+    fit = fits.iloc[0]
+    assert np.isclose(fit.fixed, 0.5)
+    assert np.isclose(fit.marginal, 1e-3)
+    assert np.isclose(fit.half_throughput_nrep, 500)
+    assert fit.fixed_low <= fit.fixed <= fit.fixed_high
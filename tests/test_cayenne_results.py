@@ -0,0 +1,30 @@
+import importlib
+import pathlib
+import sys
+
+import numpy as np
+import pytest
+
+from accuracy.accuracy import make_accumulator
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def cayenne_results(monkeypatch):
+    # The script imports the models module next to it
+    monkeypatch.syspath_prepend(str(ROOT_DIR / "cayenne_test"))
+    monkeypatch.delitem(sys.modules, "models", raising=False)
+    return importlib.import_module("cayenne_test.make_cayenne_results")
+
+
+def test_stream_model_seeds(cayenne_results):
+    # Streamed replicates are those of a stored job with the same master seed
+    accumulator = cayenne_results.stream_model("00001", "direct", 5, 7, batch_size=2)
+    model = cayenne_results.setup_model("00001")
+    expected = make_accumulator("00001", "direct")
+    expected.add_results(cayenne_results.simulate_shard(model, "direct", 5, 7, 0))
+    assert accumulator.n_rep == 5
+    assert np.allclose(accumulator.calculate_zy()[0], expected.calculate_zy()[0])
+    other = cayenne_results.stream_model("00001", "direct", 5, 8, batch_size=2)
+    assert not np.allclose(other.calculate_zy()[2], expected.calculate_zy()[2])
@@ -0,0 +1,34 @@
+from compare_benchmarks import compare_runs, slowdown_pvalue
+from phase_benchmarks import summarize_times
+from results_db import connect, read_benchmark_runs, record_benchmark_run
+
+
+def record_run(conn, model, version, times):
+    result = summarize_times(times)
+    record_benchmark_run(
+        conn, "cayenne", "direct", model, 100, "hyperfine", result, version, "abc"
+    )
+
+
+def test_slowdown_pvalue():
+    baseline = [1.0, 1.02, 0.98, 1.01, 0.99]
+    assert slowdown_pvalue(baseline, [1.5, 1.52, 1.48, 1.51, 1.49]) < 1e-6
+    assert slowdown_pvalue(baseline, [1.03, 1.05, 1.01, 1.04, 1.02]) > 0.5
+    assert slowdown_pvalue([1.0], baseline) is None
+
+
+def test_compare_runs(tmp_path):
+    conn = connect(str(tmp_path / "results.db"))
+    record_run(conn, "00001", "1.0", [1.0, 1.02, 0.98, 1.01, 0.99])
+    record_run(conn, "00003", "1.0", [2.0, 2.04, 1.96, 2.02, 1.98])
+    record_run(conn, "00001", "1.1", [1.2, 1.22, 1.18, 1.21, 1.19])
+    record_run(conn, "00003", "1.1", [2.02, 2.06, 1.98, 2.04, 2.0])
+    baseline = read_benchmark_runs(conn, version="1.0")
+    history = read_benchmark_runs(conn, lib="cayenne")
+    conn.close()
+    assert len(history) == 4
+    assert {run["host"] for run in history} == {history[0]["host"]}
+    comparisons = compare_runs(baseline, history, threshold=0.05)
+    assert [c["model"] for c in comparisons] == ["00001", "00003"]
+    assert [c["regression"] for c in comparisons] == [True, False]
+    assert abs(comparisons[0]["ratio"] - 1.2) < 1e-9
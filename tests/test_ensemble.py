@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from accuracy.accuracy import make_accumulator, read_reference
+from accuracy.seeds import replicate_seeds
+from cayenne_test.models import get_model
+from ensemble_test.ensemble import simulate_ensemble
+from ensemble_test.make_ensemble_results import setup_model, simulate_model
+from run_simulations import get_cmd
+
+
+@pytest.mark.parametrize("algorithm", ["direct", "tau_leaping", "tau_adaptive"])
+def test_simulate_ensemble(algorithm):
+    _, _, V_r, V_p, X0, k, max_t, max_iter, _ = get_model("00001")
+    time_arr, mu, std = read_reference("00001")
+    states, status = simulate_ensemble(
+        V_r, V_p, X0, k, max_t, max_iter, time_arr, 500, algorithm, seed=3
+    )
+    assert states.shape == (500, len(time_arr), 1)
+    assert (states[:, 0, 0] == 100).all()
+    assert (status == 2).sum() > 490
+    again, _ = simulate_ensemble(
+        V_r, V_p, X0, k, max_t, max_iter, time_arr, 500, algorithm, seed=3
+    )
+    assert (again == states).all()
+    # The batch passes the Z and Y tests like a per-replicate simulator
+    accumulator = make_accumulator("00001", algorithm)
+    accumulator.add_states(states)
+    assert accumulator.failed_list()[:4] == [0, 0, 0, 0]
+
+
+def test_simulate_model_seeds():
+    model = setup_model("00001")
+    results = simulate_model(model, "direct", 4, seed=5, first_rep=8)
+    # The seed of the batch's generator is that of its first replicate
+    assert (results.seeds == replicate_seeds(5, 8, 1)[0]).all()
+    again = simulate_model(model, "direct", 4, seed=5, first_rep=8)
+    assert (again.states == results.states).all()
+
+
+def test_ensemble_cmd():
+    cmd = get_cmd("ensemble", "00001", "tau_adaptive", 10, out="a.traj", seed=5)
+    assert cmd == (
+        "python ensemble_test/make_ensemble_results.py "
+        "00001 tau_adaptive 10 True a.traj 5"
+    )
+    with pytest.raises(ValueError):
+        get_cmd("ensemble", "00001", "direct", 10, events=True)
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from accuracy.eventlog import encode_events, read_event_header, write_event_log
+from accuracy.helpers import read_results_store
+from accuracy.trajstore import merge_trajectories, read_header, read_trajectories
+from encoding_benchmarks import measure_encoding
+
+
+def make_trajectories(n_rep, seed=0):
+    # Exact trajectories of A <-> B, ending with a repeated final state
+    rng = np.random.default_rng(seed)
+    t_list, x_list = [], []
+    for _ in range(n_rep):
+        n_events = rng.integers(1, 50)
+        time = np.concatenate([[0], np.cumsum(rng.exponential(0.1, n_events)), [10]])
+        changes = np.array([[-1, 1], [1, -1]])[rng.integers(0, 2, n_events)]
+        states = np.cumsum(np.concatenate([[[100, 0]], changes, [[0, 0]]]), axis=0)
+        t_list.append(time)
+        x_list.append(states)
+    return t_list, x_list
+
+
+def test_event_log_round_trip(tmp_path):
+    t_list, x_list = make_trajectories(20)
+    log_file = tmp_path / "events.traj"
+    write_event_log(log_file, t_list, x_list, list(range(20)), list(range(20, 40)))
+    n_rows = sum(len(t) for t in t_list)
+    assert read_header(log_file) == (20, 2, n_rows)
+    store = read_trajectories(log_file)
+    assert (store.states == np.concatenate(x_list)).all()
+    assert np.abs(store.time - np.concatenate(t_list)).max() < 1e-8
+    assert store.status.tolist() == list(range(20))
+    assert store.seeds.tolist() == list(range(20, 40))
+    res = read_results_store(res_file=log_file, n_reps=5)
+    assert (res.x_list[4] == x_list[4]).all()
+    # Event logs merge into an event log
+    write_event_log(tmp_path / "more.traj", t_list[:3], x_list[:3])
+    merge_trajectories([log_file, tmp_path / "more.traj"], tmp_path / "merged.traj")
+    merged = read_trajectories(tmp_path / "merged.traj")
+    assert len(merged.offsets) == 24
+    assert (merged.states[n_rows:] == np.concatenate(x_list[:3])).all()
+
+
+def test_merge_event_logs_keeps_ticks(tmp_path):
+    # Like exact replicates, chunks end at different times past max_t, here
+    # on the same tick and, past 64, on a tick twice as long
+    t_list, x_list = make_trajectories(8, seed=1)
+    t_ends = [50.77, 50.81, 50.79, 63.5, 64.2, 63.7, 30.5, 30.2]
+    for i, t_end in enumerate(t_ends):
+        t_list[i][-1] = t_end
+    files = [tmp_path / f"{i}.traj" for i in range(4)]
+    for i, file_name in enumerate(files):
+        chunk = slice(2 * i, 2 * i + 2)
+        write_event_log(file_name, t_list[chunk], x_list[chunk])
+    scales = [read_event_header(file_name)["scale"] for file_name in files]
+    assert scales[:3] == [2 ** -26, 2 ** -26, 2 ** -25]
+    parts = [read_trajectories(file_name) for file_name in files]
+    merge_trajectories(files[:3], tmp_path / "merged.traj")
+    merged = read_trajectories(tmp_path / "merged.traj")
+    assert (merged.time == np.concatenate([part.time for part in parts[:3]])).all()
+    assert (merged.states == np.concatenate(x_list[:6])).all()
+    assert read_event_header(tmp_path / "merged.traj")["scale"] == 2 ** -26
+    # A finer tick that cannot hold the longest time deltas is encoded again
+    assert scales[3] == 2 ** -27
+    merge_trajectories(files, tmp_path / "merged.traj")
+    merged = read_trajectories(tmp_path / "merged.traj")
+    assert (merged.states == np.concatenate(x_list)).all()
+    error = merged.time - np.concatenate([part.time for part in parts])
+    assert np.abs(error).max() <= 2 ** -26
+
+
+def test_event_log_rejects():
+    offsets = np.array([0, 2])
+    with pytest.raises(ValueError):
+        encode_events(offsets, [0.0, 1.0], [[1.5], [2.5]])
+    with pytest.raises(ValueError):
+        encode_events(offsets, [1.0, 0.0], [[1], [2]])
+
+
+def test_event_log_truncated(tmp_path):
+    t_list, x_list = make_trajectories(3)
+    log_file = tmp_path / "events.traj"
+    write_event_log(log_file, t_list, x_list)
+    with open(log_file, "r+b") as fid:
+        fid.truncate(log_file.stat().st_size - 8)
+    with pytest.raises(OSError):
+        read_header(log_file)
+
+
+def test_measure_encoding():
+    t_list, x_list = make_trajectories(10)
+    result = measure_encoding(t_list, x_list, runs=2)
+    assert result["exact_states"]
+    assert result["compression"] > 2
+    assert result["event_log_rows_per_second"] > 0
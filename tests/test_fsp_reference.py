@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from accuracy.accuracy import read_reference, tracks_two_species
+from cayenne_test.models import get_model
+from fsp_reference import (
+    cme_generator,
+    expv,
+    parse_times,
+    solve_fsp,
+    sweep_references,
+    truncate,
+    write_reference,
+)
+
+
+def test_truncate():
+    # Birth and death of X, within counts 2 to 5
+    V_r = np.array([[0, 1]])
+    V_p = np.array([[1, 0]])
+    truncation = truncate(V_r, V_p, np.array([3]), [2], [5])
+    assert truncation.states[:, 0].tolist() == [3, 2, 4, 5]
+    assert truncation.targets.tolist() == [[2, 1], [0, -1], [3, 0], [-1, 2]]
+    assert truncation.exits[1, 1] == 0 and truncation.exits[3, 0] == 1
+    A = cme_generator(truncation, np.array([1.0, 0.5]))
+    # Only the births from 5 and deaths from 2 leave the box
+    assert np.allclose(A.sum(axis=0).A1, [0, -1.0, 0, -1.0])
+    with pytest.raises(ValueError):
+        truncate(V_r, V_p, np.array([3]), [0], [10 ** 8])
+
+
+def test_expv():
+    from scipy.sparse.linalg import expm_multiply
+
+    _, _, V_r, V_p, X0, k, _, _, _ = get_model("00003")
+    truncation = truncate(V_r, V_p, X0, [0], [200])
+    A = cme_generator(truncation, np.asarray(k, dtype=float))
+    p0 = np.zeros(truncation.states.shape[0])
+    p0[0] = 1.0
+    assert np.abs(expv(A, p0, 5.0) - expm_multiply(A * 5.0, p0)).max() < 1e-9
+    assert (expv(A, p0, 0.0) == p0).all()
+
+
+@pytest.mark.parametrize("model_id", ["00001", "00030"])
+def test_solve_fsp(model_id):
+    _, _, V_r, V_p, X0, k, _, _, _ = get_model(model_id)
+    time_arr, mu, std = read_reference(model_id)
+    result = solve_fsp(V_r, V_p, X0, k, np.asarray(time_arr, dtype=float), 1e-8)
+    assert result.error.max() <= 1e-8
+    assert np.allclose(result.mean.reshape(np.shape(mu)), mu, atol=1e-4)
+    assert np.allclose(result.std.reshape(np.shape(std)), std, atol=1e-4)
+
+
+def test_sweep_references(tmp_path, monkeypatch):
+    model = get_model("00001")
+    time_arr = parse_times("0:10:0.5")
+    assert len(time_arr) == 21 and time_arr[-1] == 10
+    results = sweep_references(model, [[0.1, 0.11], [0.2, 0.21]], time_arr)
+    # The second combination starts from the box of the first
+    assert results[1].truncation.upper >= results[0].truncation.upper
+    # A linear birth-death process, whose mean decays exponentially
+    assert np.allclose(results[1].mean[:, 0], 100 * np.exp(-0.01 * time_arr))
+    # References are read back like the analytical ones
+    monkeypatch.chdir(tmp_path)
+    write_reference("data/results_fsp1.csv", results[1])
+    time_list, mu, std = read_reference("fsp1")
+    assert np.allclose(time_list, time_arr)
+    assert np.allclose(mu, results[1].mean[:, 0])
+    assert np.allclose(std, results[1].std[:, 0])
+    # Two species are written in the schema of 00030 and 00031
+    _, _, V_r, V_p, X0, k, _, _, _ = get_model("00030")
+    result = solve_fsp(V_r, V_p, X0, k, time_arr)
+    write_reference("data/results_fsp2.csv", result)
+    assert tracks_two_species("fsp2") and not tracks_two_species("fsp1")
+    _, mu, std = read_reference("fsp2")
+    assert np.allclose(np.reshape(mu, result.mean.shape), result.mean)
@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 
 from accuracy.helpers import (
     read_results_analytical,
@@ -6,10 +7,15 @@ from accuracy.helpers import (
     get_highest_rep_in_path,
     read_results_simulation,
     read_results_simulation_2sp,
+    read_results_store,
+    read_results_folder,
     calculate_zy,
     calculate_zy_2sp,
-    calculate_ms_ratios
+    calculate_ms_ratios,
+    get_states_on_grid,
+    interpolate_states,
 )
+from accuracy.trajstore import read_header, write_trajectories
 
 
 def test_rr_analytical():
@@ -43,6 +49,47 @@ def test_rr_simulation():
     assert len(res) == 3
 
 
+def test_rr_folder(tmp_path):
+    # Tellurium and BioSimulator may write a header line
+    (tmp_path / "1.csv").write_text("time,[S1],[S2]\n0,0,10\n1.5e0,1,9\n")
+    (tmp_path / "2.csv").write_text("# time, S1, S2\r\n0,5,5\r\n")
+    res = read_results_folder(str(tmp_path), n_procs=1)
+    assert len(res) == 2
+    assert (res.t_list[0] == [0, 1.5]).all()
+    assert (res.x_list[0] == np.array([[0, 10], [1, 9]])).all()
+    assert (res.x_list[1] == np.array([[5, 5]])).all()
+    # A first row with missing or infinite amounts is data, not a header
+    (tmp_path / "1.csv").write_text("0,nan,inf\n1,1,9\n")
+    res = read_results_folder(str(tmp_path), n_reps=1, n_procs=1)
+    assert np.array_equal(res.x_list[0], [[np.nan, np.inf], [1, 9]], equal_nan=True)
+    res = read_results_folder("tests/data/2sp/", n_reps=4, n_procs=2)
+    lengths = [5, 5, 5, 2]
+    x_first = [[0, 10], [1, 9], [2, 8], [3, 7], [4, 6]]
+    for i in range(4):
+        assert (res.t_list[i] == np.arange(lengths[i])).all()
+    assert (res.x_list[0] == x_first).all()
+    assert (res.x_list[2][:, 0] == [0, 0, 1, 2, 3]).all()
+    assert (res.x_list[3] == x_first[:2]).all()
+    # Both species always sum to 10 in these files
+    assert all((x.sum(axis=1) == 10).all() for x in res.x_list)
+
+
+def test_rr_store(tmp_path):
+    res_csv = read_results_simulation_2sp(n_reps=4, res_folder="tests/data/2sp/")
+    file_name = str(tmp_path / "store.traj")
+    write_trajectories(file_name, res_csv.t_list, res_csv.x_list)
+    assert read_header(file_name) == (4, 2, 17)
+    res = read_results_store(res_file=file_name)
+    assert len(res) == 4
+    for i in range(4):
+        assert (res.t_list[i] == res_csv.t_list[i]).all()
+        assert (res.x_list[i] == res_csv.x_list[i]).all()
+    res = read_results_store(n_reps=3, res_file=file_name)
+    assert len(res) == 3
+    with pytest.raises(OSError):
+        read_results_store(n_reps=5, res_file=file_name)
+
+
 def test_calculate_zy():
     res = read_results_simulation(n_reps=3, res_folder="tests/data/1sp/", algo="direct")
     time_arr = [0, 1, 2, 3, 4]
@@ -166,3 +213,46 @@ def test_ms_ratios():
     expected_std_ratio = np.array([[2, 2, 2, 2], [1, 2, 2, 2]])
     assert np.isclose(mu_ratio, expected_mu_ratio).all()
     assert np.isclose(std_ratio, expected_std_ratio).all()
+
+
+def test_interpolate_states():
+    # Two repetitions of 3 species, concatenated
+    offsets = np.array([0, 3, 5])
+    time = np.array([0.0, 1.0, 2.5, 0.0, 0.5])
+    states = np.array([[0, 1, 2], [1, 2, 3], [2, 3, 4], [5, 5, 5], [6, 6, 6]])
+    time_arr = [0, 1, 2, 3]
+    result = interpolate_states(offsets, time, states, time_arr, "direct")
+    assert result.shape == (4, 2, 3)
+    assert (result[:, 0, 0] == [0, 1, 1, 2]).all()
+    assert (result[:, 1, 2] == [5, 6, 6, 6]).all()
+    result = interpolate_states(offsets, time, states, time_arr, "tau_leaping")
+    assert np.isclose(result[:, 0, 1], [1, 2, 2 + 2 / 3, 3]).all()
+    result = interpolate_states(offsets, time, states, time_arr, "direct", True)
+    assert (result[:, 0, 0] == [0, 1, 2, 2]).all()
+    assert (result[:, 1, 0] == [5, 6, 6, 6]).all()
+
+
+def test_grid_states_rescored():
+    # Trajectories stored only on the grid score like the full ones
+    rng = np.random.default_rng(0)
+    time_arr = np.arange(0, 51, 1.0)
+    for algorithm in ["direct", "tau_leaping"]:
+        t_list, x_list, grid_list = [], [], []
+        for _ in range(5):
+            t_array = np.concatenate([[0], np.sort(rng.uniform(0, 60, 300))])
+            x_array = rng.integers(0, 100, (len(t_array), 2))
+            t_list.append(t_array)
+            x_list.append(x_array)
+            grid_list.append(get_states_on_grid(t_array, x_array, time_arr, algorithm))
+        offsets = np.cumsum([0] + [len(t) for t in t_list])
+        full = interpolate_states(
+            offsets, np.concatenate(t_list), np.concatenate(x_list), time_arr, algorithm
+        )
+        grid_offsets = np.arange(6) * len(time_arr)
+        grid_time = np.tile(time_arr, 5)
+        grid_states = np.concatenate(grid_list)
+        for interpolated in [False, True]:
+            grid = interpolate_states(
+                grid_offsets, grid_time, grid_states, time_arr, algorithm, interpolated
+            )
+            assert np.allclose(grid, full)
@@ -0,0 +1,41 @@
+import os
+from subprocess import PIPE, run
+import sys
+
+from isolation import (
+    default_cores,
+    interference,
+    isolated_env,
+    parse_cores,
+    pin_to,
+    sample_cpu,
+)
+
+
+def test_parse_cores():
+    assert parse_cores("0-3,6") == [0, 1, 2, 3, 6]
+    assert parse_cores("3,2,3") == [2, 3]
+
+
+def test_isolated_child():
+    cores = default_cores()
+    code = "import os; print(sorted(os.sched_getaffinity(0)), os.environ['OMP_NUM_THREADS'])"
+    proc = run(
+        [sys.executable, "-c", code],
+        stdout=PIPE,
+        universal_newlines=True,
+        env=isolated_env(len(cores)),
+        preexec_fn=pin_to(cores),
+    )
+    assert proc.stdout.split() == [str(cores).replace(" ", ""), "1"]
+
+
+def test_interference():
+    before = {"wall": 0.0, "busy": 100.0, "own": 5.0}
+    after = {"wall": 10.0, "busy": 117.0, "own": 15.0}
+    # 7 s of the 20 s of 2 cores were used by other processes
+    assert abs(interference(before, after, 2) - 0.35) < 1e-12
+    after["busy"] = 109.0
+    assert interference(before, after, 2) == 0.0
+    sample = sample_cpu(sorted(os.sched_getaffinity(0)))
+    assert sample["busy"] > 0
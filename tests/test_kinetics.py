@@ -0,0 +1,13 @@
+import numpy as np
+
+from accuracy.kinetics import propensities, stochastic_rates
+
+
+def test_propensities():
+    # A + A -> A2 and A2 -> A + A, with cayenne's rate conventions
+    V_r = np.array([[2, 0], [0, 1]])
+    kstoc = stochastic_rates(V_r, np.array([0.5, 0.01]))
+    assert kstoc.tolist() == [1.0, 0.01]
+    x = np.array([[100, 0], [1, 3]])
+    prop = propensities(x, kstoc, V_r)
+    assert np.allclose(prop, [[100 * 99 / 2, 0], [0, 0.03]])
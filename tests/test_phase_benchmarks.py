@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from phase_benchmarks import summarize_times
+from run_benchmarks import get_benchmark_cmd
+
+
+def test_summarize_times():
+    summary = summarize_times([3.0, 1.0, 2.0])
+    assert summary["mean"] == 2.0
+    assert summary["median"] == 2.0
+    assert summary["min"] == 1.0
+    assert summary["max"] == 3.0
+    assert np.isclose(summary["stddev"], 1.0)
+    assert summary["times"] == [3.0, 1.0, 2.0]
+    assert summarize_times([1.0])["stddev"] == 0.0
+
+
+def test_benchmark_cmd():
+    fname, cmd = get_benchmark_cmd("cayenne", "00001", "direct", 10, "inprocess")
+    assert fname == "benchmarks/inprocess/cayenne-direct-00001-10.json"
+    assert cmd.startswith("python phase_benchmarks.py -l cayenne")
+    fname, cmd = get_benchmark_cmd("GillespieSSA", "00001", "direct", 10)
+    assert fname == "benchmarks/GillespieSSA-direct-00001-10.json"
+    assert cmd.startswith("hyperfine --runs 7")
+    fname, cmd = get_benchmark_cmd(
+        "GillespieSSA", "00001", "direct", 10, "adaptive", precision=0.05
+    )
+    assert fname == "benchmarks/adaptive/GillespieSSA-direct-00001-10.json"
+    assert "--precision 0.05 --min-runs 3" in cmd
+    with pytest.raises(ValueError):
+        get_benchmark_cmd("GillespieSSA", "00001", "direct", 10, "inprocess")
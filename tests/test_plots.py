@@ -0,0 +1,40 @@
+import os
+
+import matplotlib
+import numpy as np
+
+from accuracy.plots import render_plots, save_plot_data, stale_plots
+
+matplotlib.use("Agg")
+
+
+def plot_arrays(n_species=1):
+    time = np.arange(0.0, 6.0)
+    shape = (6,) if n_species == 1 else (6, n_species)
+    mu = np.ones(shape)
+    std = np.ones(shape)
+    stat = np.zeros((5,) + shape[1:])
+    stat[2] = 10.0
+    return [time, mu, std, mu * 1.01, std, stat, np.full(stat.shape, np.nan)]
+
+
+def test_render_plots(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data_file = "plots/data/cayenne_direct_00001_10.npz"
+    assert save_plot_data(data_file, *plot_arrays())
+    assert not save_plot_data(data_file, *plot_arrays())
+    save_plot_data("plots/data/cayenne_direct_00030_10.npz", *plot_arrays(2))
+    assert len(stale_plots()) == 2
+    rendered = render_plots(n_procs=1)
+    assert sorted(rendered) == [
+        "plots/cayenne_direct_00001_10.pdf",
+        "plots/cayenne_direct_00030_10.pdf",
+    ]
+    assert all(os.path.isfile(name) for name in rendered)
+    assert stale_plots() == []
+    # Only plots whose data changed are rendered again
+    arrays = plot_arrays()
+    arrays[3] = arrays[3] * 1.5
+    assert save_plot_data(data_file, *arrays)
+    os.utime(data_file, (1e10, 1e10))
+    assert stale_plots() == [data_file]
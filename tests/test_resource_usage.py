@@ -0,0 +1,33 @@
+from subprocess import run
+import sys
+
+from resource_usage import RESOURCE_COLUMNS, ResourceMonitor
+from run_benchmarks import per_run_usage
+
+
+def test_resource_monitor():
+    # Holds about 100 MB for half a second, after some CPU work
+    code = (
+        "import time; sum(i * i for i in range(10 ** 6)); "
+        "block = bytearray(100 * 10 ** 6); time.sleep(0.5)"
+    )
+    with ResourceMonitor(interval=0.05) as monitor:
+        run([sys.executable, "-c", code], check=True)
+    usage = monitor.usage
+    assert sorted(usage) == sorted(RESOURCE_COLUMNS)
+    assert usage["max_rss"] >= 100 * 10 ** 6
+    assert usage["cpu_user"] > 0
+    assert usage["voluntary_switches"] >= 1
+    assert usage["bytes_written"] >= 0
+    # Children of an earlier job are not accounted again
+    with ResourceMonitor() as monitor:
+        pass
+    assert monitor.usage["cpu_user"] == 0
+    assert monitor.usage["max_rss"] == 0
+
+
+def test_per_run_usage():
+    usage = dict.fromkeys(RESOURCE_COLUMNS, 10.0)
+    per_run = per_run_usage(usage, {"times": [1.0] * 3, "discarded_runs": 1}, 1)
+    assert per_run["cpu_user"] == 2.0
+    assert per_run["max_rss"] == 10.0
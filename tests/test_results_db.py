@@ -0,0 +1,84 @@
+import json
+from multiprocessing import Pool
+
+import pandas as pd
+
+from notebooks.utils import load_accuracy_df, load_benchmark_df, make_accuracy_df
+from results_db import (
+    connect,
+    export_accuracy_csv,
+    read_accuracy,
+    record_accuracy,
+    record_benchmark_file,
+)
+
+
+def accuracy_data(model, failed=0):
+    data = {"model": model, "lib": "cayenne", "algo": "direct", "nrep": 10000}
+    for test in ["test", "rtest"]:
+        for i in range(4):
+            data[f"{test}{i}"] = failed
+    return data
+
+
+def record_in_process(args):
+    db_file, model = args
+    conn = connect(db_file)
+    record_accuracy(conn, accuracy_data(model), "1.0")
+    conn.close()
+
+
+def test_accuracy_upsert(tmp_path):
+    db_file = str(tmp_path / "results.db")
+    # Concurrent writers do not clobber each other
+    with Pool(4) as pool:
+        pool.map(record_in_process, [(db_file, f"{i:05d}") for i in range(8)])
+    conn = connect(db_file)
+    record_accuracy(conn, accuracy_data("00001", failed=2), "1.0")
+    # Failed jobs do not replace the counts of previous runs
+    assert not record_accuracy(conn, accuracy_data("00001", failed=-1), "1.0")
+    df = read_accuracy(conn, "cayenne")
+    assert df.shape[0] == 8
+    assert df.loc[df.model == "00001", "test0"].item() == 2
+    # Rows of an existing CSV file are kept when it is exported
+    csv_file = str(tmp_path / "cayenne_results.csv")
+    pd.DataFrame([accuracy_data("00039")]).to_csv(csv_file, index=False)
+    export_accuracy_csv(conn, "cayenne", csv_file)
+    conn.close()
+    assert make_accuracy_df(csv_file).shape[0] == 9
+    loaded = load_accuracy_df(db_file, "cayenne")
+    assert loaded.equals(make_accuracy_df(csv_file))
+
+
+def test_sequential_nrep_used(tmp_path):
+    conn = connect(str(tmp_path / "results.db"))
+    data = accuracy_data("00001")
+    data["nrep_used"] = 2000
+    assert record_accuracy(conn, data, "1.0")
+    (nrep_used,) = conn.execute("SELECT nrep_used FROM sequential_accuracy").fetchone()
+    assert nrep_used == 2000
+    # The lower bounds of sequential counts are never published
+    assert read_accuracy(conn).shape[0] == 0
+    conn.close()
+
+
+def test_load_benchmark_df(tmp_path):
+    fpath = tmp_path / "cayenne-direct-00001-100.json"
+    result = {"mean": 1.5, "stddev": 0.1, "median": 1.5, "min": 1.4, "max": 1.6}
+    result["times"] = [1.4, 1.5, 1.6]
+    with open(fpath, "w") as fid:
+        json.dump({"results": [result]}, fid)
+    db_file = str(tmp_path / "results.db")
+    conn = connect(db_file)
+    record_benchmark_file(conn, fpath)
+    conn.close()
+    df = load_benchmark_df(db_file, nrep=100)
+    assert df.shape[0] == 1
+    row = df.iloc[0]
+    assert (row.lib, row.algo, row.model, row.nrep) == (
+        "Cayenne",
+        "direct",
+        "001-01",
+        100,
+    )
+    assert row.times == [1.4, 1.5, 1.6]
@@ -0,0 +1,185 @@
+import pathlib
+import sys
+
+import click
+import numpy as np
+import pytest
+
+from accuracy.plots import plot_data_path, save_plot_data
+from accuracy.seeds import replicate_entropy, replicate_seeds
+from accuracy.trajstore import read_trajectories, store_path
+import run_simulations
+from run_simulations import (
+    check_options,
+    generate_replicates,
+    get_cmd,
+    missing_chunks,
+    missing_replicates,
+    read_manifest,
+    run_simulation,
+    shard_size,
+    stale_job_plots,
+    write_manifest,
+)
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+
+
+def test_missing_chunks():
+    manifest = {"chunks": []}
+    assert missing_chunks(manifest, 25, 10) == [(0, 10), (10, 20), (20, 25)]
+    manifest = {"chunks": [{"start": 0, "stop": 10}, {"start": 20, "stop": 30}]}
+    assert missing_chunks(manifest, 25, 10) == [(10, 20)]
+    assert missing_chunks(manifest, 45, 10) == [(10, 20), (30, 40), (40, 45)]
+
+
+def test_missing_replicates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert missing_replicates("cayenne", "00001", "direct", 25) == 25
+    manifest = {"lib": "cayenne", "model": "00001", "algo": "direct", "seed": 0}
+    manifest["chunks"] = [
+        {"start": 0, "stop": 10, "file": "1-10.traj"},
+        {"start": 20, "stop": 30, "file": "21-30.traj"},
+    ]
+    write_manifest(manifest)
+    parts_dir = pathlib.Path(store_path("00001", "cayenne", "direct") + ".parts")
+    parts_dir.mkdir()
+    (parts_dir / "1-10.traj").touch()
+    (parts_dir / "21-30.traj").touch()
+    assert missing_replicates("cayenne", "00001", "direct", 25) == 10
+    assert missing_replicates("cayenne", "00001", "direct", 10) == 0
+    # Chunks whose store was deleted are missing
+    (parts_dir / "1-10.traj").unlink()
+    assert missing_replicates("cayenne", "00001", "direct", 10) == 10
+    manifest["merged"] = True
+    write_manifest(manifest)
+    assert missing_replicates("cayenne", "00001", "direct", 25) == 25
+
+
+def test_generate_replicates(tmp_path, monkeypatch):
+    # The ensemble runner is quick, and only needs the analytical results
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").symlink_to(ROOT_DIR / "data")
+    script = ROOT_DIR / "ensemble_test" / "make_ensemble_results.py"
+    monkeypatch.setitem(
+        run_simulations.SIM_SCRIPTS, "ensemble", f"{sys.executable} {script}"
+    )
+    store_file = pathlib.Path(store_path("00001", "ensemble", "direct"))
+    assert generate_replicates("ensemble", "00001", "direct", 6, 600, 3)
+    first = read_trajectories(store_file)
+    assert len(first.offsets) == 7
+    manifest = read_manifest("ensemble", "00001", "direct")
+    assert manifest["merged"] and manifest["seed"] == 0
+    # A deleted merged store is simulated again, in the same chunks
+    store_file.unlink()
+    assert generate_replicates("ensemble", "00001", "direct", 6, 600, 3)
+    again = read_trajectories(store_file)
+    assert (again.states == first.states).all()
+    # More replicates extend the store
+    assert generate_replicates("ensemble", "00001", "direct", 9, 600, 3)
+    extended = read_trajectories(store_file)
+    assert len(extended.offsets) == 10
+    assert (extended.states[: len(first.states)] == first.states).all()
+    assert read_manifest("Tellurium", "00001", "direct")["seed"] == 1234
+
+
+def test_run_simulation_resimulates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").symlink_to(ROOT_DIR / "data")
+    script = ROOT_DIR / "ensemble_test" / "make_ensemble_results.py"
+    monkeypatch.setitem(
+        run_simulations.SIM_SCRIPTS, "ensemble", f"{sys.executable} {script}"
+    )
+    store_file = pathlib.Path(store_path("00001", "ensemble", "direct"))
+    first = run_simulation("ensemble", "00001", "direct", 6, chunk_size=3)
+    assert first["nrep_simulated"] == 6 and first["test0"] >= 0
+    # A deleted merged store of a completed job is simulated again
+    store_file.unlink()
+    again = run_simulation("ensemble", "00001", "direct", 6, chunk_size=3)
+    assert store_file.is_file() and len(read_trajectories(store_file).offsets) == 7
+    assert again["nrep_simulated"] == 6
+    assert [again[f"test{i}"] for i in range(4)] == [
+        first[f"test{i}"] for i in range(4)
+    ]
+
+
+def test_run_simulation_n_procs(tmp_path, monkeypatch):
+    # Each job parses its CSV folders with its share of the cores
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(run_simulations, "missing_replicates", lambda *args: 0)
+    calls = []
+
+    def fake_test_accuracy(model, lib, algo, nrep, n_procs=None):
+        calls.append(n_procs)
+        return [0] * 8
+
+    monkeypatch.setattr(run_simulations, "test_accuracy", fake_test_accuracy)
+    data = run_simulation("cayenne", "00001", "direct", 10, n_procs=3)
+    assert calls == [3] and data["test0"] == 0
+
+
+def test_stale_job_plots(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    arrays = [np.arange(3.0)] * 7
+    save_plot_data(plot_data_path("00001", "cayenne", "direct", 10), *arrays)
+    save_plot_data(plot_data_path("00003", "cayenne", "direct", 10), *arrays)
+    # Plots of earlier runs are not rendered with this run's jobs
+    jobs = [("cayenne", "00001", "direct", 10), ("cayenne", "00001", "direct", 20)]
+    assert stale_job_plots(jobs) == [plot_data_path("00001", "cayenne", "direct", 10)]
+
+
+def test_get_cmd():
+    cmd = get_cmd("GillespieSSA", "00001", "direct", 10, write=False)
+    assert cmd.endswith("00001 direct 10 False")
+    cmd = get_cmd("cayenne", "00001", "direct", 10, out="a.traj", seed=5)
+    assert cmd.endswith("00001 direct 10 True a.traj 5")
+    cmd = get_cmd("cayenne", "00001", "direct", 10, out="a.traj", seed=5, first_rep=20)
+    assert cmd.endswith("00001 direct 10 True a.traj 5 20")
+    cmd = get_cmd("Tellurium", "00001", "direct", 10, out="a.traj", seed=5, grid=True)
+    assert cmd.endswith("00001 10 Grid a.traj 5")
+    with pytest.raises(ValueError):
+        get_cmd("GillespieSSA", "00001", "direct", 10, grid=True)
+    with pytest.raises(ValueError):
+        get_cmd("cayenne", "00001", "direct", 10, grid=True, events=True)
+
+
+def test_check_options():
+    check_options("cayenne", False, True, False, True)
+    check_options("ensemble", True, False, False, False)
+    # Combinations whose flags would be silently ignored
+    with pytest.raises(click.UsageError):
+        check_options("cayenne", False, True, True, False)
+    with pytest.raises(click.UsageError):
+        check_options("cayenne", True, False, False, True)
+    # Options the library's script does not support
+    with pytest.raises(click.BadParameter):
+        check_options("ensemble", False, False, True, False)
+    with pytest.raises(click.BadParameter):
+        check_options("GillespieSSA", True, False, False, False)
+
+
+def test_shard_size():
+    assert shard_size(10_000, 1000, 1) == 1000
+    assert shard_size(100, 1000, 4) == 25
+    assert shard_size(3, 1000, 8) == 1
+
+
+def test_replicate_seeds():
+    seeds = replicate_seeds(7, 0, 100)
+    assert len(np.unique(seeds)) == 100
+    # Shards get the seeds of their replicates, whatever the split
+    shards = [replicate_seeds(7, start, 25) for start in range(0, 100, 25)]
+    assert (np.concatenate(shards) == seeds).all()
+    assert not np.isin(replicate_seeds(8, 0, 100), seeds).any()
+    assert seeds.max() < 2 ** 31 - 1
+
+
+def test_replicate_entropy():
+    entropy = replicate_entropy(7, 0, 10_000)
+    assert entropy.shape == (10_000, 4) and entropy.dtype == np.uint32
+    assert len(np.unique(entropy, axis=0)) == 10_000
+    # The children of the master seed's SeedSequence, whatever the split
+    children = np.random.SeedSequence(7).spawn(30)
+    assert (entropy[20:30] == [c.generate_state(4) for c in children[20:]]).all()
+    assert (replicate_entropy(7, 20, 10) == entropy[20:30]).all()
+    assert not (replicate_entropy(8, 0, 100) == entropy[:100]).all(axis=1).any()
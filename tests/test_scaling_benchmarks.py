@@ -0,0 +1,19 @@
+from scaling_benchmarks import core_ladder, saturation_point, split_reps
+
+
+def test_core_ladder():
+    assert core_ladder(1) == [1]
+    assert core_ladder(8) == [1, 2, 4, 8]
+    assert core_ladder(48) == [1, 2, 4, 8, 16, 32, 48]
+
+
+def test_split_reps():
+    assert split_reps(10, 3) == [4, 3, 3]
+    assert split_reps(2, 4) == [1, 1]
+    assert sum(split_reps(10_000, 64)) == 10_000
+
+
+def test_saturation_point():
+    n_procs = [1, 2, 4, 8, 16]
+    assert saturation_point(n_procs, [1, 1.9, 3.5, 3.6, 3.4]) == 4
+    assert saturation_point(n_procs, [1, 2, 4, 8, 16]) == 16
@@ -0,0 +1,28 @@
+import pytest
+
+from scheduler import estimate_costs, longest_first, predict_makespan, record_job
+
+
+def test_estimate_costs():
+    pytest.importorskip("cayenne")
+    jobs = [
+        ("cayenne", "00004", "direct", 100),
+        ("cayenne", "00005", "direct", 100),
+        ("cayenne", "00023", "direct", 100),
+    ]
+    costs, calibrated = estimate_costs(jobs, {})
+    assert not calibrated
+    assert longest_first(costs) == [1, 2, 0]
+    history = {}
+    record_job(history, ("cayenne", "00005", "direct", 10), 2.0)
+    costs, calibrated = estimate_costs(jobs, history)
+    assert calibrated
+    assert costs[1] == pytest.approx(20.0)
+    # The heuristic is scaled to seconds by the recorded job
+    assert 0 < costs[0] < costs[2] < costs[1]
+
+
+def test_predict_makespan():
+    assert predict_makespan([4, 3, 3, 2, 2], 2) == 8
+    assert predict_makespan([4, 3, 3, 2, 2], 8) == 4
+    assert predict_makespan([1, 1], 1) == 2
@@ -0,0 +1,43 @@
+import numpy as np
+
+from accuracy.sequential import SequentialAccuracyTest
+from accuracy.streaming import RunningZY
+
+TIME = np.arange(0.0, 51.0)
+MU = 10 + TIME
+STD = np.sqrt(MU)
+STD[0] = 0.0
+
+
+def add_batch(test, rng, n_batch, bias=0.0, scale=1.0):
+    states = MU * (1 + bias) + scale * STD * rng.standard_normal((n_batch, TIME.size))
+    states[:, 0] = MU[0]
+    test.add_states(states[:, :, None])
+
+
+def test_inaccurate_library_stops_early():
+    rng = np.random.default_rng(0)
+    test = SequentialAccuracyTest(TIME, MU, STD, "direct", 10000)
+    while test.n_rep < test.nrep_max:
+        add_batch(test, rng, 500, bias=0.1, scale=1.2)
+        if test.update():
+            break
+    report = test.report()
+    assert report["settled"]
+    assert report["nrep"] <= 1000
+    # Mean and standard deviation too high
+    failed = [count > 0 for count in report["failed_list"]]
+    assert failed == [False, True, False, True, False, True, False, True]
+
+
+def test_final_look_matches_fixed_test():
+    rng = np.random.default_rng(1)
+    test = SequentialAccuracyTest(TIME, MU, STD, "direct", 2000)
+    running = RunningZY(TIME, MU, STD, "direct")
+    states = MU * 1.004 + STD * rng.standard_normal((2000, TIME.size))
+    states[:, 0] = MU[0]
+    test.add_states(states[:, :, None])
+    running.add_states(states[:, :, None])
+    assert test.update()
+    assert test.failed_list() == running.failed_list()
+    assert test.open_list() == [0] * 8
@@ -0,0 +1,40 @@
+from startup_benchmarks import (
+    BASELINE,
+    ENTRY_POINTS,
+    check_startup,
+    parse_importtime,
+    time_import,
+)
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       224 |        224 |   _io
+import time:       687 |        978 |     json.scanner
+import time:       656 |      12120 |   json.decoder
+import time:       423 |      13260 | json
+import time:       100 |        100 | click
+"""
+
+
+def test_parse_importtime():
+    seconds, modules = parse_importtime(IMPORTTIME)
+    assert abs(seconds - 0.01336) < 1e-9
+    assert modules == ["_io", "json.scanner", "json.decoder", "json", "click"]
+
+
+def test_check_startup():
+    results = {BASELINE: {"median": 0.1}}
+    for module in ENTRY_POINTS:
+        results[module] = {"median": 0.15, "heavy_modules": []}
+    assert check_startup(results) == []
+    assert len(check_startup(results, max_overhead=0.01)) == len(ENTRY_POINTS)
+    previous = {ENTRY_POINTS[0]: {"median": 0.1}}
+    assert check_startup(results, previous) == [
+        f"{ENTRY_POINTS[0]} regressed from 0.100 s to 0.150 s"
+    ]
+    results[ENTRY_POINTS[1]]["heavy_modules"] = ["pandas"]
+    assert len(check_startup(results)) == 1
+
+
+def test_entry_points_import_no_heavy_modules():
+    for module in ENTRY_POINTS:
+        assert time_import(module, runs=1)["heavy_modules"] == []
@@ -0,0 +1,58 @@
+import numpy as np
+
+from accuracy.helpers import (
+    read_results_simulation,
+    read_results_simulation_2sp,
+    calculate_zy,
+    calculate_zy_2sp,
+    get_states_on_grid,
+)
+from accuracy.streaming import RunningZY
+
+
+def test_states_on_grid():
+    t_array = np.array([0.0, 1.5, 3.0])
+    x_array = np.array([[0], [3], [6]])
+    time_arr = [0, 1, 2, 3, 4]
+    states = get_states_on_grid(t_array, x_array, time_arr, "direct")
+    assert (states[:, 0] == [0, 0, 3, 6, 6]).all()
+    states = get_states_on_grid(t_array, x_array, time_arr, "tau_leaping")
+    assert np.isclose(states[:, 0], [0, 2, 4, 6, 6]).all()
+    states = get_states_on_grid(t_array, x_array, time_arr, "direct", True)
+    assert (states[:, 0] == [0, 3, 6, 6, 6]).all()
+
+
+def test_running_zy():
+    time_arr = np.array([0, 0.5, 1.5, 2.5, 3.5])
+    mu_analytical = np.array([0, 1, 2, 3, 4])
+    std_analytical = np.array([0, 0.5, 0.8, 1.0, 1.2])
+    for algo in ["direct", "not_direct"]:
+        res = read_results_simulation(n_reps=5, res_folder="tests/data/1sp/", algo=algo)
+        expected = calculate_zy(res, time_arr, mu_analytical, std_analytical, False)
+        running = RunningZY(time_arr, mu_analytical, std_analytical, algo)
+        for x, t, _ in res:
+            running.add(t, x)
+        assert running.n_rep == 5
+        for value, expected_value in zip(running.calculate_zy(), expected):
+            assert value.shape == expected_value.shape
+            assert np.isclose(value, expected_value).all()
+
+
+def test_running_zy_2sp():
+    time_arr = [0, 1, 2, 3, 4]
+    mu_analytical = np.array([[0, 10], [1, 9], [2, 8], [3, 7], [4, 6]])
+    std_analytical = np.array([[0, 0], [1, 1], [1, 1], [1, 1], [1, 1]])
+    res = read_results_simulation_2sp(n_reps=4, res_folder="tests/data/2sp/")
+    expected = calculate_zy_2sp(res, time_arr, mu_analytical, std_analytical, True)
+    running = RunningZY(time_arr, mu_analytical, std_analytical, "direct", True)
+    # Batches of different sizes give the same statistics
+    running.add(res.t_list[0], res.x_list[0])
+    states = [
+        get_states_on_grid(t, x, time_arr, "direct", True)
+        for t, x in zip(res.t_list[1:], res.x_list[1:])
+    ]
+    running.add_states(np.stack(states))
+    assert running.n_rep == 4
+    for value, expected_value in zip(running.calculate_zy(), expected):
+        assert np.isclose(value, expected_value).all()
+    assert len(running.failed_list()) == 8
@@ -0,0 +1,56 @@
+import numpy as np
+
+from synthetic_networks import (
+    generate_network,
+    get_network,
+    initial_propensities,
+    network_id,
+    parse_network_id,
+    to_antimony,
+    to_cayenne,
+    to_julia,
+    to_r,
+)
+
+
+def test_network_id():
+    model_id = network_id(100, 200, 3, 1, 7)
+    assert model_id == "syn_S100_R200_O3_P1_s7"
+    assert parse_network_id(model_id) == {
+        "n_species": 100,
+        "n_reactions": 200,
+        "max_order": 3,
+        "max_products": 1,
+        "seed": 7,
+    }
+    assert parse_network_id("syn_S10_R20")["max_order"] == 2
+
+
+def test_generate_network():
+    network = generate_network(20, 60, max_order=3, seed=1)
+    assert network.V_r.shape == (20, 60) and network.V_p.shape == (20, 60)
+    n_reactants, n_products = network.V_r.sum(axis=0), network.V_p.sum(axis=0)
+    # Only the sources create molecules
+    sources = n_reactants == 0
+    assert (n_products[sources] == 1).all()
+    assert (n_products[~sources] <= n_reactants[~sources]).all()
+    assert n_reactants.max() <= 3
+    assert (network.rates > 0).all()
+    assert np.all(get_network(network.name).V_r == network.V_r)
+
+
+def test_emitters():
+    network = generate_network(3, 8, max_order=3, seed=2)
+    k = to_cayenne(network)[5]
+    # cayenne counts ordered combinations of the reactants
+    x = network.X0
+    for j in range(8):
+        ordered = np.prod(
+            [np.prod(x[i] - np.arange(n)) for i, n in enumerate(network.V_r[:, j])]
+        )
+        assert np.isclose(k[j] * ordered, initial_propensities(network)[j])
+    antimony = to_antimony(network)
+    assert antimony.count("=>") == 8
+    assert "S1 = " in antimony
+    assert to_r(network).count("k8=") == 1
+    assert to_julia(network).count("Reaction(") == 8
@@ -0,0 +1,51 @@
+import importlib
+import pathlib
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from accuracy.seeds import replicate_seeds
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+
+
+class StubModel:
+    """A roadrunner model that records the integrator seed of each run."""
+
+    def __init__(self):
+        self.integrator = types.SimpleNamespace(seed=None)
+        self.seeds = []
+
+    def reset(self):
+        pass
+
+    def simulate(self, start, end):
+        self.seeds.append(self.integrator.seed)
+        return np.array([[start, 100.0], [end, 100.0]])
+
+
+@pytest.fixture
+def tel_results(monkeypatch):
+    # Tellurium is only needed to load models, which the stub replaces
+    monkeypatch.setitem(sys.modules, "tellurium", types.ModuleType("tellurium"))
+    monkeypatch.syspath_prepend(str(ROOT_DIR / "tellurium_test"))
+    monkeypatch.delitem(sys.modules, "models", raising=False)
+    monkeypatch.delitem(sys.modules, "make_tel_results", raising=False)
+    return importlib.import_module("make_tel_results")
+
+
+def test_simulate_shard_seeds(tel_results):
+    te_model = StubModel()
+    sims = tel_results.simulate_shard(te_model, 5, 1234, 20)
+    assert len(sims) == 5
+    assert te_model.seeds == replicate_seeds(1234, 20, 5).tolist()
+
+
+def test_stream_model_seeds(tel_results, monkeypatch):
+    te_model = StubModel()
+    monkeypatch.setattr(tel_results, "load_model", lambda id_: te_model)
+    accumulator = tel_results.stream_model("00001", 5, seed=7)
+    assert accumulator.n_rep == 5
+    assert te_model.seeds == replicate_seeds(7, 0, 5).tolist()
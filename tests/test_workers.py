@@ -0,0 +1,36 @@
+import sys
+
+import pytest
+
+from workers import Worker
+
+FAKE_WORKER = """
+import sys, time
+print("WORKER_READY", flush=True)
+for line in sys.stdin:
+    args = line.split()
+    if args[0] == "fail":
+        print("WORKER_ERROR bad job", flush=True)
+        continue
+    time.sleep(float(args[1]))
+    print("Not saving results")
+    print("WORKER_DONE", args[1], flush=True)
+"""
+
+
+def test_worker(tmp_path):
+    script = tmp_path / "worker.py"
+    script.write_text(FAKE_WORKER)
+    worker = Worker(f"{sys.executable} {script}")
+    assert worker.startup_time > 0
+    assert worker.run(["sleep", 0.01]) == 0.01
+    assert worker.run(["sleep", 0]) == 0
+    with pytest.raises(RuntimeError):
+        worker.run(["fail"])
+    assert worker.alive
+    with pytest.raises(TimeoutError):
+        worker.run(["sleep", 10], timeout=0.1)
+    assert not worker.alive
+    with pytest.raises(RuntimeError):
+        worker.run(["sleep", 0])
+    worker.close()
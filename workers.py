@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+"""
+    Persistent Julia and R sessions for the BioSimulator and GillespieSSA jobs.
+
+    A worker loads its language's packages and models once and then runs
+    simulation jobs sent over its stdin, one line of command line arguments
+    per job. It answers each job with a ``WORKER_DONE <seconds>`` or
+    ``WORKER_ERROR <message>`` line on stdout, so a campaign of many
+    (model, algo) pairs only pays for startup and JIT compilation once.
+"""
+
+import atexit
+import queue
+import shlex
+from subprocess import Popen, PIPE, TimeoutExpired
+import threading
+import time
+
+WORKER_CMDS = {
+    "BioSimulator": "julia biosimjl_test/biosim_worker.jl",
+    "BioSimulatorIntp": "julia biosimjl_test/biosim_worker.jl",
+    "GillespieSSA": "Rscript GillespieSSA_test/gillespieSSA_worker.R",
+}
+READY = "WORKER_READY"
+DONE = "WORKER_DONE"
+ERROR = "WORKER_ERROR"
+
+_WORKERS = {}
+
+
+class Worker:
+    """A long-lived simulation session.
+
+    Parameters
+    ----------
+    cmd
+        The command that starts the worker script.
+    startup_timeout
+        Seconds to wait for the worker to be ready.
+
+    Attributes
+    ----------
+    startup_time
+        Seconds taken by the worker to load its packages and models.
+    """
+
+    def __init__(self, cmd: str, startup_timeout: float = 600):
+        self.cmd = cmd
+        start = time.perf_counter()
+        self.proc = Popen(
+            shlex.split(cmd), stdin=PIPE, stdout=PIPE, universal_newlines=True
+        )
+        # Lines are read on a thread so that waiting for a reply can time out
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=self._read_lines, daemon=True)
+        self._reader.start()
+        self._wait_for_reply(startup_timeout)
+        self.startup_time = time.perf_counter() - start
+
+    def _read_lines(self):
+        for line in self.proc.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def _wait_for_reply(self, timeout: float = None) -> str:
+        end_time = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None if end_time is None else max(end_time - time.time(), 0)
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                # The job cannot be interrupted, so the worker is discarded
+                self.kill()
+                raise TimeoutError(f"{self.cmd} did not reply in {timeout} s")
+            if line is None:
+                raise RuntimeError(f"{self.cmd} exited")
+            if line.startswith((READY, DONE, ERROR)):
+                return line.strip()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def run(self, args: list, timeout: float = None) -> float:
+        """
+            Run one job
+
+            Parameters
+            ----------
+            args : list
+                The command line arguments of the simulation script
+            timeout : float, optional
+                Seconds to wait for the job. On timeout the worker is killed
+                and ``TimeoutError`` is raised.
+
+            Returns
+            -------
+            float
+                The seconds taken by the job, as measured by the worker
+        """
+        if not self.alive:
+            raise RuntimeError(f"{self.cmd} exited")
+        self.proc.stdin.write(" ".join(str(arg) for arg in args) + "\n")
+        self.proc.stdin.flush()
+        reply = self._wait_for_reply(timeout)
+        if reply.startswith(ERROR):
+            raise RuntimeError(reply[len(ERROR) :].strip())
+        return float(reply.split()[1])
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.wait()
+
+    def close(self, timeout: float = 10):
+        """Let the worker exit after its current job, killing it on timeout."""
+        if not self.alive:
+            return
+        self.proc.stdin.close()
+        try:
+            self.proc.wait(timeout)
+        except TimeoutExpired:
+            self.kill()
+
+
+def get_worker(lib: str) -> Worker:
+    """Return the running worker of a library, starting it if needed."""
+    if lib not in WORKER_CMDS:
+        raise ValueError(f"Workers are not supported for library: {lib}")
+    cmd = WORKER_CMDS[lib]
+    worker = _WORKERS.get(cmd)
+    if worker is None or not worker.alive:
+        worker = Worker(cmd)
+        _WORKERS[cmd] = worker
+    return worker
+
+
+def close_workers():
+    for worker in _WORKERS.values():
+        worker.close()
+    _WORKERS.clear()
+
+
+atexit.register(close_workers)